@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.mock_mtop import DETAIL_PATH, MOCK_OPTIONS, add_mock_arguments
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+FIRST_ITEM_ID = 700000000000
+
+
+def free_port() -> int:
+    """Devuelve un puerto TCP libre en localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout_s: float = 30.0) -> None:
+    """Espera a que un servidor HTTP responda en ``url``.
+
+    Raises:
+        TimeoutError: Si no responde dentro de ``timeout_s``.
+    """
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise TimeoutError(f"{url} no respondio en {timeout_s}s")
+
+
+def start_server(argv: list[str], ready_url: str, env: dict | None = None) -> subprocess.Popen:
+    """Lanza un servidor en un subproceso y espera a que atienda."""
+    process = subprocess.Popen([sys.executable, *argv], cwd=ROOT, env=env)
+    try:
+        wait_ready(ready_url)
+    except TimeoutError:
+        process.terminate()
+        raise
+    return process
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """Termina un servidor lanzado con ``start_server``."""
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def percentiles(latencies: list[float]) -> dict:
+    """p50/p95/p99 en milisegundos de una lista de latencias en segundos."""
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    ordered = sorted(latencies)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)  # noqa: E731
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def item_urls(items: int) -> list[str]:
+    """URLs de items distintos segun ``GOOFISH_ITEM_URL`` (apuntando al mock)."""
+    template = os.environ["GOOFISH_ITEM_URL"]
+    return [template.format(item_id=FIRST_ITEM_ID + index) for index in range(items)]
+
+
+async def fetch_mock_cookies(target_url: str, use_proxy: bool = False) -> dict:
+    """Obtiene cookies del mock con un GET, sin navegador.
+
+    Tiene la misma firma que ``BrowserService.fetch_cookies``; sirve para
+    medir el pipeline sin el costo de Chromium.
+    """
+    async with httpx.AsyncClient() as client:
+        response = await client.get(target_url)
+    return dict(response.cookies)
+
+
+def _summary(mode: str, workers: int, results: Counter, elapsed: float, latencies: list[float]) -> dict:
+    """Arma la fila de resultados de una medicion."""
+    done = sum(results.values())
+    return {
+        "mode": mode,
+        "workers": workers,
+        "items": done,
+        "ok": results.get("ok", 0),
+        "errors": dict(item for item in results.items() if item[0] != "ok"),
+        "elapsed_s": round(elapsed, 3),
+        "items_per_s": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        **percentiles(latencies),
+    }
+
+
+def _bench_batch(workers: int, items: int, browser: bool, http2: bool, timeout_s: float) -> dict:
+    """Mide ``scrape_csv.run`` en el proceso actual (se ejecuta en un hijo)."""
+    from utils.CookiePool import CookiePool
+    from utils.metrics import result_code
+    from utils.scrape_csv import run
+    from utils.scraping_repository import build_http_client
+
+    latencies: list[float] = []
+    results: Counter = Counter()
+
+    async def on_request(request: httpx.Request) -> None:
+        request.extensions["bench_started"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response) -> None:
+        started = response.request.extensions.get("bench_started")
+        if started is not None and response.request.url.path == DETAIL_PATH:
+            latencies.append(time.perf_counter() - started)
+
+    async def main(input_path: Path, output_path: Path) -> None:
+        async with build_http_client(http2=http2, max_connections=max(100, workers)) as client:
+            client.event_hooks = {"request": [on_request], "response": [on_response]}
+            cookie_pool = None if browser else CookiePool(fetch_mock_cookies, use_proxy=False, size=2)
+            await run(
+                input_path=input_path,
+                output_path=output_path,
+                workers=workers,
+                retries=1,
+                use_proxy=False,
+                timeout_s=timeout_s,
+                verbose=False,
+                on_result=lambda data: results.update([result_code(data.get("ERROR"))]),
+                client=client,
+                cookie_pool=cookie_pool,
+            )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "input.csv"
+        input_path.write_text("URL\n" + "\n".join(item_urls(items)) + "\n", encoding="utf-8")
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        started = time.perf_counter()
+        asyncio.run(main(input_path, Path(tmp) / "output.csv"))
+        elapsed = time.perf_counter() - started
+        after = resource.getrusage(resource.RUSAGE_SELF)
+
+    row = _summary("batch", workers, results, elapsed, latencies)
+    row["cpu_s"] = round(after.ru_utime + after.ru_stime - usage.ru_utime - usage.ru_stime, 3)
+    row["peak_rss_mb"] = round(after.ru_maxrss / 1024, 1)
+    return row
+
+
+def bench_batch(workers: int, items: int, browser: bool, http2: bool, timeout_s: float) -> dict:
+    """Mide ``scrape_csv.run`` en un proceso nuevo (RSS pico sin arrastre)."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_bench_batch, workers, items, browser, http2, timeout_s).result()
+
+
+def _proc_usage(pid: int) -> tuple[float, float]:
+    """CPU (s) y RSS pico (MiB) de un proceso segun ``/proc``."""
+    stat = Path(f"/proc/{pid}/stat").read_text()
+    fields = stat[stat.rindex(")") + 2 :].split()
+    cpu_s = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    peak_kb = 0
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            peak_kb = int(line.split()[1])
+    return cpu_s, peak_kb / 1024
+
+
+async def _drive_api(base_url: str, urls: list[str], workers: int, timeout_s: float) -> tuple[Counter, list[float]]:
+    """Envia ``urls`` a ``/scrapePDP`` con ``workers`` requests en paralelo."""
+    results: Counter = Counter()
+    latencies: list[float] = []
+    pending = iter(urls)
+    limits = httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        for url in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.get("/scrapePDP", params={"url": url, "no_cache": "true"})
+                error = response.json().get("ERROR") if response.status_code == 200 else f"HTTP_{response.status_code}"
+            except httpx.HTTPError as exc:
+                error = exc.__class__.__name__
+            latencies.append(time.perf_counter() - started)
+            results.update(["ok" if not error else error.split("::", 1)[0]])
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout_s) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(workers)))
+    return results, latencies
+
+
+def bench_api(workers: int, items: int, timeout_s: float, env: dict) -> dict:
+    """Mide ``GET /scrapePDP`` de ``main.py`` levantado con uvicorn en un subproceso.
+
+    Las cookies de la API salen de su ``BrowserService`` (Chromium contra el
+    mock). La primera request, que las precarga, no se cuenta.
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(
+        ["-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        f"{base_url}/openapi.json",
+        env=env,
+    )
+    try:
+        urls = item_urls(items + 1)
+        asyncio.run(_drive_api(base_url, urls[:1], 1, timeout_s))
+        cpu_before, _ = _proc_usage(server.pid)
+        started = time.perf_counter()
+        results, latencies = asyncio.run(_drive_api(base_url, urls[1:], workers, timeout_s))
+        elapsed = time.perf_counter() - started
+        cpu_after, peak_rss_mb = _proc_usage(server.pid)
+    finally:
+        stop_server(server)
+
+    row = _summary("api", workers, results, elapsed, latencies)
+    row["cpu_s"] = round(cpu_after - cpu_before, 3)
+    row["peak_rss_mb"] = round(peak_rss_mb, 1)
+    return row
+
+
+def git_commit() -> str:
+    """Commit actual del repo (``unknown`` fuera de git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(rows: list[dict], baseline_path: Path) -> None:
+    """Imprime la variacion de items/s y p95 respecto de una corrida guardada."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {(row["mode"], row["workers"]): row for row in baseline["results"]}
+    print(f"Comparacion con {baseline_path.name} (commit {baseline.get('commit')}):")
+    for row in rows:
+        old = previous.get((row["mode"], row["workers"]))
+        if old is None or not old["items_per_s"]:
+            continue
+        rate_delta = (row["items_per_s"] / old["items_per_s"] - 1) * 100
+        p95 = f"{old['p95_ms']} -> {row['p95_ms']} ms" if old.get("p95_ms") is not None else "-"
+        print(f"  {row['mode']:<5} workers={row['workers']:<4} items/s {rate_delta:+6.1f}%  p95 {p95}")
+
+
+def print_row(row: dict) -> None:
+    """Imprime una fila de resultados en una linea."""
+    print(
+        f"{row['mode']:<5} workers={row['workers']:<4} {row['items_per_s']:8.1f} items/s "
+        f"ok={row['ok']}/{row['items']} p50={row['p50_ms']} p95={row['p95_ms']} p99={row['p99_ms']} ms "
+        f"cpu={row['cpu_s']}s rss={row['peak_rss_mb']}MB errores={row['errors'] or '-'}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark offline del scraper contra un mock local de mtop.")
+    parser.add_argument("--mode", default="batch", choices=["batch", "api", "both"], help="Que medir")
+    parser.add_argument("--workers", default="5,10,20,50", help="Lista de concurrencias a medir, separadas por coma")
+    parser.add_argument("--items", type=int, default=2000, help="Items por medicion")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Timeout por request en segundos")
+    parser.add_argument("--http2", action="store_true", help="Cliente HTTP/2 en modo batch")
+    parser.add_argument("--browser", action="store_true", help="Cookies con Chromium en modo batch (por defecto GET al mock)")
+    parser.add_argument("--mock-url", default=None, help="Usar un mock ya levantado (p. ej. http://127.0.0.1:18080)")
+    parser.add_argument("--output", default=None, help="JSON de resultados (por defecto benchmarks/results/<fecha>_<commit>.json)")
+    parser.add_argument("--compare", default=None, help="JSON de una corrida anterior para comparar")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    mock = None
+    mock_url = args.mock_url
+    if mock_url is None:
+        port = free_port()
+        mock_url = f"http://127.0.0.1:{port}"
+        mock_argv = [f"--{name.replace('_', '-')}={getattr(args, name)}" for name in MOCK_OPTIONS if getattr(args, name) is not None]
+        mock = start_server(["benchmarks/mock_mtop.py", "--port", str(port), *mock_argv], f"{mock_url}/stats")
+    os.environ["GOOFISH_API_URL"] = f"{mock_url}{DETAIL_PATH}"
+    os.environ["GOOFISH_ITEM_URL"] = f"{mock_url}/item?id={{item_id}}"
+
+    modes = ["batch", "api"] if args.mode == "both" else [args.mode]
+    rows = []
+    try:
+        for mode in modes:
+            for workers in (int(value) for value in args.workers.split(",")):
+                if mode == "batch":
+                    row = bench_batch(workers, args.items, args.browser, args.http2, args.timeout)
+                else:
+                    row = bench_api(workers, args.items, args.timeout, dict(os.environ))
+                print_row(row)
+                rows.append(row)
+    finally:
+        if mock is not None:
+            stop_server(mock)
+
+    commit = git_commit()
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}_{commit}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    report = {"commit": commit, "created_at": datetime.now(timezone.utc).isoformat(), "config": config, "results": rows}
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en: {output}")
+    if args.compare:
+        compare(rows, Path(args.compare))
+
+
+if __name__ == "__main__":
+    main()
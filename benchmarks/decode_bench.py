@@ -0,0 +1,149 @@
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from utils.decoding import decode_detail, record_from_payload
+
+
+def synthetic_payload(item_id: int, extra_keys: int = 300, images: int = 9) -> bytes:
+    """Genera una respuesta de detalle con la forma y el tamano de una real.
+
+    Los campos que usa ``parse_product`` van acompanados de muchos campos que
+    no se usan (descripcion, etiquetas, SKUs, tracking), como en mtop.
+
+    Args:
+        item_id: itemId del producto.
+        extra_keys: Cantidad de campos de relleno en ``itemDO``.
+        images: Cantidad de imagenes.
+
+    Returns:
+        Cuerpo JSON en bytes.
+    """
+    rng = random.Random(item_id)
+    noise = {
+        f"field{index}": {
+            "id": rng.randint(1, 10**9),
+            "text": "x" * rng.randint(10, 120),
+            "tags": [rng.random() for _ in range(5)],
+            "flag": index % 2 == 0,
+        }
+        for index in range(extra_keys)
+    }
+    payload = {
+        "api": "mtop.taobao.idle.pc.detail",
+        "ret": ["SUCCESS::调用成功"],
+        "v": "1.0",
+        "data": {
+            "trackParams": {"itemId": str(item_id), "categoryId": "50023914", "sellerId": "2201"},
+            "itemDO": {
+                "title": "商品标题 " * 8,
+                "desc": "描述 " * 400,
+                "imageInfos": [
+                    {"photoSearchUrl": f"https://img.example.com/{item_id}_{index}.jpg", "widthSize": 800}
+                    for index in range(images)
+                ],
+                "soldPrice": "128.00",
+                "browseCnt": rng.randint(0, 5000),
+                "wantCnt": rng.randint(0, 200),
+                "collectCnt": rng.randint(0, 200),
+                "quantity": 1,
+                "gmtCreate": 1700000000000,
+                **noise,
+            },
+            "sellerDO": {"sellerId": 2201, "nick": "seller", "city": "杭州"},
+            "b2cSellerDO": {"tags": list(range(50))},
+        },
+    }
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def load_payloads(paths: list[Path]) -> list[bytes]:
+    """Lee respuestas grabadas (p. ej. ``response_<id>.txt`` de ``scrape_pdp``).
+
+    Args:
+        paths: Archivos con el JSON de una respuesta de detalle.
+
+    Returns:
+        Cuerpos en bytes.
+    """
+    return [path.read_bytes() for path in paths]
+
+
+def stdlib_path(body: bytes) -> dict:
+    """Camino anterior: ``json.loads`` completo y normalizacion sobre dicts."""
+    return record_from_payload(json.loads(body)).to_dict()
+
+
+def orjson_path(body: bytes) -> dict:
+    """``orjson.loads`` completo y normalizacion sobre dicts."""
+    import orjson
+
+    return record_from_payload(orjson.loads(body)).to_dict()
+
+
+def msgspec_path(body: bytes) -> dict:
+    """Camino nuevo: decodificacion selectiva con ``msgspec``."""
+    _, record = decode_detail(body)
+    return record.to_dict()
+
+
+def bench(fn: Callable[[bytes], dict], payloads: list[bytes], repeat: int) -> float:
+    """Mide el tiempo medio por item.
+
+    Args:
+        fn: Funcion de decodificacion.
+        payloads: Cuerpos a decodificar.
+        repeat: Pasadas sobre todos los payloads.
+
+    Returns:
+        Microsegundos por item.
+    """
+    fn(payloads[0])
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for body in payloads:
+            fn(body)
+    return (time.perf_counter() - started) / (repeat * len(payloads)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark de decodificacion de respuestas de detalle.")
+    parser.add_argument("payloads", nargs="*", type=Path, help="Respuestas grabadas (por defecto sinteticas)")
+    parser.add_argument("--items", type=int, default=200, help="Payloads sinteticos a generar")
+    parser.add_argument("--repeat", type=int, default=5, help="Pasadas sobre los payloads")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads) if args.payloads else [
+        synthetic_payload(100000 + index) for index in range(args.items)
+    ]
+    size_kb = sum(len(body) for body in payloads) / len(payloads) / 1024
+    print(f"Payloads: {len(payloads)} | tamano medio: {size_kb:.1f} KB")
+
+    expected = [stdlib_path(body) for body in payloads]
+    candidates = {"json + dicts": stdlib_path, "msgspec selectivo": msgspec_path}
+    try:
+        import orjson  # noqa: F401
+
+        candidates["orjson + dicts"] = orjson_path
+    except ImportError:
+        pass
+
+    baseline = None
+    for name, fn in candidates.items():
+        if [fn(body) for body in payloads] != expected:
+            print(f"{name}: resultado distinto al camino anterior")
+            continue
+        micros = bench(fn, payloads, args.repeat)
+        baseline = baseline or micros
+        print(f"{name:<20} {micros:9.1f} us/item  x{baseline / micros:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import unquote_to_bytes
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.decode_bench import synthetic_payload
+
+DETAIL_PATH = "/h5/mtop.taobao.idle.pc.detail/1.0/"
+# itemId de relleno en la plantilla; se reemplaza por el pedido en cada respuesta.
+PLACEHOLDER_ID = 987654321987
+# Opciones de linea de comandos compartidas con benchmarks/bench.py.
+MOCK_OPTIONS = (
+    "latency_ms",
+    "latency_dist",
+    "latency_sigma",
+    "payload_kb",
+    "token_ttl",
+    "rgv_every",
+    "rgv_duration",
+    "timeout_rate",
+    "hang",
+    "fail_rate",
+    "seed",
+)
+
+
+def _error_body(ret: str) -> bytes:
+    """Cuerpo de una respuesta mtop con error."""
+    return json.dumps({"api": "mtop.taobao.idle.pc.detail", "ret": [ret], "v": "1.0", "data": {}}).encode("utf-8")
+
+
+def _payload_template(payload_kb: float) -> bytes:
+    """Respuesta exitosa de aproximadamente ``payload_kb`` KB para ``PLACEHOLDER_ID``."""
+    base = len(synthetic_payload(PLACEHOLDER_ID, extra_keys=0))
+    per_key = len(synthetic_payload(PLACEHOLDER_ID, extra_keys=10)) - base
+    extra_keys = max(0, round((payload_kb * 1024 - base) / per_key * 10))
+    return synthetic_payload(PLACEHOLDER_ID, extra_keys=extra_keys)
+
+
+def create_app(
+    latency_ms: float = 50.0,
+    latency_dist: str = "lognormal",
+    latency_sigma: float = 0.5,
+    payload_kb: float = 70.0,
+    token_ttl: float = 300.0,
+    rgv_every: float = 0.0,
+    rgv_duration: float = 5.0,
+    timeout_rate: float = 0.0,
+    hang: float = 60.0,
+    fail_rate: float = 0.0,
+    seed: int | None = None,
+) -> FastAPI:
+    """Crea un servidor que imita el endpoint de detalle de mtop y la pagina del item.
+
+    ``GET /item?id=...`` entrega cookies ``_m_h5_tk`` con vencimiento (el
+    formato real: ``<token>_<expira_ms>``) y ``POST`` al endpoint de detalle
+    responde con la misma forma que mtop, incluidos los errores que el
+    scraper tiene que manejar.
+
+    Args:
+        latency_ms: Latencia mediana de cada respuesta de detalle.
+        latency_dist: Distribucion de la latencia: ``fixed``, ``uniform``
+            (entre 0 y el doble de la mediana) o ``lognormal``.
+        latency_sigma: Dispersion de la distribucion lognormal.
+        payload_kb: Tamano aproximado de una respuesta exitosa.
+        token_ttl: Segundos de vida de un ``_m_h5_tk``; despues se responde
+            ``FAIL_SYS_TOKEN_EXOIRED``.
+        rgv_every: Cada cuantos segundos empieza una rafaga de
+            ``RGV587_ERROR`` (0 = nunca).
+        rgv_duration: Duracion de cada rafaga en segundos.
+        timeout_rate: Fraccion de requests que se cuelgan ``hang`` segundos.
+        hang: Segundos que se cuelga una request antes de responder.
+        fail_rate: Fraccion de items que responden como inexistentes.
+        seed: Semilla del generador aleatorio (None = no determinista).
+
+    Returns:
+        Aplicacion FastAPI lista para ``uvicorn``.
+    """
+    rng = random.Random(seed)
+    template = _payload_template(payload_kb)
+    placeholder = str(PLACEHOLDER_ID).encode()
+    started = time.monotonic()
+    stats = {"items": 0, "detail": 0, "ok": 0, "token_expired": 0, "token_empty": 0, "rgv587": 0, "hung": 0, "failed": 0}
+    app = FastAPI(title="mock mtop")
+
+    def sample_latency() -> float:
+        median = latency_ms / 1000
+        if latency_dist == "fixed":
+            return median
+        if latency_dist == "uniform":
+            return rng.uniform(0, 2 * median)
+        return rng.lognormvariate(0, latency_sigma) * median
+
+    def in_rgv_burst() -> bool:
+        return rgv_every > 0 and (time.monotonic() - started) % rgv_every < rgv_duration
+
+    @app.get("/item", response_class=HTMLResponse)
+    async def item_page(id: str = ""):
+        stats["items"] += 1
+        token = uuid.uuid4().hex
+        expires_ms = int((time.time() + token_ttl) * 1000)
+        response = HTMLResponse(f"<html><body>item {id}</body></html>")
+        response.set_cookie("_m_h5_tk", f"{token}_{expires_ms}")
+        response.set_cookie("_m_h5_tk_enc", uuid.uuid4().hex)
+        response.set_cookie("cna", uuid.uuid4().hex[:24])
+        return response
+
+    @app.post(DETAIL_PATH)
+    async def detail(request: Request):
+        stats["detail"] += 1
+        body = await request.body()
+        item_id = json.loads(unquote_to_bytes(body.partition(b"data=")[2]) or b"{}").get("itemId", "0")
+
+        if timeout_rate and rng.random() < timeout_rate:
+            stats["hung"] += 1
+            await asyncio.sleep(hang)
+        await asyncio.sleep(sample_latency())
+
+        token = request.cookies.get("_m_h5_tk", "")
+        if not token:
+            stats["token_empty"] += 1
+            content = _error_body("FAIL_SYS_TOKEN_EMPTY::令牌为空")
+        elif int(token.rpartition("_")[2] or 0) < time.time() * 1000:
+            stats["token_expired"] += 1
+            content = _error_body("FAIL_SYS_TOKEN_EXOIRED::令牌过期")
+        elif in_rgv_burst():
+            stats["rgv587"] += 1
+            content = _error_body("RGV587_ERROR::SM::哎哟喂,被挤爆啦,请稍后重试")
+        elif fail_rate and random.Random(item_id).random() < fail_rate:
+            stats["failed"] += 1
+            content = _error_body("FAIL_BIZ_ITEM_NOT_EXIST::商品不存在")
+        else:
+            stats["ok"] += 1
+            content = template.replace(placeholder, str(item_id).encode())
+        return Response(content, media_type="application/json")
+
+    @app.get("/stats")
+    async def mock_stats():
+        return stats
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Agrega las opciones del servidor mock (ver ``MOCK_OPTIONS``) a ``parser``."""
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latencia mediana por respuesta (ms)")
+    parser.add_argument("--latency-dist", default="lognormal", choices=["fixed", "uniform", "lognormal"], help="Distribucion de la latencia")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Dispersion de la latencia lognormal")
+    parser.add_argument("--payload-kb", type=float, default=70.0, help="Tamano aproximado de una respuesta exitosa (KB)")
+    parser.add_argument("--token-ttl", type=float, default=300.0, help="Vida de un _m_h5_tk en segundos")
+    parser.add_argument("--rgv-every", type=float, default=0.0, help="Segundos entre rafagas de RGV587_ERROR (0 = nunca)")
+    parser.add_argument("--rgv-duration", type=float, default=5.0, help="Duracion de cada rafaga de RGV587_ERROR (s)")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraccion de requests que se cuelgan")
+    parser.add_argument("--hang", type=float, default=60.0, help="Segundos que se cuelga una request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraccion de items inexistentes")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla del generador aleatorio")
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor local que imita el endpoint de detalle de mtop.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz de escucha")
+    parser.add_argument("--port", type=int, default=18080, help="Puerto de escucha")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(**{name: getattr(args, name) for name in MOCK_OPTIONS})
+    print(f"GOOFISH_API_URL=http://{args.host}:{args.port}{DETAIL_PATH}")
+    print(f"GOOFISH_ITEM_URL=http://{args.host}:{args.port}/item?id={{item_id}}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,31 @@
-from fastapi.responses import RedirectResponse
+import asyncio
+import json
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from os import getenv
+from pathlib import Path
+
+from fastapi.responses import FileResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.openapi.utils import get_openapi
-from fastapi import FastAPI, Query
-from utils.CookieManager import CookieManager
-from utils.scrape_csv import scrape_one, get_fresh_cookies
+from fastapi import FastAPI, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from utils.BrowserService import BrowserService
+from utils.cache import ResultCache
+from utils.checkpoint import item_key
+from utils.concurrency import AdaptiveConcurrency
+from utils.CookiePool import CookiePool
+from utils.cookie_vault import CookieVault
+from utils.hedging import HedgePolicy
+from utils.jobs import JobManager
+from utils.metrics import REGISTRY
+from utils.profiling import LoopMonitor, SamplingProfiler
+from utils.proxy_pool import ProxyPool, load_proxies
+from utils.rate_limit import RateLimiter
+from utils.scrape_csv import scrape_one
+from utils.scraping_repository import TEST_URL, build_http_client, build_item_url
+from utils.singleflight import SingleFlight
+from utils.sinks import flatten_row
 
 
 # =================================================================
@@ -10,6 +33,21 @@ from utils.scrape_csv import scrape_one, get_fresh_cookies
 # =================================================================
 YOUR_NAME = "Mateo Pissarello"  # TODO: UPDATE WITH YOUR NAME
 
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str) -> float | None:
+    """Lee una variable de entorno numerica opcional.
+
+    Args:
+        name: Nombre de la variable.
+
+    Returns:
+        Valor como float, o None si no esta definida.
+    """
+    value = getenv(name)
+    return float(value) if value else None
+
 
 def custom_openapi():
     """Personaliza el schema OpenAPI para limpiar respuestas de validacion.
@@ -42,10 +80,193 @@ def custom_openapi():
     return app.openapi_schema
 
 
-app = FastAPI()
+async def _warm_up(cookie_pool: CookiePool | ProxyPool, interval_s: float) -> None:
+    """Obtiene las cookies de las sesiones antes de la primera request y las mantiene vigentes.
+
+    Cada ``interval_s`` segundos revisa todas las sesiones: las que estan por
+    vencer se renuevan en segundo plano aunque la API no reciba requests.
+
+    Args:
+        cookie_pool: Pool de sesiones de la aplicacion.
+        interval_s: Segundos entre revisiones.
+    """
+    try:
+        await asyncio.gather(*(session.ensure(TEST_URL) for session in cookie_pool.sessions))
+    except Exception:
+        logger.exception("No se pudieron precargar cookies; se obtendran en la primera request")
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await asyncio.gather(*(session.ensure(TEST_URL) for session in cookie_pool.sessions))
+        except Exception:
+            logger.exception("No se pudieron renovar cookies por vencer")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crea el estado compartido por todas las requests durante la vida de la aplicacion.
+
+    Chromium, el pool de sesiones de cookies, el cliente HTTP keep-alive, el
+    rate limiter, la cache y el pool de trabajos se crean una vez al iniciar
+    y se cierran al apagar; asi una request con cookies vigentes cuesta un solo round trip a
+    mtop. Las cookies se precargan y renuevan antes de vencer en segundo plano
+    (con ``SCRAPE_COOKIE_VAULT`` se reutilizan las de la boveda). Si hay proxies
+    configurados (``SCRAPE_PROXY_FILE`` o ``PROXY_LIST``) se usa un
+    ``ProxyPool`` con una sesion y un cliente por proxy.
+
+    Args:
+        app: Aplicacion FastAPI.
+    """
+    app.state.rate_limiter = RateLimiter(
+        rate=_env_float("SCRAPE_RATE"),
+        burst=_env_float("SCRAPE_BURST"),
+        session_rate=_env_float("SCRAPE_SESSION_RATE"),
+        session_burst=_env_float("SCRAPE_BURST"),
+        jitter_s=_env_float("SCRAPE_JITTER") or 0.0,
+    )
+    cache_db = getenv("SCRAPE_CACHE_DB")
+    cache_ttl = _env_float("SCRAPE_CACHE_TTL") or 3600.0
+    negative_ttl = _env_float("SCRAPE_NEGATIVE_TTL") or 300.0
+    app.state.cache = ResultCache(
+        max_entries=int(_env_float("SCRAPE_CACHE_SIZE") or 10000),
+        ttl_s=cache_ttl,
+        negative_ttl_s=negative_ttl,
+        path=Path(cache_db) if cache_db else None,
+    )
+    # Un trabajo de decenas de miles de URLs vaciaria el LRU de /scrapePDP:
+    # los trabajos solo leen y escriben el nivel SQLite (si esta configurado).
+    app.state.job_cache = (
+        ResultCache(max_entries=0, ttl_s=cache_ttl, negative_ttl_s=negative_ttl, path=Path(cache_db))
+        if cache_db
+        else None
+    )
+    app.state.singleflight = SingleFlight()
+    hedge_quantile = _env_float("SCRAPE_HEDGE_QUANTILE")
+    app.state.hedge = (
+        HedgePolicy(quantile=hedge_quantile, budget=_env_float("SCRAPE_HEDGE_BUDGET") or 0.05)
+        if hedge_quantile
+        else None
+    )
+    app.state.batch_max_size = int(_env_float("SCRAPE_BATCH_MAX_SIZE") or 500)
+    app.state.batch_concurrency = int(_env_float("SCRAPE_BATCH_CONCURRENCY") or 10)
+    cookie_sessions = int(_env_float("SCRAPE_COOKIE_SESSIONS") or 2)
+    proxy_file = getenv("SCRAPE_PROXY_FILE")
+    proxies = load_proxies(Path(proxy_file) if proxy_file else None)
+    http2 = bool(getenv("SCRAPE_HTTP2"))
+    cookie_vault = getenv("SCRAPE_COOKIE_VAULT")
+    vault = CookieVault(Path(cookie_vault)) if cookie_vault else None
+    cookie_margin = _env_float("SCRAPE_COOKIE_MARGIN") or 120.0
+    app.state.loop_monitor = LoopMonitor(block_threshold_s=(_env_float("SCRAPE_PROFILE_THRESHOLD_MS") or 100.0) / 1000)
+    app.state.profiler = None
+    app.state.profile_dir = Path(getenv("SCRAPE_PROFILE_DIR") or "data/profiles")
+    try:
+        async with (
+            BrowserService(max_contexts=cookie_sessions) as browser_service,
+            build_http_client(http2=http2) as http_client,
+            AsyncExitStack() as stack,
+        ):
+            app.state.browser_service = browser_service
+            app.state.http_client = http_client
+            if proxies:
+                app.state.cookie_pool = await stack.enter_async_context(
+                    ProxyPool(
+                        browser_service.fetch_cookies,
+                        proxies,
+                        max_concurrent_refreshes=cookie_sessions,
+                        http2=http2,
+                        vault=vault,
+                        refresh_margin_s=cookie_margin,
+                    )
+                )
+            else:
+                app.state.cookie_pool = CookiePool(
+                    browser_service.fetch_cookies,
+                    use_proxy=False,
+                    size=cookie_sessions,
+                    max_concurrent_refreshes=cookie_sessions,
+                    vault=vault,
+                    refresh_margin_s=cookie_margin,
+                )
+                # Antes de cerrar Chromium (el stack se cierra primero).
+                stack.push_async_callback(app.state.cookie_pool.close)
+            # Los trabajos comparten un tope de requests en vuelo propio, asi un
+            # lote grande no le quita capacidad a /scrapePDP; como el token del
+            # rate limiter se reserva con el cupo tomado, tampoco acaparan tokens.
+            job_concurrency = int(_env_float("SCRAPE_JOB_CONCURRENCY") or 10)
+            app.state.jobs = JobManager(
+                Path(getenv("SCRAPE_JOBS_DIR") or "data/jobs"),
+                max_parallel_jobs=int(_env_float("SCRAPE_MAX_JOBS") or 2),
+                retention_s=_env_float("SCRAPE_JOB_RETENTION") or 86400.0,
+                workers=job_concurrency,
+                retries=1,
+                use_proxy=False,
+                timeout_s=45.0,
+                client=http_client,
+                cookie_pool=app.state.cookie_pool,
+                rate_limiter=app.state.rate_limiter,
+                concurrency=AdaptiveConcurrency(initial=job_concurrency, maximum=job_concurrency),
+                cache=app.state.job_cache,
+                hedge=app.state.hedge,
+            )
+            app.state.jobs.start()
+            if getenv("SCRAPE_PROFILE"):
+                app.state.loop_monitor.start()
+            warm_up = asyncio.create_task(_warm_up(app.state.cookie_pool, interval_s=cookie_margin / 2))
+            try:
+                yield
+            finally:
+                warm_up.cancel()
+                await app.state.jobs.close()
+                app.state.loop_monitor.stop()
+                if app.state.profiler is not None:
+                    app.state.profiler.stop()
+    finally:
+        app.state.cache.close()
+        if app.state.job_cache is not None:
+            app.state.job_cache.close()
+
+
+app = FastAPI(lifespan=lifespan)
 app.openapi = custom_openapi
 
 
+async def _scrape(state, url: str, no_cache: bool) -> dict:
+    """Scrapea una URL con el estado de la aplicacion, agrupando duplicados.
+
+    Las requests concurrentes por el mismo itemId comparten una sola llamada
+    a ``scrape_one``; cada una recibe el resultado con su propia URL.
+
+    Args:
+        state: ``app.state`` con el pool de cookies, cliente, limites y cache.
+        url: URL del producto.
+        no_cache: Ignora la cache (no se agrupa con requests que la usan).
+
+    Returns:
+        Resultado de ``scrape_one``.
+    """
+    key = (item_key(url), no_cache)
+    data = await state.singleflight.do(
+        key,
+        lambda: scrape_one(
+            url,
+            cookie_mgr=state.cookie_pool,
+            retries=2,
+            timeout_s=10.0,
+            client=state.http_client,
+            rate_limiter=state.rate_limiter,
+            cache=state.cache,
+            bypass_cache=no_cache,
+            hedge=state.hedge,
+        ),
+    )
+    return dict(data, URL=url)
+
+
+class BatchRequest(BaseModel):
+    """Cuerpo de ``POST /scrapePDP/batch``."""
+    urls: list[str | int] = Field(..., description="Goofish product URLs or item IDs")
+
+
 # =================================================================
 # API ENDPOINTS
 # =================================================================
@@ -62,21 +283,303 @@ async def redirect_to_docs():
 
 # Scraping function
 @app.get("/scrapePDP", tags=["Scraping"])
-async def scrape_pdp_endpoint(url: str = Query(..., description="The URL of the Goofish product to scrape")):
+async def scrape_pdp_endpoint(
+    request: Request,
+    url: str = Query(..., description="The URL of the Goofish product to scrape"),
+    no_cache: bool = Query(False, description="Skip the cached result and scrape again"),
+):
     """Expone el scraper como endpoint HTTP.
 
     Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
         url: URL del producto a scrapear.
+        no_cache: Ignora el resultado cacheado y vuelve a scrapear.
 
     Returns:
         Respuesta JSON del endpoint de detalle.
     """
     try:
-        cookie_mgr = CookieManager(get_fresh_cookies, use_proxy=False)
-        data = await scrape_one(url, cookie_mgr=cookie_mgr, retries=2, timeout_s=10.0)
+        data = await _scrape(request.app.state, url, no_cache)
     except Exception as e:
         return {"URL": url, "ERROR": str(e)}
-    return data
+    return flatten_row(data)
+
+
+@app.post("/scrapePDP/batch", tags=["Scraping"])
+async def scrape_pdp_batch_endpoint(
+    request: Request,
+    body: BatchRequest,
+    no_cache: bool = Query(False, description="Skip cached results and scrape again"),
+):
+    """Scrapea varias URLs en paralelo y devuelve cada resultado como NDJSON.
+
+    Los items se procesan con el mismo ``scrape_one`` que ``/scrapePDP`` y
+    con a lo sumo ``SCRAPE_BATCH_CONCURRENCY`` en vuelo; cada linea se envia
+    apenas termina su item, por lo que el orden de salida no es el de
+    entrada. Los items repetidos (mismo itemId) devuelven ``DUPLICATE_URL``.
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+        body: URLs o itemIds a scrapear.
+        no_cache: Ignora los resultados cacheados y vuelve a scrapear.
+
+    Returns:
+        Respuesta ``application/x-ndjson`` con una linea por item.
+
+    Raises:
+        HTTPException: 413 si el lote supera ``SCRAPE_BATCH_MAX_SIZE``.
+    """
+    state = request.app.state
+    if len(body.urls) > state.batch_max_size:
+        raise HTTPException(status_code=413, detail=f"Maximo {state.batch_max_size} URLs por lote")
+    slots = asyncio.Semaphore(state.batch_concurrency)
+
+    async def scrape(url: str) -> dict:
+        async with slots:
+            try:
+                return await _scrape(state, url, no_cache)
+            except Exception as e:
+                return {"URL": url, "ERROR": str(e)}
+
+    async def stream():
+        seen = set()
+        duplicates = []
+        tasks = []
+        for value in body.urls:
+            url = build_item_url(value)
+            key = item_key(url)
+            if key in seen:
+                duplicates.append({"URL": url, "ERROR": "DUPLICATE_URL"})
+                continue
+            seen.add(key)
+            tasks.append(asyncio.create_task(scrape(url)))
+        try:
+            for row in duplicates:
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+            for task in asyncio.as_completed(tasks):
+                data = await task
+                yield json.dumps(flatten_row(data), ensure_ascii=False) + "\n"
+        finally:
+            # Si el cliente corta la conexion no se siguen scrapeando items.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/jobs", tags=["Jobs"], status_code=202)
+async def create_job_endpoint(request: Request):
+    """Crea un trabajo de scraping en segundo plano.
+
+    Acepta un JSON ``{"urls": [...]}`` (URLs o itemIds) o un CSV con columna
+    URL en el cuerpo (``content-type: text/csv``).
+
+    Args:
+        request: Request entrante con la lista de URLs o el CSV.
+
+    Returns:
+        Estado inicial del trabajo, con su ``id``.
+
+    Raises:
+        HTTPException: 400 si el cuerpo no es valido.
+    """
+    jobs: JobManager = request.app.state.jobs
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            body = BatchRequest.model_validate(await request.json())
+            job = jobs.submit_urls(build_item_url(value) for value in body.urls)
+        else:
+            job = jobs.submit_csv(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return job.to_dict()
+
+
+@app.get("/jobs", tags=["Jobs"])
+async def list_jobs_endpoint(request: Request):
+    """Lista los trabajos y su progreso.
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+
+    Returns:
+        Lista de estados de trabajos.
+    """
+    return [job.to_dict() for job in request.app.state.jobs.jobs.values()]
+
+
+@app.get("/jobs/{job_id}", tags=["Jobs"])
+async def get_job_endpoint(request: Request, job_id: str):
+    """Devuelve el progreso de un trabajo (done, ok, errores y tasa).
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+        job_id: Identificador del trabajo.
+
+    Returns:
+        Estado del trabajo.
+
+    Raises:
+        HTTPException: 404 si el trabajo no existe.
+    """
+    job = request.app.state.jobs.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo inexistente")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/results", tags=["Jobs"])
+async def get_job_results_endpoint(request: Request, job_id: str):
+    """Descarga el CSV de resultados de un trabajo (parcial si sigue en curso).
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+        job_id: Identificador del trabajo.
+
+    Returns:
+        Archivo CSV con las filas escritas hasta el momento.
+
+    Raises:
+        HTTPException: 404 si el trabajo no existe o aun no tiene resultados.
+    """
+    job = request.app.state.jobs.jobs.get(job_id)
+    if job is None or not job.output_path.exists():
+        raise HTTPException(status_code=404, detail="Resultados no disponibles")
+    return FileResponse(job.output_path, media_type="text/csv", filename=f"{job_id}.csv")
+
+
+@app.delete("/jobs/{job_id}", tags=["Jobs"])
+async def cancel_job_endpoint(request: Request, job_id: str):
+    """Cancela un trabajo encolado o en curso.
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+        job_id: Identificador del trabajo.
+
+    Returns:
+        Estado del trabajo.
+
+    Raises:
+        HTTPException: 404 si el trabajo no existe.
+    """
+    try:
+        job = request.app.state.jobs.cancel(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Trabajo inexistente") from e
+    return job.to_dict()
+
+
+@app.get("/cacheStats", tags=["Scraping"])
+async def cache_stats_endpoint(request: Request):
+    """Devuelve los contadores de la cache de resultados.
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+
+    Returns:
+        Hits, misses y tamano de la cache.
+    """
+    return request.app.state.cache.stats()
+
+
+@app.get("/stats", tags=["Scraping"])
+async def stats_endpoint(request: Request):
+    """Devuelve los contadores de cache, coalescing y refrescos de cookies.
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+
+    Returns:
+        Diccionario con las secciones ``cache``, ``coalescing``, ``cookies`` y
+        ``hedging`` (None si esta desactivado).
+    """
+    state = request.app.state
+    return {
+        "cache": state.cache.stats(),
+        "coalescing": state.singleflight.stats(),
+        "cookies": state.cookie_pool.stats(),
+        "hedging": state.hedge.stats() if state.hedge is not None else None,
+    }
+
+
+@app.get("/metrics", tags=["Scraping"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Expone las metricas del proceso en formato de texto de Prometheus.
+
+    Returns:
+        Histogramas de latencia por etapa, contadores por codigo ``ret`` y
+        resultado, refrescos de cookies y gauges de requests en vuelo y colas.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profile", tags=["Admin"])
+async def profile_status_endpoint(request: Request):
+    """Devuelve el estado del monitor del event loop y del profiler de CPU.
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+
+    Returns:
+        Diccionario con ``loop`` (lag y bloqueos) y ``cpu_profiling``.
+    """
+    state = request.app.state
+    return {"loop": state.loop_monitor.stats(), "cpu_profiling": state.profiler is not None}
+
+
+@app.post("/admin/profile", tags=["Admin"])
+async def profile_toggle_endpoint(
+    request: Request,
+    enabled: bool = Query(..., description="Activar o desactivar el monitor del event loop"),
+    threshold_ms: float | None = Query(None, description="Bloqueo minimo a loguear con su pila (ms)"),
+    cpu: bool = Query(False, description="Ademas, perfilar la CPU por muestreo hasta desactivar"),
+):
+    """Activa o desactiva el monitor del event loop (y el profiler de CPU).
+
+    Con ``enabled=true`` se mide el lag del loop y se loguea la pila de cada
+    callback que lo bloquea mas de ``threshold_ms``; con ``cpu=true`` ademas
+    se muestrean las pilas del loop. Con ``enabled=false`` se detiene todo y,
+    si habia un perfil de CPU, se guarda en ``SCRAPE_PROFILE_DIR``.
+
+    Args:
+        request: Request entrante (da acceso al estado de la aplicacion).
+        enabled: Activar o desactivar.
+        threshold_ms: Nuevo umbral de bloqueo.
+        cpu: Iniciar tambien el profiler de CPU.
+
+    Returns:
+        Estado del monitor y, al desactivar un perfil de CPU, su archivo y
+        las funciones con mas muestras.
+    """
+    state = request.app.state
+    monitor = state.loop_monitor
+    result = {}
+    if enabled:
+        if threshold_ms is not None:
+            monitor.block_threshold_s = threshold_ms / 1000
+        monitor.start()
+        if cpu and state.profiler is None:
+            profiler = SamplingProfiler()
+            try:
+                profiler.start()
+            except RuntimeError as exc:
+                raise HTTPException(status_code=409, detail=str(exc)) from exc
+            state.profiler = profiler
+    else:
+        monitor.stop()
+        if state.profiler is not None:
+            profiler, state.profiler = state.profiler, None
+            profiler.stop()
+            path = state.profile_dir / f"profile_{time.strftime('%Y%m%dT%H%M%S')}.txt"
+            profiler.write(path)
+            result["cpu_profile"] = {
+                "path": str(path),
+                "samples": profiler.samples,
+                "top": [{"function": name, "share": round(share, 4)} for name, share in profiler.top(10)],
+            }
+    result["loop"] = monitor.stats()
+    return result
 
 
 # =================================================================
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.cache import ResultCache
+
+
+def test_put_keeps_a_copy():
+    cache = ResultCache()
+    data = {"ID": "1", "ERROR": ""}
+    cache.put("1", data)
+    data["ATTEMPTS"] = 3
+    assert "ATTEMPTS" not in cache.get("1")
+
+
+def test_disk_only_cache_shares_the_sqlite_tier(tmp_path):
+    path = tmp_path / "cache.db"
+    api = ResultCache(path=path)
+    jobs = ResultCache(max_entries=0, path=path)
+    jobs.put("1", {"ID": "1", "ERROR": ""})
+    assert len(jobs) == 0
+    assert api.get("1") == {"ID": "1", "ERROR": ""}
+    api.put("2", {"ID": "2", "ERROR": ""})
+    assert jobs.get("2") == {"ID": "2", "ERROR": ""}
+    assert len(jobs) == 0
+    api.close()
+    jobs.close()
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.checkpoint import CheckpointJournal, item_key, load_resume_state
+
+URL_1 = "https://www.goofish.com/item?id=101"
+URL_2 = "https://www.goofish.com/item?id=102&spm=a"
+URL_3 = "https://www.goofish.com/item?id=103"
+
+
+def test_item_key():
+    assert item_key(URL_2) == "102"
+    assert item_key("https://www.goofish.com/otra") == "https://www.goofish.com/otra"
+
+
+def test_resume_from_journal(tmp_path):
+    journal_path = tmp_path / "out.journal"
+    with CheckpointJournal(journal_path) as journal:
+        journal.record(URL_1, "REQUEST_TIMEOUT")
+        journal.record(URL_1, "")
+        journal.record(URL_2, "FAIL_SYS_TOKEN::x")
+        journal.record(URL_2.replace("&spm=a", ""), "RGV587_ERROR")
+        journal.record(URL_3, None)
+        journal.record(URL_3, "REQUEST_TIMEOUT")
+
+    done, failed = load_resume_state(tmp_path / "missing.csv", journal_path)
+    assert "101" in done and "103" in done
+    assert len(done) == 2
+    # Se conserva la primera URL con error de cada item.
+    assert failed == {"102": URL_2}
+
+
+def test_resume_ignores_truncated_journal_line(tmp_path):
+    journal_path = tmp_path / "out.journal"
+    journal_path.write_text(f"OK\t{URL_1}\nOK", encoding="utf-8")
+    done, failed = load_resume_state(tmp_path / "out.csv", journal_path)
+    assert len(done) == 1 and failed == {}
+
+
+def test_resume_from_csv_output_without_journal(tmp_path):
+    output = tmp_path / "out.csv"
+    output.write_text(
+        "ITEM_ID,URL,ERROR\n"
+        f"101,{URL_1},\n"
+        f",{URL_2},REQUEST_TIMEOUT\n"
+        f",{URL_3}\n",  # Fila truncada al cortar la corrida.
+        encoding="utf-8",
+    )
+    done, failed = load_resume_state(output, tmp_path / "missing.journal")
+    assert "101" in done and len(done) == 1
+    assert failed == {"102": URL_2}
+
+
+def test_resume_without_previous_run(tmp_path):
+    done, failed = load_resume_state(tmp_path / "out.csv")
+    assert len(done) == 0 and failed == {}
@@ -0,0 +1,23 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.concurrency import AdaptiveConcurrency
+
+
+def test_cancel_after_wake_passes_slot_on():
+    async def scenario() -> int:
+        limiter = AdaptiveConcurrency(initial=1, minimum=1, maximum=1)
+        await limiter.acquire()
+        woken = asyncio.create_task(limiter.acquire())
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # release() despierta a ``woken``; se cancela antes de que llegue a correr.
+        limiter.release("SUCCESS", 0.01)
+        woken.cancel()
+        await asyncio.wait_for(waiting, timeout=1.0)
+        return limiter.in_flight
+
+    assert asyncio.run(scenario()) == 1
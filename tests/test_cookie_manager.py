@@ -0,0 +1,45 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.CookiePool import CookiePool
+
+URL = "https://www.goofish.com/item?id=1"
+
+
+def _cookies(ttl_s: float) -> dict:
+    return {"_m_h5_tk": f"abc_{int((time.time() + ttl_s) * 1000)}"}
+
+
+def test_close_cancels_proactive_refresh():
+    cancelled = []
+
+    async def fetch_cookies(url, use_proxy=False):
+        if not cancelled and fetch_cookies.calls:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+        fetch_cookies.calls += 1
+        return _cookies(60)  # Vence dentro del margen: dispara un refresco anticipado.
+
+    fetch_cookies.calls = 0
+
+    async def scenario() -> None:
+        pool = CookiePool(fetch_cookies, use_proxy=False, size=1, refresh_margin_s=120)
+        session = pool.sessions[0]
+        await session.ensure(URL)
+        await session.ensure(URL)
+        await asyncio.sleep(0.01)
+        assert session.proactive_refreshes == 1 and session.refreshing
+        await pool.close()
+        assert not session.refreshing
+        # Sin tareas pendientes al cerrar el loop.
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(scenario())
+    assert cancelled == [URL]
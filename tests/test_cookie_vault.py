@@ -0,0 +1,66 @@
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.cookie_vault import CookieVault, token_expiry
+
+
+def _cookies(ttl_s: float) -> dict:
+    return {"_m_h5_tk": f"abc123_{int((time.time() + ttl_s) * 1000)}", "cna": "x"}
+
+
+def test_token_expiry():
+    assert token_expiry({"_m_h5_tk": "abc_1700000000123"}) == 1700000000.123
+    assert token_expiry({"_m_h5_tk": "a_b_1700000000000"}) == 1700000000.0
+    assert token_expiry({"_m_h5_tk": "abc"}) is None
+    assert token_expiry({"_m_h5_tk": "abc_12x"}) is None
+    assert token_expiry({}) is None
+    assert token_expiry(None) is None
+
+
+def test_load_respects_min_ttl(tmp_path):
+    vault = CookieVault(tmp_path / "vault.json")
+    assert vault.load("s") is None
+    cookies = _cookies(300)
+    vault.save("s", cookies)
+    assert vault.load("s") == cookies
+    assert vault.load("s", min_ttl_s=600) is None
+    assert vault.load("otra") is None
+
+
+def test_save_drops_expired_sessions(tmp_path):
+    vault = CookieVault(tmp_path / "vault.json")
+    vault.save("vieja", _cookies(-10))
+    vault.save("nueva", _cookies(300))
+    assert vault.load("vieja") is None
+    assert "vieja" not in (tmp_path / "vault.json").read_text(encoding="utf-8")
+    assert (tmp_path / "vault.json").stat().st_mode & 0o077 == 0
+
+
+def test_corrupt_vault_reads_as_empty(tmp_path):
+    path = tmp_path / "vault.json"
+    path.write_text("{no es json", encoding="utf-8")
+    vault = CookieVault(path)
+    assert vault.load("s") is None
+    vault.save("s", _cookies(300))
+    assert vault.load("s") is not None
+
+
+def _save_many(path: Path, prefix: str) -> None:
+    vault = CookieVault(path)
+    for index in range(20):
+        vault.save(f"{prefix}{index}", _cookies(300))
+
+
+def test_concurrent_processes_do_not_lose_sessions(tmp_path):
+    path = tmp_path / "vault.json"
+    processes = [multiprocessing.Process(target=_save_many, args=(path, prefix)) for prefix in "abc"]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    vault = CookieVault(path)
+    assert all(vault.load(f"{prefix}{index}") is not None for prefix in "abc" for index in range(20))
@@ -0,0 +1,54 @@
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.count_scraped import analyze, export_duplicates
+
+BASE = "https://www.goofish.com/item?id="
+
+
+def _output(tmp_path: Path) -> Path:
+    rows = [
+        (BASE + "1", ""),
+        (BASE + "2", "REQUEST_TIMEOUT"),
+        (BASE + "1&spm=x", ""),
+        (BASE + "3", ""),
+        (BASE + "2", ""),
+        (BASE + "4", "FAIL_BIZ_ITEM_NOT_EXIST::x"),
+        ("https://www.goofish.com/otra", ""),
+        (BASE + "1", ""),
+        ("https://www.goofish.com/otra", ""),
+        (BASE + "5", "REQUEST_ERROR::ConnectError"),
+    ]
+    path = tmp_path / "out.csv"
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["URL", "ERROR"])
+        writer.writerows(rows)
+    return path
+
+
+@pytest.mark.parametrize("chunksize", [2, 3, 1000])
+def test_analyze_reports_duplicates_and_failures(tmp_path, chunksize):
+    report = analyze(_output(tmp_path), chunksize=chunksize)
+    assert report["total"] == 10
+    assert report["ok"] == 7
+    assert report["errors"] == {
+        "REQUEST_TIMEOUT": 1,
+        "FAIL_BIZ_ITEM_NOT_EXIST": 1,
+        "REQUEST_ERROR::ConnectError": 1,
+    }
+    assert report["duplicates"] == {"1": 3, "https://www.goofish.com/otra": 2}
+    assert report["repeated_ok"] == 3
+    assert report["failed"] == {"4": BASE + "4", "5": BASE + "5"}
+    assert report["unique_items"] == 6
+
+
+def test_export_duplicates(tmp_path):
+    path = tmp_path / "dups.csv"
+    export_duplicates({"7": 2, "1": 3}, path)
+    assert path.read_text(encoding="utf-8").splitlines() == ["ITEM_ID,OK_ROWS", "1,3", "7,2"]
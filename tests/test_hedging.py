@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import scrape_csv
+from utils.hedging import HedgePolicy
+
+
+class FakeSession:
+    name = "s"
+
+    @asynccontextmanager
+    async def lease(self):
+        yield self
+
+    async def ensure(self, url):
+        return {}
+
+
+def _policy(delay_s: float) -> HedgePolicy:
+    hedge = HedgePolicy(budget=1.0, min_delay_s=delay_s, min_samples=1)
+    hedge.observe(delay_s)
+    return hedge
+
+
+def test_queue_wait_does_not_trigger_hedge(monkeypatch):
+    calls = []
+
+    async def fake_attempt(url, session, cookies, timeout_s, client, concurrency, rate_limiter, on_start=None):
+        calls.append(url)
+        await asyncio.sleep(0.1)  # En cola, sin cupo.
+        on_start()
+        await asyncio.sleep(0.01)
+        return "SUCCESS::ok", None
+
+    monkeypatch.setattr(scrape_csv, "_attempt", fake_attempt)
+    hedge = _policy(0.05)
+    session = FakeSession()
+    result = asyncio.run(
+        scrape_csv._hedged_attempt("u", session, {}, session, 1.0, None, None, None, hedge)
+    )
+    assert result[0] == "SUCCESS::ok"
+    assert len(calls) == 1
+    assert hedge.hedges == 0
+
+
+def test_cancelled_worker_cancels_primary(monkeypatch):
+    cancelled = []
+
+    async def fake_attempt(url, session, cookies, timeout_s, client, concurrency, rate_limiter, on_start=None):
+        on_start()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        return "SUCCESS::ok", None
+
+    monkeypatch.setattr(scrape_csv, "_attempt", fake_attempt)
+
+    async def scenario() -> None:
+        session = FakeSession()
+        worker = asyncio.create_task(
+            scrape_csv._hedged_attempt("u", session, {}, session, 1.0, None, None, None, _policy(5.0))
+        )
+        await asyncio.sleep(0.05)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert cancelled == ["u"]
@@ -0,0 +1,63 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.idset import _HASH_MULTIPLIER, _MASK_64, ItemIdSet
+
+
+def test_add_reports_new_keys():
+    ids = ItemIdSet()
+    assert ids.add("123")
+    assert not ids.add("123")
+    assert not ids.add(123)
+    assert "123" in ids and 123 in ids
+    assert "124" not in ids
+    assert len(ids) == 1
+
+
+def test_grows_past_initial_capacity():
+    ids = ItemIdSet(capacity=4)
+    keys = random.Random(1).sample(range(10**12), 5000)
+    assert all(ids.add(str(key)) for key in keys)
+    assert len(ids) == 5000
+    assert all(str(key) in ids for key in keys)
+    assert not any(ids.add(key) for key in keys)
+
+
+def _home_slot(key: int, bits: int) -> int:
+    return ((key * _HASH_MULTIPLIER) & _MASK_64) >> (64 - bits)
+
+
+def test_colliding_keys_are_kept_apart():
+    ids = ItemIdSet(capacity=4)  # 16 slots.
+    keys = [key for key in range(10_000) if _home_slot(key, 4) == 5][:8]
+    assert all(ids.add(key) for key in keys[:7])
+    assert all(key in ids for key in keys[:7])
+    assert keys[7] not in ids
+    # Al crecer se reubican y siguen presentes.
+    assert all(ids.add(key) for key in range(20_000, 20_100))
+    assert all(key in ids for key in keys[:7])
+    assert len(ids) == 107
+
+
+def test_zero_and_non_numeric_keys():
+    ids = ItemIdSet()
+    assert ids.add("0")
+    assert ids.add("https://www.goofish.com/otra")
+    assert ids.add("12a")
+    assert ids.add("1" * 19)  # No entra en 63 bits: va al set comun.
+    assert ids.add("٣")  # Digito no ASCII.
+    assert not ids.add("https://www.goofish.com/otra")
+    assert "0" in ids and "1" * 19 in ids and "٣" in ids
+    assert "3" not in ids
+    assert len(ids) == 5
+
+
+def test_negative_int_keys_are_not_confused_with_empty_slots():
+    ids = ItemIdSet()
+    assert ids.add(-1)
+    assert -1 in ids
+    assert "-1" in ids
+    assert len(ids) == 1
@@ -0,0 +1,42 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.jobs import JobManager
+
+
+def test_prune_forgets_old_jobs_and_their_files(tmp_path):
+    async def scenario() -> None:
+        manager = JobManager(tmp_path, retention_s=60.0)
+        old = manager.submit_urls(["https://www.goofish.com/item?id=1"])
+        recent = manager.submit_urls(["https://www.goofish.com/item?id=2"])
+        running = manager.submit_urls(["https://www.goofish.com/item?id=3"])
+        old.status, old.finished_at = "done", time.time() - 120
+        recent.status, recent.finished_at = "done", time.time() - 10
+        running.status = "running"
+        # Directorio de un proceso anterior de la API.
+        orphan = tmp_path / "abc"
+        orphan.mkdir()
+        os.utime(orphan, (time.time() - 120, time.time() - 120))
+
+        assert await manager.prune() == 1
+        assert set(manager.jobs) == {recent.id, running.id}
+        assert sorted(path.name for path in tmp_path.iterdir()) == sorted([recent.id, running.id])
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_queued_job_is_eventually_pruned(tmp_path):
+    async def scenario() -> None:
+        manager = JobManager(tmp_path, retention_s=0.0)
+        job = manager.submit_urls(["https://www.goofish.com/item?id=1"])
+        manager.cancel(job.id)
+        await asyncio.sleep(0.01)
+        assert await manager.prune() == 1
+        assert manager.jobs == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.proxy_pool import Proxy, ProxyPool
+
+URL = "https://www.goofish.com/item?id=1"
+
+
+def test_cookie_fetch_failures_quarantine_and_probe():
+    calls = []
+
+    async def fetch_cookies(url, use_proxy, proxy):
+        calls.append(proxy.server)
+        raise ConnectionError("proxy caido")
+
+    async def attempt(pool: ProxyPool) -> None:
+        async with pool.lease() as session:
+            await session.ensure(URL)
+
+    async def scenario() -> None:
+        pool = ProxyPool(fetch_cookies, [Proxy("127.0.0.1:1")], max_consecutive_errors=2, quarantine_s=0.05)
+        health = pool.health[0]
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await attempt(pool)
+        assert health.state == "quarantined"
+        assert health.quarantines == 1
+
+        time.sleep(0.06)
+        assert health.state == "probing"
+        assert health.available(in_flight=0)
+        with pytest.raises(ConnectionError):
+            await attempt(pool)
+        # La prueba fallo: vuelve a cuarentena por el doble de tiempo.
+        assert health.state == "quarantined"
+        assert health.quarantines == 2
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
@@ -0,0 +1,49 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.rate_limit import RateLimiter, TokenBucket
+
+
+def test_bucket_reserves_ahead_and_refunds():
+    bucket = TokenBucket(rate=10.0, burst=1.0)
+    now = time.monotonic()
+    assert bucket.reserve(now) == 0.0
+    assert abs(bucket.reserve(now) - 0.1) < 1e-6
+    bucket.refund()
+    assert abs(bucket.reserve(now) - 0.1) < 1e-6
+
+
+def test_penalized_session_does_not_reserve_global_tokens():
+    async def scenario() -> float:
+        limiter = RateLimiter(rate=10.0, burst=1.0, backoff_s=0.2)
+        limiter.penalize("bad")
+        blocked = asyncio.create_task(limiter.acquire("bad"))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        await limiter.acquire("good")
+        elapsed = time.monotonic() - started
+        blocked.cancel()
+        return elapsed
+
+    # Con el token del bucket reservado por "bad", "good" esperaria 0.1 s.
+    assert asyncio.run(scenario()) < 0.05
+
+
+def test_cancelled_wait_refunds_tokens():
+    async def scenario() -> float:
+        limiter = RateLimiter(rate=10.0, burst=1.0)
+        await limiter.acquire("a")
+        waiting = asyncio.create_task(limiter.acquire("a"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        started = time.monotonic()
+        await limiter.acquire("b")
+        return time.monotonic() - started
+
+    # Sin devolver la reserva cancelada, "b" esperaria ~0.19 s.
+    assert asyncio.run(scenario()) < 0.12
@@ -0,0 +1,12 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.retry import RetryScheduler, parse_budgets
+
+
+def test_exceptions_are_not_retried_by_default():
+    scheduler = RetryScheduler(parse_budgets(""))
+    assert not scheduler.defer("u", 1, "EXCEPTION::KeyError")
+    assert scheduler.defer("u", 1, "REQUEST_TIMEOUT")
@@ -0,0 +1,59 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import scrape_csv
+from utils.concurrency import AdaptiveConcurrency
+
+
+class FakeSession:
+    name = "s"
+
+    @asynccontextmanager
+    async def lease(self):
+        yield self
+
+    async def ensure(self, url):
+        return {}
+
+
+def test_success_without_item_is_an_error(monkeypatch):
+    async def fake_attempt(*args, **kwargs):
+        return "SUCCESS::调用成功", None
+
+    monkeypatch.setattr(scrape_csv, "_attempt", fake_attempt)
+    data = asyncio.run(scrape_csv._fetch_one("u", FakeSession(), 0, 1.0, None, None, None))
+    assert data == {"URL": "u", "ERROR": "DECODE_EMPTY"}
+
+
+def test_rate_token_is_reserved_after_the_concurrency_slot(monkeypatch):
+    reserved = []
+
+    class FakeLimiter:
+        async def acquire(self, key):
+            reserved.append(key)
+
+    async def fake_fetch(url, cookies, use_proxy=False, client=None):
+        return "SUCCESS::ok", None
+
+    monkeypatch.setattr(scrape_csv, "fetch_product", fake_fetch)
+
+    async def scenario() -> None:
+        concurrency = AdaptiveConcurrency(initial=1, minimum=1, maximum=1)
+        await concurrency.acquire()
+        session = FakeSession()
+        session.use_proxy, session.client = False, None
+        session.report = lambda ret, elapsed: None
+        queued = asyncio.create_task(
+            scrape_csv._attempt("u", session, {}, 1.0, None, concurrency, FakeLimiter())
+        )
+        await asyncio.sleep(0.01)
+        assert reserved == []
+        concurrency.release("SUCCESS", 0.01)
+        assert await queued == ("SUCCESS::ok", None)
+        assert reserved == ["s"]
+
+    asyncio.run(scenario())
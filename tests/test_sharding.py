@@ -0,0 +1,62 @@
+import sys
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.sharding import merge_parts, part_path, shard_of
+
+
+def test_shard_of_is_stable_crc32():
+    assert shard_of("123456", 4) == zlib.crc32(b"123456") % 4
+    assert shard_of("123456", 1) == 0
+    counts = [0] * 4
+    for item_id in range(4000):
+        counts[shard_of(str(item_id), 4)] += 1
+    assert min(counts) > 800
+
+
+def test_part_path():
+    assert part_path(Path("data/out.csv"), 3) == Path("data/out.part3.csv")
+    assert part_path(Path("out.journal"), 0) == Path("out.part0.journal")
+
+
+def _write_parts(tmp_path: Path, *contents: str) -> list[Path]:
+    parts = []
+    for index, content in enumerate(contents):
+        part = tmp_path / f"out.part{index}.csv"
+        part.write_bytes(content.encode("utf-8"))
+        parts.append(part)
+    return parts
+
+
+def test_merge_keeps_a_single_header(tmp_path):
+    parts = _write_parts(tmp_path, "A,B\r\n1,2\r\n", "A,B\r\n3,4\r\n")
+    parts.append(tmp_path / "out.part9.csv")  # Shard sin salida.
+    target = tmp_path / "out.csv"
+    merge_parts(parts, target, append=False, has_header=True)
+    assert target.read_bytes() == b"A,B\r\n1,2\r\n3,4\r\n"
+    assert not any(part.exists() for part in parts)
+
+
+def test_merge_appends_without_repeating_header(tmp_path):
+    target = tmp_path / "out.csv"
+    target.write_bytes(b"A,B\r\n0,0\r\n")
+    parts = _write_parts(tmp_path, "A,B\r\n1,2\r\n")
+    merge_parts(parts, target, append=True, has_header=True)
+    assert target.read_bytes() == b"A,B\r\n0,0\r\n1,2\r\n"
+
+
+def test_merge_remaps_rows_to_an_older_header(tmp_path):
+    target = tmp_path / "out.csv"
+    target.write_bytes(b"B,A\r\n0,0\r\n")
+    parts = _write_parts(tmp_path, "A,B,C\r\n1,2,3\r\n", "A,B,C\r\n4,\"5,5\",6\r\n")
+    merge_parts(parts, target, append=True, has_header=True)
+    assert target.read_bytes() == b"B,A\r\n0,0\r\n2,1\r\n\"5,5\",4\r\n"
+
+
+def test_merge_without_header(tmp_path):
+    parts = _write_parts(tmp_path, "OK\ta\n", "OK\tb\n")
+    target = tmp_path / "out.journal"
+    merge_parts(parts, target, append=False, has_header=False)
+    assert target.read_bytes() == b"OK\ta\nOK\tb\n"
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.checkpoint import CheckpointJournal
+from utils.sinks import Sink, SinkWriter, detect_format, iter_status, open_sink
+
+FIELDS = ["ITEM_ID", "TITLE", "IMAGES", "URL", "ERROR"]
+ROWS = [
+    {"ITEM_ID": "1", "TITLE": "a,b", "IMAGES": ["x.jpg", "y.jpg"], "URL": "u1", "ERROR": ""},
+    {"ITEM_ID": "", "TITLE": "", "IMAGES": [], "URL": "u2", "ERROR": "REQUEST_TIMEOUT"},
+]
+
+
+def _write(path: Path, fields: list[str], rows: list[dict], append: bool = False) -> None:
+    sink = open_sink(path, fields, append)
+    sink.write_rows(rows)
+    sink.close()
+
+
+def test_detect_format():
+    assert detect_format(Path("out.JSONL")) == "jsonl"
+    assert detect_format(Path("out.sqlite3")) == "sqlite"
+    assert detect_format(Path("out.txt")) == "csv"
+    assert detect_format(Path("out.csv"), "parquet") == "parquet"
+    with pytest.raises(ValueError):
+        detect_format(Path("out.csv"), "xml")
+
+
+def test_sink_requires_write_rows():
+    with pytest.raises(TypeError):
+        Sink(Path("out"), FIELDS, False)
+
+
+@pytest.mark.parametrize("name", ["out.csv", "out.jsonl", "out.db"])
+def test_iter_status_reads_back_each_format(tmp_path, name):
+    path = tmp_path / name
+    _write(path, FIELDS, ROWS)
+    _write(path, FIELDS, ROWS[:1], append=True)
+    assert list(iter_status(path)) == [("u1", ""), ("u2", "REQUEST_TIMEOUT"), ("u1", "")]
+
+
+def test_csv_serializes_lists_as_json(tmp_path):
+    path = tmp_path / "out.csv"
+    _write(path, FIELDS, ROWS)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == ",".join(FIELDS)
+    assert lines[1] == '1,"a,b","[""x.jpg"", ""y.jpg""]",u1,'
+
+
+def test_csv_append_keeps_existing_header(tmp_path):
+    path = tmp_path / "out.csv"
+    path.write_text("URL,ITEM_ID,ERROR\r\nu0,0,\r\n", encoding="utf-8")
+    _write(path, FIELDS, ROWS, append=True)
+    assert path.read_bytes() == b"URL,ITEM_ID,ERROR\r\nu0,0,\r\nu1,1,\r\nu2,,REQUEST_TIMEOUT\r\n"
+
+
+def test_jsonl_keeps_lists(tmp_path):
+    path = tmp_path / "out.jsonl"
+    _write(path, FIELDS, ROWS)
+    first = json.loads(path.read_text(encoding="utf-8").splitlines()[0])
+    assert first["IMAGES"] == ["x.jpg", "y.jpg"]
+
+
+def test_sqlite_append_adds_new_columns(tmp_path):
+    path = tmp_path / "out.db"
+    _write(path, ["URL", "ERROR"], [{"URL": "u0", "ERROR": ""}])
+    _write(path, FIELDS, ROWS, append=True)
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT URL, ITEM_ID, IMAGES FROM products ORDER BY rowid").fetchall()
+    conn.close()
+    assert rows == [
+        ("u0", None, None),
+        ("u1", "1", '["x.jpg", "y.jpg"]'),
+        ("u2", "", "[]"),
+    ]
+
+
+def test_sqlite_without_append_replaces_table(tmp_path):
+    path = tmp_path / "out.db"
+    _write(path, FIELDS, ROWS)
+    _write(path, FIELDS, ROWS[1:])
+    assert list(iter_status(path)) == [("u2", "REQUEST_TIMEOUT")]
+
+
+def test_writer_flushes_batches_and_journal(tmp_path):
+    path = tmp_path / "out.jsonl"
+    journal_path = tmp_path / "out.journal"
+
+    async def scenario() -> list[int]:
+        journal = CheckpointJournal(journal_path)
+        writer = SinkWriter(open_sink(path, FIELDS, False), batch_size=2, flush_interval_s=0.05, journal=journal)
+        writer.start()
+        sizes = []
+        for row in ROWS:
+            await writer.put(row)
+        await asyncio.sleep(0.02)
+        sizes.append(len(path.read_text(encoding="utf-8").splitlines()))
+        # Una fila sola se escribe al vencer flush_interval_s.
+        await writer.put(ROWS[0])
+        await asyncio.sleep(0.1)
+        sizes.append(len(path.read_text(encoding="utf-8").splitlines()))
+        await writer.close()
+        journal.close()
+        return sizes
+
+    assert asyncio.run(scenario()) == [2, 3]
+    assert journal_path.read_text(encoding="utf-8") == "OK\tu1\nREQUEST_TIMEOUT\tu2\nOK\tu1\n"
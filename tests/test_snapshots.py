@@ -0,0 +1,63 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.snapshots import SnapshotStore, content_hash
+
+URLS = [f"https://www.goofish.com/item?id={100 + i}" for i in range(4)]
+
+
+def test_content_hash_ignores_run_fields_and_order():
+    data = {"ITEM_ID": "1", "PRICE": "10", "URL": "a", "ERROR": "", "ATTEMPTS": 1}
+    same = {"PRICE": "10", "ITEM_ID": "1", "URL": "b", "ATTEMPTS": 3}
+    assert content_hash(data) == content_hash(same)
+    assert content_hash(data) != content_hash(dict(data, PRICE="11"))
+
+
+def test_record_reports_changed_fields(tmp_path):
+    store = SnapshotStore(tmp_path / "snap.db")
+    store.register(URLS[:1])
+    data = {"URL": URLS[0], "PRICE": "10", "TITLE": "a", "ATTEMPTS": 1}
+    assert store.record(data) is None
+    assert store.record(dict(data, ATTEMPTS=2)) == []
+    assert store.record(dict(data, PRICE="12", SOLD="1")) == ["PRICE", "SOLD"]
+    assert store.stats() == {"items": 1, "pending": 0, "changed_ever": 1}
+
+
+def test_register_ignores_known_items(tmp_path):
+    store = SnapshotStore(tmp_path / "snap.db")
+    assert store.register(URLS) == 4
+    assert store.register(URLS[:2] + [URLS[0] + "&spm=x"]) == 0
+    assert len(store) == 4
+
+
+def _age(store: SnapshotStore, url: str, age_s: float, checks: int, changes: int) -> None:
+    store.record({"URL": url, "PRICE": "1"})
+    store._conn.execute(
+        "UPDATE snapshots SET scraped_at = ?, checks = ?, changes = ? WHERE url = ?",
+        (time.time() - age_s, checks, changes, url),
+    )
+
+
+def test_due_orders_by_age_and_volatility(tmp_path):
+    store = SnapshotStore(tmp_path / "snap.db")
+    store.register(URLS)
+    _age(store, URLS[0], 7200, checks=8, changes=0)  # Viejo y estable.
+    _age(store, URLS[1], 4000, checks=8, changes=8)  # Cambia siempre.
+    _age(store, URLS[2], 60, checks=1, changes=0)  # Reciente.
+    # URLS[3] nunca se intento: va primero.
+    assert store.due(10, min_age_s=3600) == [URLS[3], URLS[1], URLS[0]]
+    assert store.due(2, min_age_s=3600) == [URLS[3], URLS[1]]
+
+
+def test_touch_counts_failed_attempts(tmp_path):
+    store = SnapshotStore(tmp_path / "snap.db")
+    store.register(URLS[:1])
+    store.touch(URLS[0])
+    assert store.due(10, min_age_s=0) == [URLS[0]]
+    assert store.due(10, min_age_s=60) == []
+    # Sigue sin datos: el proximo exito no cuenta como cambio.
+    assert store.stats()["pending"] == 1
+    assert store.record({"URL": URLS[0], "PRICE": "1"}) is None
@@ -0,0 +1,92 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.work_queue import WorkQueue
+
+URLS = [f"https://www.goofish.com/item?id={100 + i}" for i in range(5)]
+
+
+def _queue(tmp_path: Path, **kwargs) -> WorkQueue:
+    queue = WorkQueue(tmp_path / "queue.db", **kwargs)
+    queue.enqueue(URLS)
+    return queue
+
+
+def test_enqueue_ignores_known_items(tmp_path):
+    queue = _queue(tmp_path)
+    assert queue.enqueue([URLS[0], URLS[0] + "&spm=x", "https://www.goofish.com/item?id=999"]) == 1
+    assert queue.remaining() == 6
+
+
+def test_claim_in_batches(tmp_path):
+    queue = _queue(tmp_path)
+    first = queue.claim("a", 2)
+    second = queue.claim("b", 10)
+    assert len(first) == 2
+    assert len(second) == 3
+    assert set(first + second) == set(URLS)
+    assert queue.claim("c", 10) == []
+    assert queue.remaining(exclude_owner="a") == 3
+    assert queue.stats()["leased"] == 5
+
+
+def test_expired_lease_is_reclaimed_by_another_owner(tmp_path):
+    queue = _queue(tmp_path, lease_s=0.05)
+    claimed = queue.claim("a", 2)
+    assert queue.claim("b", 2) == URLS[2:4]
+    time.sleep(0.06)
+    assert sorted(queue.claim("b", 10)) == sorted(claimed + URLS[2:])
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    queue = _queue(tmp_path, lease_s=0.1)
+    queue.claim("a", 10)
+    for _ in range(3):
+        time.sleep(0.05)
+        assert queue.heartbeat("a") == 5
+    assert queue.claim("b", 10) == []
+
+
+def test_lease_expired_after_max_claims(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.db", lease_s=0.05, max_claims=2)
+    queue.enqueue(URLS[:1])
+    for owner in ("a", "b"):
+        assert queue.claim(owner, 1) == URLS[:1]
+        time.sleep(0.06)
+    assert queue.claim("c", 1) == []
+    assert queue.remaining() == 0
+    assert list(queue.results()) == [{"URL": URLS[0], "ERROR": "LEASE_EXPIRED"}]
+    assert queue.stats()["errors"] == 1
+
+
+def test_ack_is_idempotent(tmp_path):
+    queue = _queue(tmp_path)
+    url = queue.claim("a", 1)[0]
+    assert queue.ack({"URL": url, "TITLE": "x"}, "a")
+    assert not queue.ack({"URL": url, "TITLE": "y"}, "a")
+    assert list(queue.results()) == [{"URL": url, "TITLE": "x"}]
+
+
+def test_late_ack_after_reclaim_is_discarded(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.db", lease_s=0.05)
+    queue.enqueue(URLS[:1])
+    url = queue.claim("a", 1)[0]
+    time.sleep(0.06)
+    assert queue.claim("b", 1) == [url]
+    assert queue.ack({"URL": url, "TITLE": "b"}, "b")
+    assert not queue.ack({"URL": url, "TITLE": "a"}, "a")
+    assert list(queue.results()) == [{"URL": url, "TITLE": "b"}]
+
+
+def test_release_returns_unfinished_items(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.db", max_claims=1)
+    queue.enqueue(URLS)
+    claimed = queue.claim("a", 3)
+    queue.ack({"URL": claimed[0]}, "a")
+    assert queue.release("a") == 2
+    assert queue.stats() == {"pending": 4, "leased": 0, "done": 1, "expired": 0, "errors": 0}
+    # Liberar no cuenta como reclamo: con max_claims=1 se pueden volver a tomar.
+    assert sorted(queue.claim("b", 10)) == sorted(claimed[1:] + URLS[3:])
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from playwright.async_api import Browser, async_playwright
+from playwright_stealth import Stealth
+
+from utils.scraping_repository import USER_AGENT, _build_proxy_settings
+
+if TYPE_CHECKING:
+    from utils.proxy_pool import Proxy
+
+logger = logging.getLogger(__name__)
+
+
+def _process_tree_rss_mb(root_pid: int) -> float | None:
+    """Suma la memoria residente de los procesos hijos de ``root_pid``.
+
+    Playwright lanza el driver y Chromium como descendientes del proceso
+    actual, por lo que esta suma aproxima la memoria usada por el navegador.
+
+    Args:
+        root_pid: PID raiz cuyos descendientes se miden.
+
+    Returns:
+        Memoria en MiB, o None si ``/proc`` no esta disponible.
+    """
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    children: dict[int, list[int]] = {}
+    rss_pages: dict[int, int] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        fields = stat[stat.rindex(")") + 2 :].split()
+        pid = int(entry.name)
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss_pages[pid] = int(fields[21])
+
+    total_pages = 0
+    pending = list(children.get(root_pid, []))
+    while pending:
+        pid = pending.pop()
+        total_pages += rss_pages.get(pid, 0)
+        pending.extend(children.get(pid, []))
+    return total_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class BrowserService:
+    """Chromium persistente para refrescar cookies sin relanzar el navegador.
+
+    Cada refresh abre un contexto incognito nuevo sobre el mismo navegador, con
+    un maximo de contextos simultaneos. El navegador se recicla despues de
+    ``recycle_after`` refrescos o si su memoria supera ``max_memory_mb``; el
+    navegador retirado se cierra cuando terminan sus contextos activos.
+
+    Attributes:
+        launches: Cantidad de veces que se lanzo Chromium.
+        refreshes: Cantidad total de refrescos de cookies realizados.
+    """
+    def __init__(
+        self,
+        max_contexts: int = 2,
+        recycle_after: int = 200,
+        max_memory_mb: float | None = 1500.0,
+        headless: bool = True,
+        settle_ms: int = 2000,
+        navigation_timeout_ms: int = 60000,
+    ):
+        """Configura el servicio; el navegador se lanza en el primer uso.
+
+        Args:
+            max_contexts: Maximo de contextos (refrescos) en paralelo.
+            recycle_after: Refrescos tras los cuales se recicla el navegador.
+            max_memory_mb: Limite de memoria del navegador en MiB (None desactiva).
+            headless: Indica si Chromium corre sin interfaz.
+            settle_ms: Espera maxima a que aparezca ``_m_h5_tk`` tras cargar.
+            navigation_timeout_ms: Timeout de navegacion en milisegundos.
+        """
+        self._slots = asyncio.Semaphore(max(1, max_contexts))
+        self._lock = asyncio.Lock()
+        self._recycle_after = recycle_after
+        self._max_memory_mb = max_memory_mb
+        self._headless = headless
+        self._settle_ms = settle_ms
+        self._navigation_timeout_ms = navigation_timeout_ms
+        self._manager = None
+        self._playwright = None
+        self._browser: Browser | None = None
+        self._browser_refreshes = 0
+        self._active: dict[Browser, int] = {}
+        self.launches = 0
+        self.refreshes = 0
+
+    async def __aenter__(self) -> "BrowserService":
+        """Permite usar el servicio con ``async with``."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Cierra el navegador al salir del bloque ``async with``."""
+        await self.close()
+
+    async def start(self) -> None:
+        """Lanza Chromium por adelantado para que el primer refresh sea rapido."""
+        await self._ensure_browser()
+
+    async def close(self) -> None:
+        """Cierra todos los navegadores y detiene Playwright."""
+        async with self._lock:
+            browsers = set(self._active)
+            if self._browser is not None:
+                browsers.add(self._browser)
+            for browser in browsers:
+                try:
+                    await browser.close()
+                except Exception as exc:
+                    logger.warning("Error cerrando navegador: %s", exc)
+            self._active.clear()
+            self._browser = None
+            if self._manager is not None:
+                await self._manager.__aexit__(None, None, None)
+            self._manager = None
+            self._playwright = None
+
+    async def _ensure_browser(self) -> Browser:
+        """Devuelve el navegador vigente, lanzandolo si no existe o se cayo.
+
+        Returns:
+            Navegador Chromium conectado.
+        """
+        async with self._lock:
+            if self._playwright is None:
+                self._manager = Stealth().use_async(async_playwright())
+                self._playwright = await self._manager.__aenter__()
+            if self._browser is None or not self._browser.is_connected():
+                logger.info("Lanzando Chromium persistente...")
+                self._browser = await self._playwright.chromium.launch(headless=self._headless)
+                self._browser_refreshes = 0
+                self.launches += 1
+            return self._browser
+
+    def _should_recycle(self) -> bool:
+        """Indica si el navegador vigente alcanzo su limite de uso o memoria."""
+        if self._recycle_after and self._browser_refreshes >= self._recycle_after:
+            return True
+        if self._max_memory_mb:
+            rss_mb = _process_tree_rss_mb(os.getpid())
+            if rss_mb is not None and rss_mb > self._max_memory_mb:
+                logger.info("Memoria del navegador %.0f MiB supera el limite", rss_mb)
+                return True
+        return False
+
+    async def _release(self, browser: Browser) -> None:
+        """Libera un contexto y recicla o cierra navegadores si corresponde.
+
+        Args:
+            browser: Navegador en el que corrio el contexto liberado.
+        """
+        async with self._lock:
+            self._active[browser] -= 1
+            if browser is self._browser:
+                self._browser_refreshes += 1
+                if self._should_recycle():
+                    logger.info("Reciclando Chromium tras %d refrescos", self._browser_refreshes)
+                    self._browser = None
+            if browser is not self._browser and self._active[browser] == 0:
+                del self._active[browser]
+                try:
+                    await browser.close()
+                except Exception as exc:
+                    logger.warning("Error cerrando navegador: %s", exc)
+
+    async def fetch_cookies(self, target_url: str, use_proxy: bool = False, proxy: "Proxy | None" = None) -> dict:
+        """Obtiene cookies frescas en un contexto incognito del navegador persistente.
+
+        Tiene la misma firma que ``get_fresh_cookies`` para poder usarse como
+        callback de ``CookieManager`` y ``CookiePool``.
+
+        Args:
+            target_url: URL que se visita para generar cookies.
+            use_proxy: Indica si el contexto navega a traves del proxy.
+            proxy: Proxy explicito del contexto (p. ej. uno de ``ProxyPool``);
+                tiene prioridad sobre ``use_proxy``.
+
+        Returns:
+            Diccionario de cookies obtenidas desde el navegador.
+        """
+        if proxy is not None:
+            proxy_settings = proxy.playwright_settings()
+        else:
+            proxy_settings, _ = _build_proxy_settings(use_proxy)
+        async with self._slots:
+            browser = await self._ensure_browser()
+            self._active[browser] = self._active.get(browser, 0) + 1
+            started = time.perf_counter()
+            try:
+                context = await browser.new_context(user_agent=USER_AGENT, proxy=proxy_settings)
+                try:
+                    page = await context.new_page()
+                    await page.goto(
+                        target_url,
+                        wait_until="domcontentloaded",
+                        timeout=self._navigation_timeout_ms,
+                    )
+                    cookies_list = await context.cookies()
+                    deadline = time.monotonic() + self._settle_ms / 1000
+                    while not any(c["name"] == "_m_h5_tk" for c in cookies_list) and time.monotonic() < deadline:
+                        await page.wait_for_timeout(100)
+                        cookies_list = await context.cookies()
+                finally:
+                    await context.close()
+            finally:
+                await self._release(browser)
+            self.refreshes += 1
+
+        cookies_dict = {c["name"]: c["value"] for c in cookies_list}
+        logger.info(
+            "Cookies obtenidas en %.2fs: %d cookies (_m_h5_tk %s)",
+            time.perf_counter() - started,
+            len(cookies_dict),
+            "ok" if "_m_h5_tk" in cookies_dict else "missing",
+        )
+        return cookies_dict
@@ -1,6 +1,15 @@
 import asyncio
 import logging
-from typing import Awaitable, Callable
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable
+
+from utils.cookie_vault import CookieVault, token_expiry
+from utils.metrics import COOKIE_REFRESHES, STAGE_SECONDS
+from utils.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
@@ -8,27 +17,112 @@ logger = logging.getLogger(__name__)
 class CookieManager:
     """Gestiona cookies en memoria para scraping concurrente.
 
+    Las obtenciones de cookies son single-flight: si varias tareas piden
+    cookies (o un refresh) a la vez, se abre el navegador una sola vez y
+    todas reciben el mismo resultado.
+
+    Si se conoce el vencimiento del ``_m_h5_tk``, un token ya vencido se
+    renueva antes de usarlo (sin gastar una request en un error de token) y
+    uno que vence dentro de ``refresh_margin_s`` se renueva en segundo plano
+    mientras se sigue usando. Con una ``CookieVault`` las cookies se
+    comparten con otros procesos y sobreviven a reinicios.
+
     Attributes:
         use_proxy: Indica si se usa proxy al obtener cookies.
+        name: Identificador de la sesion (util en logs y pools).
+        in_flight: Requests que estan usando la sesion en este momento.
+        coalesced_refreshes: Pedidos de refresh resueltos sin abrir el
+            navegador (se sumaron a uno en curso o ya estaban renovadas).
+        client: Cliente HTTP propio de la sesion (p. ej. el de su proxy); si
+            es None se usa el cliente compartido.
+        refresh_margin_s: Anticipacion con la que se renueva un token.
+        proactive_refreshes: Refrescos lanzados antes de que venza el token.
+        vault_hits: Obtenciones resueltas con cookies de la boveda.
     """
     def __init__(
         self,
         fetch_cookies: Callable[[str, bool], Awaitable[dict]],
         use_proxy: bool,
+        name: str = "default",
+        client: "httpx.AsyncClient | None" = None,
+        on_response: Callable[[str, float], None] | None = None,
+        vault: CookieVault | None = None,
+        refresh_margin_s: float = 120.0,
     ):
         """Inicializa el gestor con el callback de obtencion de cookies.
 
         Args:
             fetch_cookies: Funcion async que obtiene cookies para una URL.
             use_proxy: Indica si se usa proxy al obtener cookies.
+            name: Identificador de la sesion.
+            client: Cliente HTTP propio de la sesion.
+            on_response: Callback ``(ret, segundos)`` invocado con cada
+                respuesta obtenida con esta sesion.
+            vault: Boveda en disco donde buscar y guardar las cookies.
+            refresh_margin_s: Segundos antes del vencimiento del token en que
+                se lanza el refresco en segundo plano.
         """
         self._fetch_cookies = fetch_cookies
         self.use_proxy = use_proxy
+        self.name = name
+        self.client = client
+        self._on_response = on_response
+        self.in_flight = 0
+        self.coalesced_refreshes = 0
+        self.refresh_margin_s = refresh_margin_s
+        self.proactive_refreshes = 0
+        self.vault_hits = 0
+        self._vault = vault
+        # Las cookies quedan atadas a la IP: con proxy son otra sesion.
+        self._vault_key = f"{name}|proxy" if use_proxy else name
         self._cookies = None
-        self._lock = asyncio.Lock()
+        self._expires_at: float | None = None
+        self._background: asyncio.Task | None = None
+        self._fetches = SingleFlight()
+
+    @property
+    def refreshing(self) -> bool:
+        """Indica si la sesion esta obteniendo cookies en este momento."""
+        return self._fetches.in_flight > 0
+
+    @property
+    def expires_at(self) -> float | None:
+        """Vencimiento (timestamp) del token actual, si se conoce."""
+        return self._expires_at
+
+    @property
+    def fetches(self) -> int:
+        """Obtenciones de cookies realmente ejecutadas con el navegador."""
+        return self._fetches.calls - self._fetches.coalesced - self.vault_hits
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator["CookieManager"]:
+        """Reserva la sesion mientras dura una request.
+
+        Permite usar un ``CookieManager`` suelto con la misma interfaz que
+        ``CookiePool``.
+
+        Yields:
+            La propia sesion.
+        """
+        self.in_flight += 1
+        try:
+            yield self
+        finally:
+            self.in_flight -= 1
+
+    def report(self, ret: str, elapsed_s: float) -> None:
+        """Informa el resultado de una request hecha con la sesion.
+
+        Args:
+            ret: Codigo ``ret`` o error de red del intento.
+            elapsed_s: Duracion del intento en segundos.
+        """
+        if self._on_response is not None:
+            self._on_response(ret, elapsed_s)
 
     async def ensure(self, url: str) -> dict:
-        """Devuelve cookies existentes o las obtiene una sola vez con lock.
+        """Devuelve cookies existentes o las obtiene una sola vez.
 
         Args:
             url: URL objetivo usada para obtener cookies si faltan.
@@ -37,21 +131,86 @@ class CookieManager:
             Diccionario de cookies en memoria.
         """
         if self._cookies is None:
-            async with self._lock:
-                if self._cookies is None:
-                    self._cookies = await self._fetch_cookies(url, use_proxy=self.use_proxy)
+            return await self._fetches.do(self.name, lambda: self._fetch(url))
+        if self._expires_at is not None:
+            remaining_s = self._expires_at - time.time()
+            if remaining_s <= 0:
+                return await self.refresh(url, stale=self._cookies)
+            if remaining_s < self.refresh_margin_s and not self.refreshing:
+                self._refresh_in_background(url)
         return self._cookies
 
-    async def refresh(self, url: str) -> dict:
+    def _refresh_in_background(self, url: str) -> None:
+        """Lanza un refresh sin esperar; las requests siguen con el token actual."""
+        self.proactive_refreshes += 1
+        self._background = asyncio.create_task(self.refresh(url, stale=self._cookies))
+        self._background.add_done_callback(self._background_done)
+
+    async def close(self) -> None:
+        """Cancela el refresco anticipado y las obtenciones de cookies en curso.
+
+        Se llama al apagar, antes de cerrar el navegador y los clientes que
+        esas obtenciones usarian.
+        """
+        task, self._background = self._background, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self._fetches.close()
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Fallo el refresco anticipado de cookies (%s): %r", self.name, task.exception())
+
+    async def refresh(self, url: str, stale: dict | None = None) -> dict:
         """Fuerza la actualizacion de cookies en el cache.
 
+        El refresh es single-flight: las tareas que lo piden mientras otro
+        esta en curso esperan ese mismo resultado, y si se indica ``stale`` y
+        esas cookies ya fueron reemplazadas se devuelven las nuevas sin
+        volver a abrir el navegador.
+
         Args:
             url: URL objetivo usada para obtener cookies nuevas.
+            stale: Cookies que fallaron y motivaron el refresh.
 
         Returns:
             Diccionario de cookies actualizadas.
         """
-        async with self._lock:
-            logger.info("Refrescando cookies...")
-            self._cookies = await self._fetch_cookies(url, use_proxy=self.use_proxy)
+        if self.refreshing or (stale is not None and self._cookies is not stale):
+            self.coalesced_refreshes += 1
+            if not self.refreshing:
+                return self._cookies
+        return await self._fetches.do(self.name, lambda: self._fetch(url))
+
+    async def _fetch(self, url: str) -> dict:
+        """Obtiene cookies nuevas y las guarda en el cache.
+
+        Args:
+            url: URL objetivo usada para obtener cookies.
+
+        Returns:
+            Diccionario de cookies obtenidas.
+        """
+        if self._vault is not None:
+            # Otro proceso (o una corrida anterior) puede tener cookies vigentes;
+            # las que acaban de fallar no sirven aunque esten en la boveda.
+            stored = self._vault.load(self._vault_key, min_ttl_s=self.refresh_margin_s)
+            if stored is not None and stored != self._cookies:
+                self.vault_hits += 1
+                self._store(stored)
+                return self._cookies
+        if self._cookies is not None:
+            logger.info("Refrescando cookies (%s)...", self.name)
+        COOKIE_REFRESHES.inc(session=self.name)
+        with STAGE_SECONDS.time(stage="cookie_fetch"):
+            cookies = await self._fetch_cookies(url, use_proxy=self.use_proxy)
+        self._store(cookies)
+        if self._vault is not None and self._expires_at is not None:
+            self._vault.save(self._vault_key, cookies)
         return self._cookies
+
+    def _store(self, cookies: dict) -> None:
+        """Reemplaza las cookies en memoria y su vencimiento."""
+        self._cookies = cookies
+        self._expires_at = token_expiry(cookies)
@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+from utils.CookieManager import CookieManager
+from utils.cookie_vault import CookieVault
+
+
+class CookiePool:
+    """Pool de sesiones de cookies compartido por todos los workers.
+
+    Cada sesion es un ``CookieManager`` independiente. Los workers reservan
+    una sesion por request (la menos cargada) y, ante un error de token, solo
+    se refresca esa sesion. Las obtenciones de cookies pasan por un semaforo
+    global para que una expiracion no dispare varios navegadores a la vez.
+
+    Attributes:
+        use_proxy: Indica si se usa proxy al obtener cookies.
+        sessions: Sesiones de cookies administradas por el pool.
+    """
+    def __init__(
+        self,
+        fetch_cookies: Callable[[str, bool], Awaitable[dict]],
+        use_proxy: bool,
+        size: int = 2,
+        max_concurrent_refreshes: int = 1,
+        vault: CookieVault | None = None,
+        refresh_margin_s: float = 120.0,
+    ):
+        """Crea el pool con ``size`` sesiones vacias (se llenan bajo demanda).
+
+        Args:
+            fetch_cookies: Funcion async que obtiene cookies para una URL.
+            use_proxy: Indica si se usa proxy al obtener cookies.
+            size: Cantidad de sesiones de cookies.
+            max_concurrent_refreshes: Maximo de obtenciones de cookies en paralelo.
+            vault: Boveda de cookies compartida por las sesiones.
+            refresh_margin_s: Anticipacion del refresco de tokens por vencer.
+        """
+        self._fetch_cookies = fetch_cookies
+        self.use_proxy = use_proxy
+        self._refresh_slots = asyncio.Semaphore(max(1, max_concurrent_refreshes))
+        self._round_robin = itertools.count()
+        self.sessions = [
+            CookieManager(
+                self._guarded_fetch,
+                use_proxy=use_proxy,
+                name=f"session-{index}",
+                vault=vault,
+                refresh_margin_s=refresh_margin_s,
+            )
+            for index in range(max(1, size))
+        ]
+
+    async def _guarded_fetch(self, url: str, use_proxy: bool = False) -> dict:
+        """Obtiene cookies respetando el limite global de refrescos.
+
+        Args:
+            url: URL objetivo usada para obtener cookies.
+            use_proxy: Indica si se usa proxy al obtener cookies.
+
+        Returns:
+            Diccionario de cookies obtenidas.
+        """
+        async with self._refresh_slots:
+            return await self._fetch_cookies(url, use_proxy=use_proxy)
+
+    async def close(self) -> None:
+        """Cancela los refrescos anticipados en curso de las sesiones."""
+        await asyncio.gather(*(session.close() for session in self.sessions))
+
+    def _pick(self) -> CookieManager:
+        """Elige la sesion con menos requests en curso.
+
+        Las sesiones que se estan refrescando solo se eligen si no hay otra
+        disponible. Los empates se resuelven en round-robin.
+
+        Returns:
+            Sesion seleccionada.
+        """
+        offset = next(self._round_robin)
+        total = len(self.sessions)
+        ordered = [self.sessions[(offset + index) % total] for index in range(total)]
+        ready = [session for session in ordered if not session.refreshing] or ordered
+        return min(ready, key=lambda session: session.in_flight)
+
+    def stats(self) -> dict:
+        """Contadores de obtencion de cookies de todas las sesiones.
+
+        Returns:
+            Diccionario con ``fetches`` (navegaciones ejecutadas) y
+            ``coalesced_refreshes`` (refrescos resueltos sin navegar),
+            ``proactive_refreshes`` (lanzados antes del vencimiento) y
+            ``vault_hits`` (cookies tomadas de la boveda).
+        """
+        return {
+            "fetches": sum(session.fetches for session in self.sessions),
+            "coalesced_refreshes": sum(session.coalesced_refreshes for session in self.sessions),
+            "proactive_refreshes": sum(session.proactive_refreshes for session in self.sessions),
+            "vault_hits": sum(session.vault_hits for session in self.sessions),
+        }
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[CookieManager]:
+        """Reserva una sesion del pool mientras dura una request.
+
+        Yields:
+            Sesion de cookies reservada.
+        """
+        session = self._pick()
+        async with session.lease():
+            yield session
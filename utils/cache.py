@@ -0,0 +1,172 @@
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.metrics import CACHE_LOOKUPS
+
+CACHE_TABLE = "results"
+# Errores pasajeros: dependen de la sesion o de la red, no del item.
+TRANSIENT_ERRORS = (
+    "FAIL_SYS_TOKEN",
+    "TOKEN_EMPTY",
+    "RGV587_ERROR",
+    "REQUEST_TIMEOUT",
+    "READ_TIMEOUT",
+    "CONNECT_TIMEOUT",
+    "REQUEST_ERROR",
+    "DECODE_EMPTY",
+    "EXCEPTION",
+    "DUPLICATE_URL",
+    "UNKNOWN_ERROR",
+)
+
+
+class ResultCache:
+    """Cache de resultados de ``parse_product`` por itemId, en dos niveles.
+
+    El primer nivel es un LRU en memoria acotado a ``max_entries``; el segundo,
+    opcional, es una tabla SQLite que sobrevive a reinicios. Los resultados
+    exitosos viven ``ttl_s`` segundos y los errores propios del item (p. ej.
+    item inexistente) ``negative_ttl_s``; los errores pasajeros (token,
+    anti-bot, timeouts) no se guardan.
+
+    Attributes:
+        hits: Lecturas resueltas desde la cache (memoria o disco).
+        misses: Lecturas sin entrada vigente.
+        disk_hits: Parte de ``hits`` resuelta desde SQLite.
+        negative_hits: Parte de ``hits`` que devolvio un error cacheado.
+    """
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_s: float = 3600.0,
+        negative_ttl_s: float = 300.0,
+        path: Path | None = None,
+    ):
+        """Configura la cache y abre el nivel en disco si corresponde.
+
+        Args:
+            max_entries: Entradas maximas del LRU en memoria (0 = solo el
+                nivel en disco).
+            ttl_s: Vigencia de un resultado exitoso en segundos.
+            negative_ttl_s: Vigencia de un error cacheado en segundos.
+            path: Base SQLite del nivel en disco (None = solo memoria).
+        """
+        self.max_entries = max(0, max_entries)
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, timeout=30.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {CACHE_TABLE} "
+                "(item_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            with self._conn:
+                self._conn.execute(f"DELETE FROM {CACHE_TABLE} WHERE expires_at < ?", (time.time(),))
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def get(self, key: str) -> dict | None:
+        """Busca un resultado vigente.
+
+        Args:
+            key: itemId (o URL si no tiene).
+
+        Returns:
+            Copia del resultado cacheado, o None si no hay entrada vigente.
+        """
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                return self._hit(entry[1])
+            del self._memory[key]
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                f"SELECT data, expires_at FROM {CACHE_TABLE} WHERE item_id = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and row[1] > now:
+                data = json.loads(row[0])
+                self._remember(key, row[1], data)
+                self.disk_hits += 1
+                return self._hit(data)
+
+        self.misses += 1
+        CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    def put(self, key: str, data: dict) -> None:
+        """Guarda un resultado si es cacheable.
+
+        Args:
+            key: itemId (o URL si no tiene).
+            data: Resultado de ``scrape_one`` (con ERROR si fallo).
+        """
+        error = data.get("ERROR")
+        if error and any(err in error for err in TRANSIENT_ERRORS):
+            return
+        expires_at = time.time() + (self.negative_ttl_s if error else self.ttl_s)
+        self._remember(key, expires_at, data)
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {CACHE_TABLE} (item_id, data, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(data, ensure_ascii=False), expires_at),
+                )
+
+    def stats(self) -> dict:
+        """Contadores de la cache.
+
+        Returns:
+            Diccionario con hits, misses, disk_hits, negative_hits, hit_rate y
+            entradas en memoria.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        """Cierra el nivel en disco."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _hit(self, data: dict) -> dict:
+        """Cuenta un acierto y devuelve una copia del resultado."""
+        self.hits += 1
+        CACHE_LOOKUPS.inc(result="hit")
+        if data.get("ERROR"):
+            self.negative_hits += 1
+        return dict(data)
+
+    def _remember(self, key: str, expires_at: float, data: dict) -> None:
+        """Agrega al LRU en memoria descartando la entrada menos usada.
+
+        Guarda una copia: quien llama puede seguir modificando su dict.
+        """
+        if not self.max_entries:
+            return
+        self._memory[key] = (expires_at, dict(data))
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
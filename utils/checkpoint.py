@@ -0,0 +1,118 @@
+from pathlib import Path
+from typing import Iterator
+
+from utils.idset import ItemIdSet
+from utils.scraping_repository import extract_item_id
+from utils.sinks import iter_status
+
+
+def item_key(url: str) -> str:
+    """Devuelve la clave de deduplicacion de una URL (su itemId).
+
+    Args:
+        url: URL del producto.
+
+    Returns:
+        El itemId de la URL, o la URL completa si no tiene parametro ``id``.
+    """
+    try:
+        return extract_item_id(url)
+    except ValueError:
+        return url
+
+
+class CheckpointJournal:
+    """Journal append-only con el estado final de cada URL procesada.
+
+    Cada linea tiene el formato ``<ESTADO>\\t<URL>``, donde el estado es ``OK``
+    o el codigo de error. Es mas barato de releer que el CSV de salida y sirve
+    para reanudar corridas aunque el CSV quede truncado.
+    """
+    def __init__(self, path: Path):
+        """Abre el journal en modo append.
+
+        Args:
+            path: Ruta del archivo de journal.
+        """
+        self.path = path
+        self._file = path.open("a", encoding="utf-8")
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def record(self, url: str, error: str | None) -> None:
+        """Registra el resultado de una URL.
+
+        Args:
+            url: URL procesada.
+            error: Codigo de error, o vacio si el scraping fue exitoso.
+        """
+        self._file.write(f"{error or 'OK'}\t{url}\n")
+
+    def flush(self) -> None:
+        """Fuerza la escritura del journal a disco."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Cierra el archivo del journal."""
+        self._file.close()
+
+
+def _iter_journal_status(journal_path: Path) -> Iterator[tuple[str, str]]:
+    """Lee (URL, ERROR) desde un ``CheckpointJournal``.
+
+    Args:
+        journal_path: Ruta del journal.
+
+    Yields:
+        Tuplas (url, error) en el orden del archivo.
+    """
+    with journal_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            status, sep, url = line.rstrip("\n").rpartition("\t")
+            if not sep:
+                continue
+            yield url, "" if status == "OK" else status
+
+
+def load_resume_state(
+    output_path: Path,
+    checkpoint_path: Path | None = None,
+    output_format: str | None = None,
+) -> tuple[ItemIdSet, dict[str, str]]:
+    """Reconstruye el estado de una corrida previa.
+
+    Se usa el journal si existe; si no, la salida (CSV, JSONL, SQLite o
+    Parquet) leyendo solo las columnas URL y ERROR. Una URL exitosa en
+    cualquier fila se considera terminada aunque tenga filas con error.
+
+    Args:
+        output_path: Salida de la corrida previa.
+        checkpoint_path: Journal de la corrida previa, si se uso.
+        output_format: Formato de la salida; por defecto segun la extension.
+
+    Returns:
+        Tupla (done, failed): itemIds terminados con exito y un mapa
+        itemId -> URL de los que solo tienen errores.
+    """
+    if checkpoint_path is not None and checkpoint_path.exists():
+        statuses = _iter_journal_status(checkpoint_path)
+    elif output_path.exists() and output_path.stat().st_size > 0:
+        statuses = iter_status(output_path, output_format)
+    else:
+        return ItemIdSet(), {}
+
+    done = ItemIdSet()
+    failed: dict[str, str] = {}
+    for url, error in statuses:
+        key = item_key(url)
+        if error:
+            if key not in done:
+                failed.setdefault(key, url)
+        else:
+            if done.add(key):
+                failed.pop(key, None)
+    return done, failed
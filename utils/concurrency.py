@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ANTIBOT_ERRORS = ("RGV587_ERROR",)
+TOKEN_ERRORS = ("FAIL_SYS_TOKEN", "TOKEN_EMPTY")
+TIMEOUT_ERRORS = ("REQUEST_TIMEOUT", "READ_TIMEOUT", "CONNECT_TIMEOUT")
+
+
+class AdaptiveConcurrency:
+    """Controlador AIMD del numero de requests en vuelo.
+
+    Cada ``window`` respuestas se evalua la ventana: si no hubo congestion el
+    limite sube en ``increase`` (aditivo); si la tasa de timeouts o de errores
+    de token supera ``error_threshold``, o la latencia mediana supera
+    ``latency_tolerance`` veces la linea base, el limite se multiplica por
+    ``decrease``. Si los errores anti-bot (``RGV587_ERROR``) superan
+    ``breaker_threshold`` se abre un circuit breaker: el limite cae al piso y
+    no vuelve a subir hasta pasar ``cooldown_s`` sin picos.
+
+    Attributes:
+        limit: Limite actual de requests en vuelo (puede ser fraccionario).
+        in_flight: Requests en vuelo en este momento.
+    """
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.7,
+        window: int = 20,
+        error_threshold: float = 0.1,
+        breaker_threshold: float = 0.2,
+        latency_tolerance: float = 2.0,
+        cooldown_s: float = 30.0,
+    ):
+        """Configura el controlador.
+
+        Args:
+            initial: Limite inicial de requests en vuelo.
+            minimum: Piso del limite.
+            maximum: Techo del limite.
+            increase: Incremento aditivo por ventana sana.
+            decrease: Factor multiplicativo ante congestion.
+            window: Respuestas por ventana de evaluacion.
+            error_threshold: Tasa de timeouts/errores de token que reduce el limite.
+            breaker_threshold: Tasa de errores anti-bot que abre el circuit breaker.
+            latency_tolerance: Multiplo de la latencia base considerado congestion.
+            cooldown_s: Segundos que el breaker bloquea nuevos incrementos.
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self._increase = increase
+        self._decrease = decrease
+        self._window = window
+        self._error_threshold = error_threshold
+        self._breaker_threshold = breaker_threshold
+        self._latency_tolerance = latency_tolerance
+        self._cooldown_s = cooldown_s
+        self._breaker_until = 0.0
+        self._baseline_latency: float | None = None
+        self._latencies: list[float] = []
+        self._outcomes: deque[str] = deque()
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def current_limit(self) -> int:
+        """Limite entero vigente."""
+        return max(self.minimum, int(self.limit))
+
+    @property
+    def breaker_open(self) -> bool:
+        """Indica si el circuit breaker esta activo."""
+        return time.monotonic() < self._breaker_until
+
+    async def acquire(self) -> None:
+        """Espera hasta que haya cupo bajo el limite actual."""
+        while self.in_flight >= self.current_limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Despertada pero cancelada antes de correr: el cupo que se le
+                # habia asignado pasa a la siguiente en espera.
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self, ret: str, latency_s: float) -> None:
+        """Libera el cupo y registra el resultado de la request.
+
+        Args:
+            ret: Codigo ``ret`` de la respuesta o codigo de error interno.
+            latency_s: Duracion de la request en segundos.
+        """
+        self.in_flight -= 1
+        self._observe(ret, latency_s)
+        self._wake()
+
+    def cancel(self) -> None:
+        """Libera el cupo de una request cancelada sin contarla en la ventana.
+
+        Una request cancelada (p. ej. la perdedora de un hedge) no es una
+        respuesta: su latencia truncada no debe mover la linea base.
+        """
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Despierta tantas tareas en espera como cupos libres haya."""
+        free = self.current_limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _observe(self, ret: str, latency_s: float) -> None:
+        """Acumula la respuesta y evalua la ventana cuando se completa."""
+        if any(err in ret for err in ANTIBOT_ERRORS):
+            outcome = "antibot"
+        elif any(err in ret for err in TOKEN_ERRORS):
+            outcome = "token"
+        elif any(err in ret for err in TIMEOUT_ERRORS):
+            outcome = "timeout"
+        else:
+            outcome = "ok"
+            self._latencies.append(latency_s)
+        self._outcomes.append(outcome)
+        if len(self._outcomes) >= self._window:
+            self._evaluate()
+
+    def _evaluate(self) -> None:
+        """Ajusta el limite segun la ventana acumulada y la reinicia."""
+        total = len(self._outcomes)
+        antibot = self._outcomes.count("antibot") / total
+        errors = (self._outcomes.count("token") + self._outcomes.count("timeout")) / total
+        median = statistics.median(self._latencies) if self._latencies else None
+        self._outcomes.clear()
+        self._latencies.clear()
+
+        previous = self.current_limit
+        if antibot >= self._breaker_threshold:
+            self.limit = float(self.minimum)
+            self._breaker_until = time.monotonic() + self._cooldown_s
+            logger.warning("Circuit breaker abierto: %.0f%% anti-bot, limite=%d", antibot * 100, self.minimum)
+            return
+
+        if median is not None:
+            if self._baseline_latency is None or median < self._baseline_latency:
+                self._baseline_latency = median
+            else:
+                # La linea base se olvida lentamente por si la red cambia.
+                self._baseline_latency = self._baseline_latency * 0.95 + median * 0.05
+        congested = (
+            median is not None
+            and self._baseline_latency is not None
+            and median > self._baseline_latency * self._latency_tolerance
+        )
+        if errors > self._error_threshold or congested:
+            self.limit = max(float(self.minimum), self.limit * self._decrease)
+        elif not self.breaker_open:
+            self.limit = min(float(self.maximum), self.limit + self._increase)
+
+        if self.current_limit != previous:
+            logger.info("Concurrencia ajustada: %d -> %d", previous, self.current_limit)
@@ -0,0 +1,113 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos.
+    fcntl = None
+
+
+def token_expiry(cookies: dict | None) -> float | None:
+    """Lee el vencimiento embebido en ``_m_h5_tk``.
+
+    El token tiene el formato ``<token>_<expira_ms>``.
+
+    Args:
+        cookies: Cookies de una sesion.
+
+    Returns:
+        Timestamp (segundos) en que vence el token, o None si no hay token
+        o no tiene vencimiento legible.
+    """
+    token = (cookies or {}).get("_m_h5_tk", "")
+    _, _, expires_ms = token.rpartition("_")
+    if not expires_ms.isdigit():
+        return None
+    return int(expires_ms) / 1000
+
+
+class CookieVault:
+    """Cookies de sesion persistidas en disco y compartidas entre procesos.
+
+    Es un JSON ``{sesion: {cookies, expires_at, saved_at}}``. Las lecturas
+    toman un lock compartido y las escrituras uno exclusivo (``flock`` sobre
+    ``<archivo>.lock``) y reemplazan el archivo de forma atomica, asi un CLI
+    y la API (o varios shards) pueden usar la misma boveda: al reiniciar se
+    reutilizan las cookies vigentes en lugar de abrir el navegador.
+    """
+    def __init__(self, path: Path):
+        """Configura la boveda; el archivo se crea al guardar la primera sesion.
+
+        Args:
+            path: Archivo JSON de la boveda.
+        """
+        self.path = path
+        self._lock_path = path.with_name(path.name + ".lock")
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Toma el lock del archivo mientras dura el bloque."""
+        if fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock_path.open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def load(self, name: str, min_ttl_s: float = 0.0) -> dict | None:
+        """Devuelve las cookies guardadas de una sesion si siguen vigentes.
+
+        Args:
+            name: Clave de la sesion.
+            min_ttl_s: Vigencia minima que le tiene que quedar al token.
+
+        Returns:
+            Cookies de la sesion, o None si no hay o vencen antes de
+            ``min_ttl_s`` segundos.
+        """
+        with self._locked(exclusive=False):
+            entry = self._read().get(name)
+        if not entry:
+            return None
+        expires_at = token_expiry(entry.get("cookies"))
+        if expires_at is None or expires_at - time.time() < min_ttl_s:
+            return None
+        return entry["cookies"]
+
+    def save(self, name: str, cookies: dict) -> None:
+        """Guarda las cookies de una sesion (reemplaza las anteriores).
+
+        Args:
+            name: Clave de la sesion.
+            cookies: Cookies obtenidas con el navegador.
+        """
+        with self._locked(exclusive=True):
+            sessions = self._read()
+            now = time.time()
+            # Se aprovecha la escritura para descartar sesiones vencidas.
+            sessions = {
+                key: entry
+                for key, entry in sessions.items()
+                if (token_expiry(entry.get("cookies")) or 0) > now
+            }
+            sessions[name] = {"cookies": cookies, "expires_at": token_expiry(cookies), "saved_at": now}
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            # Son credenciales: solo las lee el usuario.
+            tmp_path.touch(mode=0o600, exist_ok=True)
+            tmp_path.write_text(json.dumps(sessions, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
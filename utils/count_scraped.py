@@ -1,38 +1,318 @@
 import argparse
+import csv
+import sqlite3
+import sys
+from collections import Counter
 from pathlib import Path
+from typing import Iterator
 
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+if __package__ is None or __package__ == "":
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from utils.sinks import SQLITE_TABLE, detect_format
+
+ITEM_ID_PATTERN = r"[?&]id=(?P<id>\d+)"
+DETAILED_ERROR_PREFIXES = ("REQUEST_ERROR", "EXCEPTION")
+MERGE_EVERY = 16
+
+
+def iter_chunks(
+    path: Path,
+    columns: list[str],
+    output_format: str | None = None,
+    chunksize: int = 200_000,
+) -> Iterator[pd.DataFrame]:
+    """Lee solo ``columns`` de una salida del scraping, por bloques.
+
+    Con ``pyarrow`` instalado las columnas quedan como strings Arrow, sobre
+    los que las operaciones ``.str`` de pandas corren vectorizadas.
+
+    Args:
+        path: Salida (CSV, JSONL, Parquet o SQLite).
+        columns: Columnas a leer.
+        output_format: Formato explicito; por defecto segun la extension.
+        chunksize: Filas por bloque.
+
+    Yields:
+        DataFrames con las columnas pedidas como strings (vacias si faltan).
+    """
+    fmt = detect_format(path, output_format)
+    if fmt == "csv":
+        chunks = pd.read_csv(
+            path,
+            usecols=lambda column: column in columns,
+            dtype=pd.ArrowDtype(pa.string()) if pa is not None else str,
+            keep_default_na=False,
+            chunksize=chunksize,
+        )
+    elif fmt == "jsonl":
+        chunks = pd.read_json(path, lines=True, dtype=False, chunksize=chunksize)
+    elif fmt == "sqlite":
+        conn = sqlite3.connect(path)
+        try:
+            query = f"SELECT {', '.join(columns)} FROM {SQLITE_TABLE}"
+            yield from (
+                chunk.fillna("").astype(str)
+                for chunk in pd.read_sql_query(query, conn, chunksize=chunksize)
+            )
+        finally:
+            conn.close()
+        return
+    else:
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(str(path))
+        present = [column for column in columns if column in parquet.schema_arrow.names]
+        chunks = (
+            batch.to_pandas(types_mapper=pd.ArrowDtype)
+            for batch in parquet.iter_batches(batch_size=chunksize, columns=present)
+        )
+
+    for chunk in chunks:
+        for column in columns:
+            if column not in chunk:
+                chunk[column] = ""
+        chunk = chunk[columns]
+        if all(isinstance(dtype, pd.ArrowDtype) for dtype in chunk.dtypes):
+            yield chunk.fillna("")
+        else:
+            yield chunk.fillna("").astype(str)
+
+
+def error_code(error: str) -> str:
+    """Normaliza un valor de ERROR a su codigo (sin el mensaje).
+
+    Args:
+        error: Valor de la columna ERROR, p. ej. ``FAIL_SYS_TOKEN_EXOIRED::...``.
+
+    Returns:
+        Codigo del error; para errores de red y excepciones se conserva la clase.
+    """
+    if error.startswith(DETAILED_ERROR_PREFIXES):
+        return error
+    return error.split("::", 1)[0]
+
+
+def _item_ids(urls: pd.Series) -> pd.Series:
+    """Extrae el itemId numerico de cada URL (NA si no tiene)."""
+    keys = urls.str.extract(ITEM_ID_PATTERN, expand=False)
+    if isinstance(keys.dtype, pd.ArrowDtype):
+        return keys.astype("int64[pyarrow]")
+    return pd.to_numeric(keys, errors="coerce").astype("Int64")
+
+
+def _merge_unique(arrays: list[np.ndarray], repeated: Counter) -> np.ndarray:
+    """Une arrays de itemIds en uno ordenado sin repetidos.
+
+    Args:
+        arrays: Arrays de itemIds (cada uno ya sin repetidos).
+        repeated: Contador itemId -> repeticiones descartadas; se actualiza
+            con las de esta union.
+
+    Returns:
+        Ids unicos ordenados.
+    """
+    if not arrays:
+        return np.empty(0, dtype=np.int64)
+    unique, counts = np.unique(np.concatenate(arrays), return_counts=True)
+    _count_repeated(unique, counts, repeated)
+    return unique
+
+
+def _count_repeated(ids: np.ndarray, counts: np.ndarray, repeated: Counter) -> None:
+    """Suma a ``repeated`` las apariciones de mas de cada itemId."""
+    extra = counts > 1
+    repeated.update(dict(zip(ids[extra].tolist(), (counts[extra] - 1).tolist())))
+
+
+def analyze(
+    path: Path,
+    error_field: str = "ERROR",
+    output_format: str | None = None,
+    chunksize: int = 200_000,
+) -> dict:
+    """Resume una salida del scraping leyendola en streaming.
+
+    Solo se leen las columnas URL y ERROR y el trabajo por fila es
+    vectorizado. La memoria depende de la cantidad de items distintos
+    (8 bytes por itemId exitoso) y de items con error, no del tamano de las
+    filas ni del archivo.
+
+    Args:
+        path: Salida del scraping.
+        error_field: Nombre de la columna que indica error.
+        output_format: Formato explicito; por defecto segun la extension.
+        chunksize: Filas por bloque.
+
+    Returns:
+        Diccionario con ``total``, ``ok``, ``errors`` (Counter por codigo),
+        ``unique_items``, ``repeated_ok`` (filas exitosas de mas, por items
+        exitosos mas de una vez), ``duplicates`` (itemId -> filas exitosas de
+        esos items) y ``failed`` (itemId -> URL de items sin ninguna fila
+        exitosa).
+    """
+    total = ok = 0
+    errors: Counter = Counter()
+    # Repeticiones de mas por itemId (o URL si no tiene); los repetidos son pocos.
+    repeated: Counter = Counter()
+    ok_ids: list[np.ndarray] = []
+    error_ids: list[np.ndarray] = []
+    error_urls: list[list[str]] = []
+    # URLs sin itemId: se comparan por URL completa (son pocas).
+    done_urls: set[str] = set()
+    failed_by_url: dict[str, str] = {}
+    for chunk in iter_chunks(path, ["URL", error_field], output_format, chunksize):
+        urls = chunk["URL"]
+        error_values = chunk[error_field].str.strip()
+        ok_mask = (error_values == "").to_numpy(dtype=bool)
+        total += len(chunk)
+        ok += int(ok_mask.sum())
+        for error, count in error_values[~ok_mask].value_counts().items():
+            errors[error_code(str(error))] += int(count)
+
+        ids = _item_ids(urls)
+        has_id = ids.notna().to_numpy(dtype=bool)
+        chunk_ok, counts = np.unique(ids[ok_mask & has_id].to_numpy(dtype=np.int64), return_counts=True)
+        _count_repeated(chunk_ok, counts, repeated)
+        ok_ids.append(chunk_ok)
+        if len(ok_ids) >= MERGE_EVERY:
+            ok_ids = [_merge_unique(ok_ids, repeated)]
+
+        # Primera URL con error de cada item que no tuvo exito en el bloque.
+        chunk_errors = ids[~ok_mask & has_id].to_numpy(dtype=np.int64)
+        error_positions = np.flatnonzero(~ok_mask & has_id)
+        chunk_errors, first = np.unique(chunk_errors, return_index=True)
+        pending = ~np.isin(chunk_errors, chunk_ok, assume_unique=True)
+        error_ids.append(chunk_errors[pending])
+        error_urls.append(urls.iloc[error_positions[first[pending]]].tolist())
+
+        for url, is_ok in zip(urls[~has_id].tolist(), ok_mask[~has_id].tolist()):
+            if is_ok:
+                if url in done_urls:
+                    repeated[url] += 1
+                done_urls.add(url)
+                failed_by_url.pop(url, None)
+            elif url not in done_urls:
+                failed_by_url.setdefault(url, url)
+
+    done_ids = _merge_unique(ok_ids, repeated)
+    failed: dict[str, str] = {}
+    for chunk_errors, urls in zip(error_ids, error_urls):
+        still_failed = ~np.isin(chunk_errors, done_ids, assume_unique=True)
+        for item_id, url in zip(chunk_errors[still_failed].tolist(), np.asarray(urls, dtype=object)[still_failed]):
+            failed.setdefault(str(item_id), url)
+    failed.update(failed_by_url)
+
+    return {
+        "total": total,
+        "ok": ok,
+        "errors": errors,
+        "unique_items": len(done_ids) + len(done_urls) + len(failed),
+        "repeated_ok": sum(repeated.values()),
+        "duplicates": {str(key): count + 1 for key, count in repeated.items()},
+        "failed": failed,
+    }
+
 
 def count_scraped(csv_path: Path, error_field: str) -> tuple[int, int]:
-    df = pd.read_csv(csv_path)
-    total = len(df)
-    ok_mask = df[error_field].isna() | (df[error_field].astype(str).str.strip() == "")
-    ok = int(ok_mask.sum())
-    return total, ok
+    report = analyze(csv_path, error_field)
+    return report["total"], report["ok"]
+
+
+def export_failed(failed: dict[str, str], export_path: Path) -> None:
+    """Escribe las URLs fallidas en un CSV con columna URL, listo para reprocesar.
+
+    Args:
+        failed: Mapa itemId -> URL de items sin filas exitosas.
+        export_path: CSV de destino.
+    """
+    with export_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["URL"])
+        writer.writerows([url] for url in failed.values())
+
+
+def export_duplicates(duplicates: dict[str, int], export_path: Path) -> None:
+    """Escribe los items exitosos repetidos en un CSV ``ITEM_ID,OK_ROWS``.
+
+    Args:
+        duplicates: Mapa itemId (o URL sin itemId) -> filas exitosas.
+        export_path: CSV de destino.
+    """
+    with export_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ITEM_ID", "OK_ROWS"])
+        writer.writerows(sorted(duplicates.items(), key=lambda item: -item[1]))
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
-        description="Cuenta cuantas filas fueron scrapeadas sin error.",
+        description="Reporta cuantas filas fueron scrapeadas sin error y por que fallaron las demas.",
     )
     parser.add_argument(
         "--input",
         required=True,
         type=Path,
-        help="CSV de salida del scraping.",
+        help="Salida del scraping (CSV, JSONL, Parquet o SQLite).",
     )
     parser.add_argument(
         "--error-field",
         default="ERROR",
         help="Nombre de la columna que indica error.",
     )
+    parser.add_argument(
+        "--format",
+        default=None,
+        choices=["csv", "jsonl", "parquet", "sqlite"],
+        help="Formato de la salida (por defecto segun la extension).",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=200_000,
+        help="Filas leidas por bloque.",
+    )
+    parser.add_argument(
+        "--export-failed",
+        type=Path,
+        default=None,
+        help="CSV donde guardar las URLs sin ninguna fila exitosa (para reprocesar).",
+    )
+    parser.add_argument(
+        "--export-duplicates",
+        type=Path,
+        default=None,
+        help="CSV donde guardar los itemIds exitosos mas de una vez y sus filas.",
+    )
     args = parser.parse_args()
 
-    total, ok = count_scraped(args.input, args.error_field)
+    report = analyze(args.input, args.error_field, args.format, args.chunksize)
+    total, ok = report["total"], report["ok"]
     print(f"Total filas: {total}")
     print(f"Sin error: {ok}")
     print(f"Con error: {total - ok}")
+    print(f"Items unicos: {report['unique_items']}")
+    print(f"Items sin ninguna fila exitosa: {len(report['failed'])}")
+    print(f"Items exitosos repetidos: {len(report['duplicates'])} ({report['repeated_ok']} filas de mas)")
+    if report["errors"]:
+        print("Errores por codigo:")
+        for code, count in report["errors"].most_common():
+            print(f"  {code}: {count}")
+
+    if args.export_failed is not None:
+        export_failed(report["failed"], args.export_failed)
+        print(f"URLs fallidas exportadas en: {args.export_failed}")
+    if args.export_duplicates is not None:
+        export_duplicates(report["duplicates"], args.export_duplicates)
+        print(f"Items repetidos exportados en: {args.export_duplicates}")
 
 
 if __name__ == "__main__":
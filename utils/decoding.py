@@ -0,0 +1,134 @@
+import msgspec
+
+Scalar = str | int | float | bool | None
+
+
+class _TrackParams(msgspec.Struct):
+    itemId: Scalar = None
+    categoryId: Scalar = None
+
+
+class _ImageInfo(msgspec.Struct):
+    photoSearchUrl: str | None = None
+
+
+class _ItemDO(msgspec.Struct):
+    title: str | None = None
+    imageInfos: list[_ImageInfo] | None = None
+    soldPrice: Scalar = None
+    browseCnt: Scalar = None
+    wantCnt: Scalar = None
+    collectCnt: Scalar = None
+    quantity: Scalar = None
+    gmtCreate: Scalar = None
+
+
+class _SellerDO(msgspec.Struct):
+    sellerId: Scalar = None
+
+
+class _DetailData(msgspec.Struct):
+    trackParams: _TrackParams | None = None
+    itemDO: _ItemDO | None = None
+    sellerDO: _SellerDO | None = None
+
+
+class _DetailResponse(msgspec.Struct):
+    ret: list[str] | None = None
+    data: _DetailData | None = None
+
+
+class ProductRecord(msgspec.Struct):
+    """Producto normalizado, con los mismos campos que ``parse_product``."""
+    ITEM_ID: Scalar = None
+    CATEGORY_ID: Scalar = None
+    TITLE: str | None = None
+    IMAGES: list[str | None] = []
+    SOLD_PRICE: Scalar = None
+    BROWSE_COUNT: Scalar = None
+    WANT_COUNT: Scalar = None
+    COLLECT_COUNT: Scalar = None
+    QUANTITY: Scalar = None
+    GMT_CREATE: Scalar = None
+    SELLER_ID: Scalar = None
+
+    def to_dict(self) -> dict:
+        """Convierte el registro en un diccionario plano (una fila de salida)."""
+        return msgspec.structs.asdict(self)
+
+
+_decoder = msgspec.json.Decoder(_DetailResponse)
+
+
+def record_from_payload(product: dict) -> ProductRecord:
+    """Arma un ``ProductRecord`` desde una respuesta ya decodificada a dicts.
+
+    Args:
+        product: Respuesta cruda del endpoint de detalle.
+
+    Returns:
+        Producto normalizado.
+    """
+    data = product.get("data") or {}
+    track = data.get("trackParams") or {}
+    item = data.get("itemDO") or {}
+    seller = data.get("sellerDO") or {}
+    return ProductRecord(
+        ITEM_ID=track.get("itemId"),
+        CATEGORY_ID=track.get("categoryId"),
+        TITLE=item.get("title"),
+        IMAGES=[img.get("photoSearchUrl") for img in item.get("imageInfos") or []],
+        SOLD_PRICE=item.get("soldPrice"),
+        BROWSE_COUNT=item.get("browseCnt"),
+        WANT_COUNT=item.get("wantCnt"),
+        COLLECT_COUNT=item.get("collectCnt"),
+        QUANTITY=item.get("quantity"),
+        GMT_CREATE=item.get("gmtCreate"),
+        SELLER_ID=seller.get("sellerId"),
+    )
+
+
+def decode_detail(body: bytes) -> tuple[str, ProductRecord | None]:
+    """Decodifica una respuesta de detalle leyendo solo los campos usados.
+
+    El resto del payload (la mayor parte) se saltea sin crear objetos Python.
+    Si algun campo usado llega con un tipo inesperado se decodifica la
+    respuesta completa y se normaliza con ``record_from_payload``.
+
+    Args:
+        body: Cuerpo crudo de la respuesta mtop.
+
+    Returns:
+        Tupla (codigo ``ret``, producto); el producto es None si la respuesta
+        no trae ``data``.
+
+    Raises:
+        msgspec.DecodeError: Si el cuerpo no es JSON valido.
+    """
+    try:
+        response = _decoder.decode(body)
+    except msgspec.ValidationError:
+        product = msgspec.json.decode(body)
+        ret = (product.get("ret") or [""])[0]
+        return ret, record_from_payload(product) if product.get("data") is not None else None
+
+    ret = response.ret[0] if response.ret else ""
+    data = response.data
+    if data is None:
+        return ret, None
+    track = data.trackParams or _TrackParams()
+    item = data.itemDO or _ItemDO()
+    seller = data.sellerDO or _SellerDO()
+    return ret, ProductRecord(
+        ITEM_ID=track.itemId,
+        CATEGORY_ID=track.categoryId,
+        TITLE=item.title,
+        IMAGES=[image.photoSearchUrl for image in item.imageInfos or ()],
+        SOLD_PRICE=item.soldPrice,
+        BROWSE_COUNT=item.browseCnt,
+        WANT_COUNT=item.wantCnt,
+        COLLECT_COUNT=item.collectCnt,
+        QUANTITY=item.quantity,
+        GMT_CREATE=item.gmtCreate,
+        SELLER_ID=seller.sellerId,
+    )
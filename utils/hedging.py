@@ -0,0 +1,126 @@
+from collections import deque
+
+from utils.metrics import HEDGES
+
+
+class HedgePolicy:
+    """Decide cuando lanzar una request de respaldo (hedging) y la limita.
+
+    Guarda las latencias de los intentos exitosos (desde que obtienen cupo,
+    sin la espera en cola) en una ventana deslizante y usa su percentil
+    ``quantile`` como espera: si un intento tarda mas, se lanza un segundo
+    intento y gana el primero que responde con exito. Los
+    respaldos no pueden superar ``budget`` (fraccion) de los intentos, asi
+    la carga extra sobre mtop queda acotada aunque la latencia se degrade
+    en general.
+
+    Attributes:
+        quantile: Percentil de latencia a partir del cual se lanza el respaldo.
+        budget: Fraccion maxima de intentos con respaldo.
+        requests: Intentos vistos.
+        hedges: Respaldos lanzados.
+        wins: Respaldos que respondieron antes que el intento original.
+        denied: Respaldos no lanzados por falta de presupuesto.
+    """
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        budget: float = 0.05,
+        min_delay_s: float = 0.05,
+        window: int = 1000,
+        min_samples: int = 50,
+    ):
+        """Configura la politica.
+
+        Args:
+            quantile: Percentil de latencia usado como espera.
+            budget: Fraccion maxima de intentos con respaldo.
+            min_delay_s: Espera minima antes de un respaldo.
+            window: Latencias que se conservan.
+            min_samples: Latencias necesarias antes de empezar a cubrir.
+        """
+        self.quantile = quantile
+        self.budget = budget
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self.denied = 0
+        self._min_delay_s = min_delay_s
+        self._min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._delay_s: float | None = None
+        self._stale = 0
+
+    def observe(self, latency_s: float) -> None:
+        """Registra la latencia de un intento exitoso.
+
+        Args:
+            latency_s: Duracion del intento en segundos.
+        """
+        self._latencies.append(latency_s)
+        self._stale += 1
+
+    def delay(self) -> float | None:
+        """Espera antes de lanzar un respaldo para un intento nuevo.
+
+        Cuenta el intento para el presupuesto.
+
+        Returns:
+            Segundos a esperar, o None si todavia no hay suficientes muestras.
+        """
+        self.requests += 1
+        if len(self._latencies) < self._min_samples:
+            return None
+        # Ordenar la ventana en cada intento es caro; el percentil cambia lento.
+        if self._delay_s is None or self._stale >= 20:
+            ordered = sorted(self._latencies)
+            index = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+            self._delay_s = max(self._min_delay_s, ordered[index])
+            self._stale = 0
+        return self._delay_s
+
+    def allow(self) -> bool:
+        """Indica si queda presupuesto para lanzar un respaldo.
+
+        El respaldo recien consume presupuesto con ``launched``, cuando
+        obtiene su cupo; uno cancelado mientras espera en cola no cuenta.
+
+        Returns:
+            True si se puede lanzar; False si se agoto el presupuesto.
+        """
+        if self.hedges + 1 > self.budget * self.requests:
+            self.denied += 1
+            HEDGES.inc(outcome="denied")
+            return False
+        return True
+
+    def launched(self) -> None:
+        """Registra que un respaldo obtuvo cupo y salio hacia mtop."""
+        self.hedges += 1
+        HEDGES.inc(outcome="launched")
+
+    def record(self, won: bool) -> None:
+        """Registra si un respaldo lanzado gano la carrera.
+
+        Args:
+            won: True si el respaldo respondio con exito antes que el original.
+        """
+        if won:
+            self.wins += 1
+        HEDGES.inc(outcome="won" if won else "lost")
+
+    def stats(self) -> dict:
+        """Contadores de hedging.
+
+        Returns:
+            Diccionario con intentos, respaldos, victorias, rechazos por
+            presupuesto y la espera actual en ms.
+        """
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "wins": self.wins,
+            "denied": self.denied,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "delay_ms": round(self._delay_s * 1000, 1) if self._delay_s is not None else None,
+        }
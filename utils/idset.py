@@ -0,0 +1,90 @@
+from array import array
+
+_EMPTY = -1
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+
+class ItemIdSet:
+    """Conjunto compacto de itemIds para deduplicar millones de URLs.
+
+    Los itemIds numericos se guardan en una tabla hash de direccionamiento
+    abierto sobre ``array('q')`` (8 bytes por slot, carga maxima 2/3), en lugar
+    de un ``set`` de strings (~100 bytes por URL). Las claves no numericas,
+    que son raras, caen en un ``set`` comun.
+    """
+    __slots__ = ("_slots", "_bits", "_size", "_other")
+
+    def __init__(self, capacity: int = 1024):
+        """Crea el conjunto con espacio inicial para ``capacity`` elementos.
+
+        Args:
+            capacity: Cantidad estimada de elementos.
+        """
+        self._bits = max(4, (capacity * 3 // 2).bit_length())
+        self._slots = array("q", [_EMPTY]) * (1 << self._bits)
+        self._size = 0
+        self._other: set[str] = set()
+
+    def __len__(self) -> int:
+        return self._size + len(self._other)
+
+    def _probe(self, item_id: int) -> int:
+        """Devuelve el slot donde esta ``item_id`` o donde deberia insertarse."""
+        mask = (1 << self._bits) - 1
+        index = (((item_id * _HASH_MULTIPLIER) & _MASK_64) >> (64 - self._bits)) & mask
+        slots = self._slots
+        while True:
+            value = slots[index]
+            if value == item_id or value == _EMPTY:
+                return index
+            index = (index + 1) & mask
+
+    def _grow(self) -> None:
+        """Duplica la tabla y reinserta los elementos."""
+        old = self._slots
+        self._bits += 1
+        self._slots = array("q", [_EMPTY]) * (1 << self._bits)
+        for value in old:
+            if value != _EMPTY:
+                self._slots[self._probe(value)] = value
+
+    @staticmethod
+    def _as_int(key: str | int) -> int | None:
+        """Convierte la clave a entero si es un itemId numerico valido."""
+        if isinstance(key, int):
+            return key if 0 <= key < (1 << 63) else None
+        if key.isascii() and key.isdigit() and len(key) <= 18:
+            return int(key)
+        return None
+
+    def __contains__(self, key: str | int) -> bool:
+        item_id = self._as_int(key)
+        if item_id is None:
+            return str(key) in self._other
+        return self._slots[self._probe(item_id)] == item_id
+
+    def add(self, key: str | int) -> bool:
+        """Agrega una clave al conjunto.
+
+        Args:
+            key: itemId (numerico o string) u otra clave de deduplicacion.
+
+        Returns:
+            True si la clave es nueva, False si ya estaba.
+        """
+        item_id = self._as_int(key)
+        if item_id is None:
+            key = str(key)
+            if key in self._other:
+                return False
+            self._other.add(key)
+            return True
+        index = self._probe(item_id)
+        if self._slots[index] == item_id:
+            return False
+        self._slots[index] = item_id
+        self._size += 1
+        if self._size * 3 > (1 << self._bits) * 2:
+            self._grow()
+        return True
@@ -0,0 +1,266 @@
+import asyncio
+import csv
+import logging
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable
+
+from utils.scrape_csv import count_rows, run
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+
+
+class Job:
+    """Trabajo de scraping de una lista de URLs ejecutado en segundo plano.
+
+    Attributes:
+        id: Identificador del trabajo.
+        input_path: CSV de entrada con columna URL.
+        output_path: CSV de resultados.
+        total: URLs en la entrada.
+        status: Estado actual (ver ``JOB_STATES``).
+        ok: Items terminados con exito.
+        errors: Items terminados con error.
+        error: Mensaje si el trabajo fallo.
+    """
+    def __init__(self, job_id: str, input_path: Path, output_path: Path, total: int):
+        """Crea el trabajo en estado ``queued``.
+
+        Args:
+            job_id: Identificador del trabajo.
+            input_path: CSV de entrada con columna URL.
+            output_path: CSV de resultados.
+            total: URLs en la entrada.
+        """
+        self.id = job_id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.total = total
+        self.status = "queued"
+        self.ok = 0
+        self.errors = 0
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+
+    def record(self, data: dict) -> None:
+        """Cuenta un resultado (callback ``on_result`` de ``run``).
+
+        Args:
+            data: Resultado de ``scrape_one`` (con ERROR si fallo).
+        """
+        if data.get("ERROR"):
+            self.errors += 1
+        else:
+            self.ok += 1
+
+    def to_dict(self) -> dict:
+        """Estado del trabajo para la API.
+
+        Returns:
+            Diccionario con estado, contadores, tasa (items/s) y tiempos.
+        """
+        done = self.ok + self.errors
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "done": done,
+            "ok": self.ok,
+            "errors": self.errors,
+            "rate": done / elapsed if elapsed > 0 else 0.0,
+            "elapsed_s": elapsed,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Cola de trabajos de scraping ejecutados por un pool de workers en la API.
+
+    Cada trabajo corre ``run`` sobre su propio CSV de entrada y de salida,
+    pero reutiliza los recursos compartidos que recibe en ``run_kwargs``
+    (cliente HTTP, pool de cookies, rate limiter, cache y un controlador de
+    concurrencia comun). Asi todas las corridas juntas no superan el limite
+    de requests en vuelo y no le quitan capacidad a ``/scrapePDP``.
+
+    Los trabajos terminados se olvidan (estado y archivos) a los
+    ``retention_s`` segundos; al iniciar tambien se borran los directorios
+    viejos que dejo un proceso anterior.
+    """
+    def __init__(self, jobs_dir: Path, max_parallel_jobs: int = 1, retention_s: float = 86400.0, **run_kwargs):
+        """Configura el manager; llamar ``start`` para lanzar los workers.
+
+        Args:
+            jobs_dir: Directorio donde se guardan entradas y resultados.
+            max_parallel_jobs: Trabajos ejecutados a la vez.
+            retention_s: Segundos que se conserva un trabajo terminado.
+            **run_kwargs: Argumentos fijos de ``run`` (workers, retries, ...).
+        """
+        self.jobs_dir = jobs_dir
+        self.jobs: dict[str, Job] = {}
+        self.retention_s = retention_s
+        self._max_parallel_jobs = max(1, max_parallel_jobs)
+        self._run_kwargs = run_kwargs
+        self._queue: asyncio.Queue[Job] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Lanza los workers que ejecutan los trabajos encolados y la limpieza."""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._max_parallel_jobs)]
+        self._workers.append(asyncio.create_task(self._janitor()))
+
+    async def close(self) -> None:
+        """Cancela los workers y los trabajos en curso."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    def submit_urls(self, urls: Iterable[str]) -> Job:
+        """Encola un trabajo a partir de una lista de URLs.
+
+        Args:
+            urls: URLs a scrapear.
+
+        Returns:
+            Trabajo creado.
+        """
+        job_id, job_dir = self._new_job_dir()
+        input_path = job_dir / "input.csv"
+        with input_path.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["URL"])
+            writer.writerows([url] for url in urls)
+        return self._enqueue(job_id, input_path)
+
+    def submit_csv(self, content: bytes) -> Job:
+        """Encola un trabajo a partir de un CSV con columna URL.
+
+        Args:
+            content: Contenido del CSV.
+
+        Returns:
+            Trabajo creado.
+
+        Raises:
+            ValueError: Si el CSV no tiene columna URL.
+        """
+        header = next(csv.reader([content.split(b"\n", 1)[0].decode("utf-8-sig")]), [])
+        if "URL" not in header:
+            raise ValueError("El CSV debe tener una columna URL")
+        job_id, job_dir = self._new_job_dir()
+        input_path = job_dir / "input.csv"
+        input_path.write_bytes(content if content.endswith(b"\n") else content + b"\n")
+        return self._enqueue(job_id, input_path)
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancela un trabajo encolado o en curso.
+
+        Args:
+            job_id: Identificador del trabajo.
+
+        Returns:
+            Trabajo cancelado.
+
+        Raises:
+            KeyError: Si el trabajo no existe.
+        """
+        job = self.jobs[job_id]
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        elif job.status == "running" and job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def prune(self) -> int:
+        """Borra los trabajos terminados hace mas de ``retention_s``.
+
+        Returns:
+            Cantidad de trabajos olvidados.
+        """
+        cutoff = time.time() - self.retention_s
+        expired = [
+            job for job in self.jobs.values() if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job in expired:
+            del self.jobs[job.id]
+        await asyncio.to_thread(
+            self._remove_dirs, [job.input_path.parent for job in expired], set(self.jobs), cutoff
+        )
+        return len(expired)
+
+    def _remove_dirs(self, dirs: list[Path], live: set[str], cutoff: float) -> None:
+        """Borra ``dirs`` y los directorios huerfanos anteriores a ``cutoff`` (en un thread)."""
+        for job_dir in dirs:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        for job_dir in self.jobs_dir.iterdir():
+            if job_dir.is_dir() and job_dir.name not in live and job_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    async def _janitor(self) -> None:
+        """Aplica la retencion al iniciar y despues periodicamente."""
+        interval_s = max(1.0, min(600.0, self.retention_s / 4))
+        while True:
+            try:
+                await self.prune()
+            except Exception:
+                logger.exception("No se pudieron borrar trabajos viejos")
+            await asyncio.sleep(interval_s)
+
+    def _new_job_dir(self) -> tuple[str, Path]:
+        """Crea el directorio de un trabajo nuevo."""
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self.jobs_dir / job_id
+        job_dir.mkdir(parents=True)
+        return job_id, job_dir
+
+    def _enqueue(self, job_id: str, input_path: Path) -> Job:
+        """Registra y encola un trabajo."""
+        job = Job(job_id, input_path, input_path.with_name("output.csv"), count_rows(input_path))
+        self.jobs[job_id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    async def _worker(self) -> None:
+        """Ejecuta trabajos de la cola de a uno."""
+        while True:
+            job = await self._queue.get()
+            if job.status == "cancelled":
+                continue
+            job.status = "running"
+            job.started_at = time.time()
+            job.task = asyncio.create_task(
+                run(
+                    **self._run_kwargs,
+                    input_path=job.input_path,
+                    output_path=job.output_path,
+                    verbose=False,
+                    on_result=job.record,
+                )
+            )
+            try:
+                await asyncio.shield(job.task)
+                job.status = "done"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                if not job.task.cancelled():
+                    # Se cancelo el worker (apagado): cancelar tambien el trabajo.
+                    job.task.cancel()
+                    await asyncio.gather(job.task, return_exceptions=True)
+                    raise
+            except Exception as exc:
+                logger.exception("Fallo el trabajo %s", job.id)
+                job.status = "failed"
+                job.error = f"{exc.__class__.__name__}: {exc}"
+            finally:
+                job.finished_at = time.time()
@@ -0,0 +1,246 @@
+import bisect
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    """Escapa un valor de label para el formato de texto de Prometheus."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Arma el bloque ``{a="x",b="y"}`` de una serie."""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    """Base de las metricas: nombre, ayuda y labels.
+
+    Attributes:
+        name: Nombre de la metrica en Prometheus.
+        help: Descripcion corta.
+        labels: Nombres de labels, en orden.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        """Guarda la definicion de la metrica.
+
+        Args:
+            name: Nombre de la metrica en Prometheus.
+            help: Descripcion corta.
+            labels: Nombres de labels, en orden.
+        """
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        """Convierte los labels recibidos en la clave de la serie."""
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> list[str]:
+        """Lineas de la metrica en formato de texto de Prometheus."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+    def snapshot(self) -> dict:
+        """Valores actuales por combinacion de labels."""
+        return {",".join(key) or "_": value for key, value in self._values.items()}
+
+
+class Counter(Metric):
+    """Contador monotono."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Suma ``amount`` a la serie de ``labels``."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Valor que sube y baja (p. ej. requests en vuelo)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """Fija el valor de la serie de ``labels``."""
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Suma ``amount`` a la serie de ``labels``."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """Resta ``amount`` a la serie de ``labels``."""
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Histograma de latencias con buckets acumulativos."""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """Guarda la definicion del histograma.
+
+        Args:
+            name: Nombre de la metrica en Prometheus.
+            help: Descripcion corta.
+            labels: Nombres de labels, en orden.
+            buckets: Limites superiores de los buckets, crecientes.
+        """
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Registra una observacion en la serie de ``labels``."""
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # [conteos por bucket (+Inf al final), suma, cantidad]
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Mide la duracion del bloque y la registra en la serie de ``labels``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        return {
+            ",".join(key) or "_": {"count": count, "sum": total, "mean": total / count if count else 0.0}
+            for key, (_, total, count) in self._series.items()
+        }
+
+
+class MetricsRegistry:
+    """Conjunto de metricas de un proceso."""
+    def __init__(self):
+        """Crea el registro vacio."""
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Agrega una metrica (o devuelve la ya registrada con ese nombre).
+
+        Args:
+            metric: Metrica a registrar.
+
+        Returns:
+            Metrica registrada.
+        """
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """Todas las metricas en formato de texto de Prometheus."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Valores actuales de todas las metricas (para logs o JSON)."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def write(self, path: Path) -> None:
+        """Escribe las metricas en ``path`` de forma atomica.
+
+        Args:
+            path: Archivo de destino (formato de texto de Prometheus, apto
+                para el textfile collector de node_exporter).
+        """
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "goofish_stage_seconds",
+        "Duracion de cada etapa del scraping (cookie_fetch, sign, http, decode, parse, sink_write)",
+        ("stage",),
+    )
+)
+UPSTREAM_RESPONSES = REGISTRY.register(
+    Counter("goofish_upstream_responses_total", "Respuestas de mtop por codigo ret o error de red", ("ret",))
+)
+ITEMS = REGISTRY.register(
+    Counter("goofish_items_total", "Resultados de scrape_one (un reintento diferido cuenta otra vez)", ("result",))
+)
+RETRIES = REGISTRY.register(
+    Counter("goofish_retries_total", "Reintentos diferidos agendados por clase de error", ("error_class",))
+)
+COOKIE_REFRESHES = REGISTRY.register(
+    Counter("goofish_cookie_fetches_total", "Obtenciones de cookies con el navegador", ("session",))
+)
+PROXY_QUARANTINES = REGISTRY.register(
+    Counter("goofish_proxy_quarantines_total", "Veces que un proxy entro en cuarentena", ("proxy",))
+)
+LEASES = REGISTRY.register(
+    Counter("goofish_queue_leases_total", "Eventos de la cola durable (claimed, reclaimed, acked, duplicate_ack)", ("event",))
+)
+CACHE_LOOKUPS = REGISTRY.register(Counter("goofish_cache_lookups_total", "Lecturas de la cache", ("result",)))
+HEDGES = REGISTRY.register(
+    Counter("goofish_hedged_requests_total", "Requests de respaldo (launched, won, lost, denied)", ("outcome",))
+)
+LOOP_LAG = REGISTRY.register(
+    Histogram("goofish_event_loop_lag_seconds", "Retraso del event loop respecto de un sleep periodico (con --profile)")
+)
+LOOP_BLOCKS = REGISTRY.register(
+    Counter("goofish_event_loop_blocks_total", "Veces que el event loop quedo bloqueado mas que el umbral")
+)
+IN_FLIGHT = REGISTRY.register(Gauge("goofish_in_flight_requests", "Requests a mtop en vuelo"))
+QUEUE_DEPTH = REGISTRY.register(Gauge("goofish_queue_depth", "Elementos esperando en cada cola", ("queue",)))
+
+
+def result_code(error: str | None) -> str:
+    """Reduce un ERROR (o su ausencia) a un label de baja cardinalidad.
+
+    Args:
+        error: Valor de ERROR del resultado, o None si fue exitoso.
+
+    Returns:
+        ``ok`` o el codigo del error sin el mensaje.
+    """
+    if not error:
+        return "ok"
+    return error.split("::", 1)[0]
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from pathlib import Path
+
+from utils.metrics import LOOP_BLOCKS, LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Mide el retraso del event loop y registra que codigo lo bloquea.
+
+    Una tarea duerme ``interval_s`` en bucle y mide cuanto de mas tardo en
+    despertar (el lag: tiempo en que el loop estuvo ocupado en otro
+    callback). Un hilo watchdog revisa el ultimo latido de esa tarea y, si
+    el loop lleva mas de ``block_threshold_s`` sin atenderla, loguea la pila
+    del hilo del loop en ese momento, es decir, el codigo que lo bloquea.
+
+    Un bloqueo dentro de una funcion en C que no suelta el GIL (p. ej. un
+    ``json.dumps`` enorme) retrasa tambien al watchdog; en ese caso la pila
+    se toma apenas el GIL se libera y puede mostrar el codigo siguiente.
+
+    Attributes:
+        interval_s: Periodo de muestreo del lag.
+        block_threshold_s: Bloqueo minimo que se loguea con su pila.
+        blocks: Bloqueos detectados.
+        max_lag_s: Mayor lag medido.
+    """
+    def __init__(self, interval_s: float = 0.05, block_threshold_s: float = 0.1, max_samples: int = 10000):
+        """Configura el monitor; se activa con ``start`` dentro del loop.
+
+        Args:
+            interval_s: Periodo de muestreo del lag.
+            block_threshold_s: Bloqueo minimo que se loguea con su pila.
+            max_samples: Muestras de lag que se conservan para percentiles.
+        """
+        self.interval_s = interval_s
+        self.block_threshold_s = block_threshold_s
+        self.blocks = 0
+        self.max_lag_s = 0.0
+        self._samples: deque[float] = deque(maxlen=max_samples)
+        self._beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        """Indica si el monitor esta activo."""
+        return self._task is not None
+
+    def start(self) -> None:
+        """Arranca el muestreo y el watchdog (llamar desde el event loop)."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Detiene el muestreo y el watchdog; las estadisticas se conservan."""
+        if not self.running:
+            return
+        self._task.cancel()
+        self._task = None
+        self._stop.set()
+        self._watchdog.join()
+
+    async def _sample(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval_s)
+            self._beat = time.monotonic()
+            lag = max(0.0, self._beat - started - self.interval_s)
+            self._samples.append(lag)
+            self.max_lag_s = max(self.max_lag_s, lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stop.wait(self.block_threshold_s / 2):
+            beat = self._beat
+            stalled_s = time.monotonic() - beat - self.interval_s
+            # Un solo aviso por bloqueo: el latido no cambia hasta que termina.
+            if stalled_s < self.block_threshold_s or beat == reported:
+                continue
+            reported = beat
+            self.blocks += 1
+            LOOP_BLOCKS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(sin pila)\n"
+            logger.warning("Event loop bloqueado hace %.0f ms en:\n%s", stalled_s * 1000, stack.rstrip())
+
+    def stats(self) -> dict:
+        """Resumen del lag medido.
+
+        Returns:
+            Diccionario con muestras, lag p50/p99/maximo en ms y bloqueos.
+        """
+        samples = sorted(self._samples)
+
+        def percentile(q: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+
+        return {
+            "running": self.running,
+            "samples": len(samples),
+            "lag_p50_ms": percentile(0.5),
+            "lag_p99_ms": percentile(0.99),
+            "lag_max_ms": round(self.max_lag_s * 1000, 2),
+            "blocks": self.blocks,
+        }
+
+
+class SamplingProfiler:
+    """Profiler de CPU por muestreo, sin dependencias externas.
+
+    Usa ``SIGPROF`` con ``setitimer(ITIMER_PROF)``: cada ``interval_s`` de
+    tiempo de CPU del proceso el handler anota la pila del hilo principal
+    (el del event loop) y cuenta las pilas iguales. Como el reloj es de CPU,
+    el tiempo en que el loop espera eventos no genera muestras; el de otros
+    hilos si, y se atribuye a lo que este haciendo el hilo principal.
+    ``write`` genera el formato "collapsed stacks" que leen
+    ``flamegraph.pl`` y speedscope.
+
+    Attributes:
+        interval_s: Tiempo de CPU entre muestras.
+        samples: Muestras tomadas.
+    """
+    def __init__(self, interval_s: float = 0.005):
+        """Configura el profiler.
+
+        Args:
+            interval_s: Tiempo de CPU entre muestras.
+        """
+        self.interval_s = interval_s
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._previous_handler = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        """Indica si el profiler esta muestreando."""
+        return self._running
+
+    def start(self) -> None:
+        """Empieza a muestrear.
+
+        Raises:
+            RuntimeError: Si no se llama desde el hilo principal (las senales
+                solo se atienden ahi) o la plataforma no tiene ``SIGPROF``.
+        """
+        if self._running:
+            return
+        if not hasattr(signal, "SIGPROF"):
+            raise RuntimeError("El profiler de CPU requiere SIGPROF (no disponible en esta plataforma)")
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError("El profiler de CPU debe iniciarse en el hilo principal")
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval_s, self.interval_s)
+        self._running = True
+
+    def stop(self) -> None:
+        """Deja de muestrear; las muestras se conservan."""
+        if not self._running:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        self._running = False
+
+    def _sample(self, signum: int, frame) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def write(self, path: Path) -> None:
+        """Escribe las pilas muestreadas en formato collapsed (``pila cuenta``).
+
+        Args:
+            path: Archivo de salida.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as file:
+            for stack, count in self._stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def top(self, limit: int = 10) -> list[tuple[str, float]]:
+        """Funciones con mas muestras propias (la cima de la pila).
+
+        Args:
+            limit: Cantidad de funciones.
+
+        Returns:
+            Lista de (funcion, fraccion de las muestras).
+        """
+        leaves: Counter = Counter()
+        for stack, count in self._stacks.items():
+            leaves[stack.rpartition(";")[2]] += count
+        return [(name, count / self.samples) for name, count in leaves.most_common(limit)]
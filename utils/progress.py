@@ -0,0 +1,69 @@
+import time
+
+
+class ProgressReporter:
+    """Imprime una linea de progreso resumida cada ``interval_s`` segundos.
+
+    Reemplaza el ``print`` por URL: el costo por fila es solo sumar contadores.
+
+    Attributes:
+        total: Cantidad total de items esperados.
+        ok: Items terminados con exito.
+        errors: Items terminados con error (sin contar duplicados).
+        duplicates: Items descartados por duplicados.
+    """
+    def __init__(self, total: int, interval_s: float = 2.0, initial: int = 0):
+        """Inicializa los contadores.
+
+        Args:
+            total: Cantidad total de items esperados.
+            interval_s: Segundos minimos entre lineas de progreso.
+            initial: Items ya completados antes de empezar (p. ej. al reanudar).
+        """
+        self.total = total
+        self.ok = 0
+        self.errors = 0
+        self.duplicates = 0
+        self._initial = initial
+        self._interval_s = interval_s
+        self._started = time.monotonic()
+        self._last_print = self._started
+
+    @property
+    def done(self) -> int:
+        """Items procesados en esta corrida."""
+        return self.ok + self.errors + self.duplicates
+
+    def skip(self, count: int = 1) -> None:
+        """Cuenta items omitidos sin procesarlos (ya completados).
+
+        Args:
+            count: Cantidad de items omitidos.
+        """
+        self._initial += count
+
+    def record(self, data: dict) -> None:
+        """Registra un resultado y, si corresponde, imprime el progreso.
+
+        Args:
+            data: Resultado de ``scrape_one`` (con ERROR si fallo).
+        """
+        error = data.get("ERROR")
+        if not error:
+            self.ok += 1
+        elif error == "DUPLICATE_URL":
+            self.duplicates += 1
+        else:
+            self.errors += 1
+        now = time.monotonic()
+        if now - self._last_print >= self._interval_s:
+            self._last_print = now
+            print(self.line())
+
+    def line(self) -> str:
+        """Linea de progreso con contadores y tasa actual."""
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return (
+            f"[{self._initial + self.done}/{self.total}] ok={self.ok} error={self.errors} "
+            f"dup={self.duplicates} rate={self.done / elapsed:.1f}/s"
+        )
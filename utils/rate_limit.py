@@ -0,0 +1,156 @@
+import asyncio
+import random
+import time
+
+
+class TokenBucket:
+    """Token bucket con reservas: cada request consume un token y, si no hay,
+    recibe la espera necesaria hasta que se genere.
+
+    Attributes:
+        rate: Tokens generados por segundo.
+        burst: Capacidad maxima del bucket.
+    """
+    def __init__(self, rate: float, burst: float):
+        """Crea el bucket lleno.
+
+        Args:
+            rate: Tokens por segundo.
+            burst: Capacidad maxima (rafaga permitida).
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Consume un token y devuelve cuanto hay que esperar para usarlo.
+
+        Args:
+            now: Instante actual (``time.monotonic()``).
+
+        Returns:
+            Segundos de espera (0 si habia tokens disponibles).
+        """
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    def refund(self) -> None:
+        """Devuelve el token de una reserva que no se llego a usar."""
+        self._tokens = min(self.burst, self._tokens + 1)
+
+
+class RateLimiter:
+    """Limitador de requests global y por sesion (cookie o proxy).
+
+    Combina un bucket global, un bucket por clave de sesion, jitter aleatorio
+    y un backoff exponencial temporal para las sesiones que devuelven errores
+    de token o anti-bot. Una sesion se recupera con la primera respuesta
+    exitosa.
+    """
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        session_rate: float | None = None,
+        session_burst: float | None = None,
+        jitter_s: float = 0.0,
+        backoff_s: float = 5.0,
+        max_backoff_s: float = 120.0,
+    ):
+        """Configura los limites; ``None`` desactiva el nivel correspondiente.
+
+        Args:
+            rate: Requests por segundo globales.
+            burst: Rafaga global permitida (por defecto ``rate``).
+            session_rate: Requests por segundo por sesion.
+            session_burst: Rafaga por sesion (por defecto ``session_rate``).
+            jitter_s: Espera aleatoria maxima agregada a cada request.
+            backoff_s: Backoff inicial tras un error de token/anti-bot.
+            max_backoff_s: Backoff maximo por sesion.
+        """
+        self._global = TokenBucket(rate, burst or rate) if rate else None
+        self._session_rate = session_rate
+        self._session_burst = session_burst or session_rate
+        self._sessions: dict[str, TokenBucket] = {}
+        self._jitter_s = jitter_s
+        self._backoff_s = backoff_s
+        self._max_backoff_s = max_backoff_s
+        self._strikes: dict[str, int] = {}
+        self._blocked_until: dict[str, float] = {}
+
+    def backoff_remaining(self, key: str) -> float:
+        """Segundos que le quedan de backoff a una sesion.
+
+        Args:
+            key: Identificador de la sesion.
+
+        Returns:
+            Segundos restantes (0 si no esta penalizada).
+        """
+        return max(0.0, self._blocked_until.get(key, 0.0) - time.monotonic())
+
+    async def acquire(self, key: str) -> None:
+        """Espera el turno de una request de la sesion ``key``.
+
+        Una sesion penalizada espera su backoff sin reservar tokens (asi no
+        le quita capacidad global a las demas) y recien despues reserva. Si
+        la espera se cancela (p. ej. un respaldo que perdio la carrera), los
+        tokens reservados se devuelven.
+
+        Args:
+            key: Identificador de la sesion (cookie o proxy).
+        """
+        # Se vuelve a mirar al despertar: la sesion pudo penalizarse de nuevo.
+        while (backoff := self.backoff_remaining(key)) > 0:
+            await asyncio.sleep(backoff)
+        now = time.monotonic()
+        wait = 0.0
+        reserved: list[TokenBucket] = []
+        if self._global is not None:
+            wait = max(wait, self._global.reserve(now))
+            reserved.append(self._global)
+        if self._session_rate:
+            bucket = self._sessions.get(key)
+            if bucket is None:
+                bucket = self._sessions[key] = TokenBucket(self._session_rate, self._session_burst)
+            wait = max(wait, bucket.reserve(now))
+            reserved.append(bucket)
+        if self._jitter_s:
+            wait += random.uniform(0, self._jitter_s)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                for bucket in reserved:
+                    bucket.refund()
+                raise
+
+    def penalize(self, key: str) -> None:
+        """Aplica backoff exponencial a una sesion que devolvio token/anti-bot.
+
+        Las requests que ya estaban en vuelo con las mismas cookies fallan
+        juntas; mientras la sesion siga penalizada no se acumulan strikes.
+
+        Args:
+            key: Identificador de la sesion.
+        """
+        if self.backoff_remaining(key) > 0:
+            return
+        strikes = self._strikes.get(key, 0) + 1
+        self._strikes[key] = strikes
+        delay = min(self._max_backoff_s, self._backoff_s * 2 ** (strikes - 1))
+        self._blocked_until[key] = time.monotonic() + delay
+
+    def reward(self, key: str) -> None:
+        """Limpia el backoff de una sesion tras una respuesta exitosa.
+
+        Args:
+            key: Identificador de la sesion.
+        """
+        if self._strikes.pop(key, None) is not None:
+            self._blocked_until.pop(key, None)
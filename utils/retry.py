@@ -0,0 +1,186 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import Counter
+
+from utils.metrics import RETRIES
+
+# Clases de errores pasajeros; el resto (p. ej. FAIL_BIZ_*) es definitivo.
+ERROR_CLASSES = (
+    ("timeout", ("REQUEST_TIMEOUT", "READ_TIMEOUT", "CONNECT_TIMEOUT")),
+    ("network", ("REQUEST_ERROR",)),
+    ("token", ("FAIL_SYS_TOKEN", "TOKEN_EMPTY")),
+    ("antibot", ("RGV587_ERROR",)),
+    ("decode", ("DECODE_EMPTY",)),
+    ("exception", ("EXCEPTION",)),
+)
+# Una excepcion no controlada suele ser un bug (se repetiria igual): solo
+# se reintenta si se pide con ``--retry-budget exception=n``.
+DEFAULT_BUDGETS = {"timeout": 3, "network": 3, "token": 2, "antibot": 2, "decode": 1, "exception": 0}
+
+
+def error_class(error: str | None) -> str | None:
+    """Clasifica un ERROR en una clase de error pasajero.
+
+    Args:
+        error: Valor de ERROR del resultado.
+
+    Returns:
+        Nombre de la clase, o None si el error es definitivo (o no hay error).
+    """
+    if not error:
+        return None
+    for name, codes in ERROR_CLASSES:
+        if any(code in error for code in codes):
+            return name
+    return None
+
+
+def parse_budgets(spec: str) -> dict[str, int]:
+    """Lee presupuestos de reintento en formato ``clase=n,clase=n``.
+
+    Las clases que no aparecen conservan el valor de ``DEFAULT_BUDGETS``.
+
+    Args:
+        spec: Texto de la opcion ``--retry-budget``.
+
+    Returns:
+        Presupuesto por clase.
+
+    Raises:
+        ValueError: Si una clase no existe o el formato es invalido.
+    """
+    budgets = dict(DEFAULT_BUDGETS)
+    for part in filter(None, (chunk.strip() for chunk in spec.split(","))):
+        name, _, value = part.partition("=")
+        if name not in budgets or not value.isdigit():
+            raise ValueError(f"Presupuesto invalido: {part!r} (clases: {', '.join(budgets)})")
+        budgets[name] = int(value)
+    return budgets
+
+
+class RetryScheduler:
+    """Cola de reintentos diferidos con backoff exponencial y jitter.
+
+    Un item con error pasajero no se reintenta en el worker: se agenda para
+    dentro de ``base_delay_s * 2**n`` segundos (con jitter) y el worker sigue
+    con URLs nuevas. Cada clase de error tiene su propio presupuesto por item.
+
+    Los workers toman primero los reintentos vencidos (``pop_due``) y, cuando
+    se agota la entrada, esperan los pendientes con ``next`` (pasada final).
+    ``next`` devuelve None recien cuando no quedan reintentos agendados, ni
+    items en proceso que puedan generar otros, ni workers leyendo la entrada.
+
+    Attributes:
+        budgets: Reintentos permitidos por clase de error y por item.
+        deferred: Reintentos agendados por clase de error.
+    """
+    def __init__(
+        self,
+        budgets: dict[str, int] | None = None,
+        base_delay_s: float = 2.0,
+        max_delay_s: float = 60.0,
+        sources: int = 1,
+    ):
+        """Configura la cola.
+
+        Args:
+            budgets: Reintentos por clase (por defecto ``DEFAULT_BUDGETS``).
+            base_delay_s: Espera antes del primer reintento de una clase.
+            max_delay_s: Espera maxima entre reintentos.
+            sources: Workers que todavia leen la entrada; cada uno avisa con
+                ``source_done`` al terminarla.
+        """
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.deferred: Counter = Counter()
+        self._base_delay_s = base_delay_s
+        self._max_delay_s = max_delay_s
+        self._sources = sources
+        self._active = 0
+        # (vence, orden, url, intentos, reintentos por clase)
+        self._heap: list[tuple[float, int, str, int, dict[str, int]]] = []
+        self._history: dict[str, dict[str, int]] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def begin(self) -> None:
+        """Marca que un worker empezo a procesar un item."""
+        self._active += 1
+
+    def end(self) -> None:
+        """Marca que un worker termino (o difirio) el item en curso."""
+        self._active -= 1
+        self._wakeup.set()
+
+    def source_done(self) -> None:
+        """Avisa que un worker termino de leer la entrada."""
+        self._sources -= 1
+        self._wakeup.set()
+
+    def defer(self, url: str, attempts: int, error: str | None) -> bool:
+        """Agenda un reintento si el error es pasajero y queda presupuesto.
+
+        Args:
+            url: URL del item.
+            attempts: Intentos ya realizados sobre el item.
+            error: ERROR del ultimo intento.
+
+        Returns:
+            True si se agendo; False si el resultado es definitivo.
+        """
+        name = error_class(error)
+        if name is None:
+            return False
+        history = self._history.pop(url, {})
+        used = history.get(name, 0)
+        if used >= self.budgets.get(name, 0):
+            return False
+        history[name] = used + 1
+        delay = min(self._max_delay_s, self._base_delay_s * 2**used)
+        # Jitter "equal": entre la mitad y el total de la espera.
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), url, attempts, history))
+        self.deferred[name] += 1
+        RETRIES.inc(error_class=name)
+        self._wakeup.set()
+        return True
+
+    def pop_due(self) -> tuple[str, int] | None:
+        """Toma un reintento vencido sin esperar.
+
+        Returns:
+            Tupla (url, intentos previos), o None si no hay ninguno vencido.
+        """
+        if not self._heap or self._heap[0][0] > time.monotonic():
+            return None
+        _, _, url, attempts, history = heapq.heappop(self._heap)
+        self._history[url] = history
+        return url, attempts
+
+    async def next(self) -> tuple[str, int] | None:
+        """Espera el proximo reintento vencido.
+
+        Returns:
+            Tupla (url, intentos previos), o None si ya no habra mas.
+        """
+        while True:
+            item = self.pop_due()
+            if item is not None:
+                return item
+            if not self._heap and not self._active and self._sources <= 0:
+                return None
+            timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def forget(self, url: str) -> None:
+        """Descarta el historial de reintentos de un item ya terminado."""
+        self._history.pop(url, None)
@@ -1,15 +1,42 @@
 import argparse
 import asyncio
 import csv
-import json
+import logging
+import multiprocessing
 import sys
+import time
+from contextlib import AsyncExitStack
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import httpx
 
 if __package__ is None or __package__ == "":
     sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from utils.BrowserService import BrowserService
+from utils.cache import ResultCache
+from utils.concurrency import AdaptiveConcurrency
+from utils.checkpoint import CheckpointJournal, item_key, load_resume_state
 from utils.CookieManager import CookieManager
-from utils.scraping_repository import get_fresh_cookies, parse_product, scrape_pdp
+from utils.CookiePool import CookiePool
+from utils.cookie_vault import CookieVault
+from utils.decoding import ProductRecord
+from utils.hedging import HedgePolicy
+from utils.idset import ItemIdSet
+from utils.metrics import ITEMS, QUEUE_DEPTH, REGISTRY, STAGE_SECONDS, result_code
+from utils.profiling import LoopMonitor, SamplingProfiler
+from utils.progress import ProgressReporter
+from utils.proxy_pool import Proxy, ProxyPool, load_proxies
+from utils.rate_limit import RateLimiter
+from utils.retry import RetryScheduler, parse_budgets
+from utils.sharding import merge_parts, part_path, shard_of
+from utils.sinks import SinkWriter, detect_format, open_sink
+from utils.snapshots import SnapshotStore
+from utils.work_queue import WorkQueue, worker_id
+from utils.scraping_repository import build_http_client, fetch_product
+
+logger = logging.getLogger(__name__)
 
 TOKEN_ERRORS = ("FAIL_SYS_TOKEN", "TOKEN_EMPTY", "RGV587_ERROR")
 OUTPUT_FIELDS = [
@@ -26,57 +53,282 @@ OUTPUT_FIELDS = [
     "SELLER_ID",
     "URL",
     "ERROR",
+    "ATTEMPTS",
 ]
+# Salida de ``--refresh``: solo items nuevos o con cambios y que campos cambiaron.
+DELTA_FIELDS = OUTPUT_FIELDS + ["CHANGED"]
 
 
 async def scrape_one(
     url: str,
-    cookie_mgr: CookieManager,
+    cookie_mgr: CookieManager | CookiePool,
     retries: int,
     timeout_s: float,
+    client: httpx.AsyncClient | None = None,
+    concurrency: AdaptiveConcurrency | None = None,
+    rate_limiter: RateLimiter | None = None,
+    cache: ResultCache | None = None,
+    bypass_cache: bool = False,
+    hedge: HedgePolicy | None = None,
 ) -> dict:
     """Scrapea una URL con reintentos y manejo de tokens.
 
     Args:
         url: URL del producto.
-        cookie_mgr: Gestor de cookies para la sesion.
+        cookie_mgr: Gestor o pool de cookies; se reserva una sesion por URL.
         retries: Reintentos cuando falla el token.
         timeout_s: Timeout maximo por request.
+        client: Cliente HTTP compartido con pool keep-alive. Si es None,
+            ``fetch_product`` abre una conexion nueva por request.
+        concurrency: Controlador adaptativo; cada intento ocupa un cupo y
+            reporta su latencia y codigo ``ret``.
+        rate_limiter: Limitador global/por sesion aplicado antes de cada intento.
+        cache: Cache de resultados por itemId; un acierto evita la request.
+        bypass_cache: Ignora la cache al leer (el resultado nuevo se guarda igual).
+        hedge: Politica de hedging; un intento que supera su percentil de
+            latencia lanza un respaldo con otra sesion y gana el primero.
 
     Returns:
         Diccionario con datos del producto o un error.
     """
+    key = item_key(url)
+    if cache is not None and not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            cached["URL"] = url
+            ITEMS.inc(result=result_code(cached.get("ERROR")))
+            return cached
+
+    data = await _fetch_one(url, cookie_mgr, retries, timeout_s, client, concurrency, rate_limiter, hedge)
+    ITEMS.inc(result=result_code(data.get("ERROR")))
+    if cache is not None:
+        cache.put(key, data)
+    return data
+
+
+async def _fetch_one(
+    url: str,
+    cookie_mgr: CookieManager | CookiePool,
+    retries: int,
+    timeout_s: float,
+    client: httpx.AsyncClient | None,
+    concurrency: AdaptiveConcurrency | None,
+    rate_limiter: RateLimiter | None,
+    hedge: HedgePolicy | None = None,
+) -> dict:
+    """Hace las requests de ``scrape_one`` (sin cache); mismos argumentos."""
     last_ret = ""
-    for _ in range(retries + 1):
-        cookies = await cookie_mgr.ensure(url)
+    async with cookie_mgr.lease() as session:
+        for _ in range(retries + 1):
+            cookies = await session.ensure(url)
+            if hedge is None:
+                ret, record = await _attempt(url, session, cookies, timeout_s, client, concurrency, rate_limiter)
+                used, used_cookies = session, cookies
+            else:
+                ret, record, used, used_cookies = await _hedged_attempt(
+                    url, session, cookies, cookie_mgr, timeout_s, client, concurrency, rate_limiter, hedge
+                )
+            last_ret = ret
+
+            if ret == "REQUEST_TIMEOUT":
+                return {"URL": url, "ERROR": ret}
+            if ret and "SUCCESS" not in ret:
+                if any(err in ret for err in TOKEN_ERRORS):
+                    if rate_limiter is not None:
+                        rate_limiter.penalize(used.name)
+                    await used.refresh(url, stale=used_cookies)
+                    continue
+                return {"URL": url, "ERROR": ret}
+
+            if rate_limiter is not None:
+                rate_limiter.reward(used.name)
+            if record is None:
+                # SUCCESS sin ``data.item`` legible: no es un producto vacio.
+                return {"URL": url, "ERROR": "DECODE_EMPTY"}
+
+            with STAGE_SECONDS.time(stage="parse"):
+                parsed = record.to_dict()
+            parsed["URL"] = url
+            return parsed
+
+    return {"URL": url, "ERROR": last_ret or "UNKNOWN_ERROR"}
+
+
+async def _attempt(
+    url: str,
+    session: CookieManager,
+    cookies: dict,
+    timeout_s: float,
+    client: httpx.AsyncClient | None,
+    concurrency: AdaptiveConcurrency | None,
+    rate_limiter: RateLimiter | None,
+    on_start: Callable[[], None] | None = None,
+) -> tuple[str, ProductRecord | None]:
+    """Un intento contra mtop con la sesion dada, respetando limites.
+
+    El token del rate limiter se reserva recien con el cupo de concurrencia
+    tomado: las requests que esperan cupo no reservan tokens a futuro que
+    demorarian a las de otros consumidores del mismo limiter (p. ej. los
+    trabajos de la API frente a ``/scrapePDP``). ``on_start`` se invoca con
+    ambos tomados, justo antes de la request.
+
+    Returns:
+        Tupla (codigo ``ret``, producto); ``REQUEST_TIMEOUT`` si vence
+        ``timeout_s``.
+    """
+    if concurrency is not None:
+        await concurrency.acquire()
+    if rate_limiter is not None:
         try:
-            result = await asyncio.wait_for(
-                scrape_pdp(
-                    url,
-                    save_to_file=False,
-                    cookies=cookies,
-                    use_proxy=cookie_mgr.use_proxy,
-                ),
-                timeout=timeout_s,
+            await rate_limiter.acquire(session.name)
+        except BaseException:
+            if concurrency is not None:
+                concurrency.cancel()
+            raise
+    ret = "EXCEPTION"
+    cancelled = False
+    started = time.perf_counter()
+    if on_start is not None:
+        on_start()
+    try:
+        ret, record = await asyncio.wait_for(
+            fetch_product(url, cookies, use_proxy=session.use_proxy, client=session.client or client),
+            timeout=timeout_s,
+        )
+    except asyncio.TimeoutError:
+        ret, record = "REQUEST_TIMEOUT", None
+    except asyncio.CancelledError:
+        # Perdio la carrera contra un respaldo (o se cancelo la corrida): no
+        # hubo respuesta, asi que no cuenta para la salud ni para el AIMD.
+        cancelled = True
+        raise
+    finally:
+        if cancelled:
+            if concurrency is not None:
+                concurrency.cancel()
+        else:
+            elapsed = time.perf_counter() - started
+            session.report(ret, elapsed)
+            if concurrency is not None:
+                concurrency.release(ret, elapsed)
+    return ret, record
+
+
+async def _hedged_attempt(
+    url: str,
+    session: CookieManager,
+    cookies: dict,
+    cookie_mgr: CookieManager | CookiePool,
+    timeout_s: float,
+    client: httpx.AsyncClient | None,
+    concurrency: AdaptiveConcurrency | None,
+    rate_limiter: RateLimiter | None,
+    hedge: HedgePolicy,
+) -> tuple[str, ProductRecord | None, CookieManager, dict]:
+    """Corre un intento y, si tarda mas que el percentil de ``hedge``, un respaldo.
+
+    La espera se cuenta desde que el intento original obtiene cupo, asi no
+    se cubren requests que solo estan en cola. El respaldo reserva otra
+    sesion del pool (con un pool, la menos cargada, que suele ser otra
+    sesion u otro proxy) y consume presupuesto recien al obtener su cupo.
+    Gana el primer intento exitoso y el otro se cancela; si ninguno tiene
+    exito se usa el resultado del intento original.
+
+    Returns:
+        Tupla (``ret``, producto, sesion y cookies que lo obtuvieron).
+    """
+    starts: dict[str, float] = {}
+    primary_started = asyncio.Event()
+
+    def start_primary() -> None:
+        starts["primary"] = time.perf_counter()
+        primary_started.set()
+
+    def start_backup() -> None:
+        starts["backup"] = time.perf_counter()
+        hedge.launched()
+
+    async def original() -> tuple[str, ProductRecord | None, CookieManager, dict]:
+        ret, record = await _attempt(
+            url, session, cookies, timeout_s, client, concurrency, rate_limiter, on_start=start_primary
+        )
+        return ret, record, session, cookies
+
+    async def backup() -> tuple[str, ProductRecord | None, CookieManager, dict]:
+        async with cookie_mgr.lease() as other:
+            other_cookies = await other.ensure(url)
+            ret, record = await _attempt(
+                url, other, other_cookies, timeout_s, client, concurrency, rate_limiter, on_start=start_backup
             )
-        except asyncio.TimeoutError:
-            return {"URL": url, "ERROR": "REQUEST_TIMEOUT"}
-        ret = result.get("ret", [""])[0]
-        last_ret = ret
-
-        if ret and "SUCCESS" not in ret:
-            if any(err in ret for err in TOKEN_ERRORS):
-                await cookie_mgr.refresh(url)
-                continue
-            return {"URL": url, "ERROR": ret}
-
-        parsed = await parse_product(result)
-        parsed["URL"] = url
-        if isinstance(parsed.get("IMAGES"), list):
-            parsed["IMAGES"] = json.dumps(parsed["IMAGES"], ensure_ascii=False)
-        return parsed
+            return ret, record, other, other_cookies
 
-    return {"URL": url, "ERROR": last_ret or "UNKNOWN_ERROR"}
+    primary = asyncio.create_task(original())
+    secondary = None
+    try:
+        delay_s = hedge.delay()
+        if delay_s is not None:
+            started = asyncio.create_task(primary_started.wait())
+            try:
+                await asyncio.wait({primary, started}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                started.cancel()
+            if not primary.done():
+                await asyncio.wait({primary}, timeout=max(0.0, delay_s - (time.perf_counter() - starts["primary"])))
+        if primary.done() or delay_s is None or not hedge.allow():
+            result = await primary
+            if "SUCCESS" in result[0]:
+                hedge.observe(time.perf_counter() - starts["primary"])
+            return result
+
+        secondary = asyncio.create_task(backup())
+        pending = {primary, secondary}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (primary, secondary):
+                    if task in done and not task.exception() and "SUCCESS" in task.result()[0]:
+                        winner = task
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    except asyncio.CancelledError:
+        # Si se cancela el worker, los intentos en curso no pueden quedar
+        # ocupando cupo.
+        primary.cancel()
+        if secondary is not None:
+            secondary.cancel()
+        raise
+    if "backup" in starts:
+        hedge.record(won=winner is secondary)
+    if winner is None:
+        return primary.result()
+    hedge.observe(time.perf_counter() - starts["backup" if winner is secondary else "primary"])
+    return winner.result()
+
+
+def iter_urls(csv_path: Path) -> Iterator[str]:
+    """Lee URLs desde un CSV con columna URL de forma perezosa.
+
+    Args:
+        csv_path: Ruta al CSV de entrada.
+
+    Yields:
+        URLs no vacias en el orden del archivo.
+    """
+    with csv_path.open("r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "URL" not in header:
+            return
+        url_idx = header.index("URL")
+        for row in reader:
+            if len(row) > url_idx:
+                url = row[url_idx].strip()
+                if url:
+                    yield url
 
 
 def load_urls(csv_path: Path) -> list[str]:
@@ -88,26 +340,36 @@ def load_urls(csv_path: Path) -> list[str]:
     Returns:
         Lista de URLs encontradas.
     """
-    with csv_path.open("r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        urls = []
-        for row in reader:
-            url = (row.get("URL") or "").strip()
-            if url:
-                urls.append(url)
-    return urls
+    return list(iter_urls(csv_path))
+
 
+def count_rows(csv_path: Path) -> int:
+    """Cuenta las filas de datos de un CSV sin parsearlo (solo para progreso).
 
-def build_row(data: dict) -> dict:
+    Args:
+        csv_path: Ruta al CSV.
+
+    Returns:
+        Cantidad de lineas menos el header.
+    """
+    lines = 0
+    with csv_path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            lines += chunk.count(b"\n")
+    return max(lines - 1, 0)
+
+
+def build_row(data: dict, fields: list[str] = OUTPUT_FIELDS) -> dict:
     """Construye una fila completa con todas las columnas esperadas.
 
     Args:
         data: Datos parciales del producto.
+        fields: Columnas de salida.
 
     Returns:
-        Diccionario con todas las columnas definidas en OUTPUT_FIELDS.
+        Diccionario con todas las columnas de ``fields``.
     """
-    row = {key: "" for key in OUTPUT_FIELDS}
+    row = {key: "" for key in fields}
     row.update({key: value for key, value in data.items() if key in row})
     return row
 
@@ -119,79 +381,685 @@ async def run(
     retries: int,
     use_proxy: bool,
     timeout_s: float,
+    http2: bool = False,
+    max_connections: int = 100,
+    max_keepalive: int = 20,
+    cookie_sessions: int = 2,
+    browser_contexts: int = 2,
+    browser_recycle_after: int = 200,
+    cookie_vault_path: Path | None = None,
+    cookie_refresh_margin_s: float = 120.0,
+    resume: bool = False,
+    retry_errors: bool = False,
+    checkpoint_path: Path | None = None,
+    adaptive: bool = False,
+    min_workers: int = 1,
+    max_workers: int | None = None,
+    rate: float | None = None,
+    session_rate: float | None = None,
+    burst: float | None = None,
+    jitter_s: float = 0.0,
+    hedge_quantile: float | None = None,
+    hedge_budget: float = 0.05,
+    output_format: str | None = None,
+    batch_size: int = 500,
+    flush_interval_s: float = 1.0,
+    progress_interval_s: float = 2.0,
+    metrics_path: Path | None = None,
+    metrics_interval_s: float = 10.0,
+    profile: bool = False,
+    block_threshold_s: float = 0.1,
+    profile_output: Path | None = None,
+    profile_duration_s: float = 0.0,
+    cache_path: Path | None = None,
+    cache_ttl_s: float = 86400.0,
+    negative_ttl_s: float = 3600.0,
+    bypass_cache: bool = False,
+    retry_budgets: dict[str, int] | None = None,
+    retry_delay_s: float = 2.0,
+    retry_max_delay_s: float = 60.0,
+    proxies: list[Proxy] | None = None,
+    snapshot_path: Path | None = None,
+    refresh: bool = False,
+    refresh_budget: int = 5000,
+    refresh_min_age_s: float = 3600.0,
+    queue_path: Path | None = None,
+    lease_s: float = 60.0,
+    claim_batch: int = 50,
+    queue_wal: bool = True,
+    shard: tuple[int, int] | None = None,
+    resume_state_path: Path | None = None,
+    verbose: bool = True,
+    on_result: Callable[[dict], None] | None = None,
+    client: httpx.AsyncClient | None = None,
+    cookie_pool: CookiePool | None = None,
+    rate_limiter: RateLimiter | None = None,
+    concurrency: AdaptiveConcurrency | None = None,
+    cache: ResultCache | None = None,
+    hedge: HedgePolicy | None = None,
 ) -> None:
-    """Orquesta el scraping concurrente por URLs y genera el CSV.
+    """Orquesta el scraping concurrente por URLs y genera la salida.
+
+    Todos los workers comparten un unico cliente HTTP con pool keep-alive, de
+    modo que cada request reutiliza conexiones TCP/TLS ya abiertas, y un
+    ``CookiePool`` con ``cookie_sessions`` sesiones de cookies que se refrescan
+    sobre un unico Chromium persistente (``BrowserService``).
+
+    Las filas se escriben por lotes desde una cola (``SinkWriter``) en CSV,
+    JSONL, Parquet o SQLite, y el progreso se imprime como una linea resumida
+    cada ``progress_interval_s`` segundos.
+
+    Las URLs se leen de forma perezosa hacia una cola acotada y se deduplican
+    por itemId en un ``ItemIdSet`` compacto, asi la memoria no crece con el
+    tamano del CSV de entrada.
+
+    Con ``resume`` se omiten los items que ya terminaron con exito (segun el
+    journal ``checkpoint_path`` o el CSV de salida) y las filas nuevas se
+    agregan al final del CSV existente. Con ``retry_errors`` solo se reencolan
+    las URLs cuya ultima fila tiene ERROR, sin releer el CSV de entrada.
 
     Args:
         input_path: Ruta del CSV de entrada.
-        output_path: Ruta del CSV de salida.
+        output_path: Ruta de la salida (el formato se infiere de la extension).
         workers: Cantidad de workers en paralelo.
-        retries: Reintentos por URL si falla el token.
+        retries: Reintentos en el momento si falla el token; solo se usan
+            si ``retry_budgets`` no reintenta las clases ``token`` ni
+            ``antibot`` (un item no pasa por los dos niveles).
         use_proxy: Indica si se usa proxy al obtener cookies.
         timeout_s: Timeout maximo por URL.
+        http2: Habilita HTTP/2 en el cliente compartido.
+        max_connections: Maximo de conexiones abiertas en el pool.
+        max_keepalive: Maximo de conexiones ociosas que se mantienen vivas.
+        cookie_sessions: Cantidad de sesiones de cookies compartidas.
+        browser_contexts: Maximo de refrescos de cookies en paralelo.
+        browser_recycle_after: Refrescos tras los cuales se recicla Chromium.
+        cookie_vault_path: Boveda JSON de cookies compartida entre procesos;
+            las sesiones vigentes se reutilizan sin abrir el navegador.
+        cookie_refresh_margin_s: Segundos antes del vencimiento de
+            ``_m_h5_tk`` en que se renueva el token en segundo plano.
+        resume: Reanuda una corrida previa sobre el mismo CSV de salida.
+        retry_errors: Reencola solo las URLs con error de una corrida previa.
+        checkpoint_path: Journal append-only con el estado de cada URL.
+        adaptive: Ajusta las requests en vuelo con un controlador AIMD entre
+            ``min_workers`` y ``max_workers`` (``workers`` es el valor inicial).
+        min_workers: Piso de requests en vuelo en modo adaptativo.
+        max_workers: Techo de requests en vuelo en modo adaptativo
+            (por defecto ``4 * workers``).
+        rate: Requests por segundo globales (None = sin limite).
+        session_rate: Requests por segundo por sesion de cookies.
+        burst: Rafaga permitida por encima de ``rate``/``session_rate``.
+        jitter_s: Espera aleatoria maxima agregada a cada request.
+        hedge_quantile: Percentil de latencia (p. ej. 0.95) a partir del cual
+            un intento lanza una request de respaldo; None desactiva el
+            hedging.
+        hedge_budget: Fraccion maxima de intentos con respaldo.
+        output_format: Formato de salida (csv, jsonl, parquet, sqlite); por
+            defecto segun la extension de ``output_path``.
+        batch_size: Filas por lote de escritura.
+        flush_interval_s: Maxima demora de una fila antes de escribirse.
+        progress_interval_s: Segundos entre lineas de progreso.
+        metrics_path: Archivo donde se vuelcan las metricas en formato de
+            texto de Prometheus cada ``metrics_interval_s`` y al terminar.
+        metrics_interval_s: Segundos entre volcados de metricas.
+        profile: Mide el lag del event loop y loguea con su pila cada
+            callback que lo bloquea mas de ``block_threshold_s``.
+        block_threshold_s: Bloqueo minimo que se loguea.
+        profile_output: Archivo donde guardar un perfil de CPU por muestreo
+            del hilo del loop (formato collapsed stacks, para flamegraphs).
+        profile_duration_s: Segundos de corrida a perfilar desde el inicio
+            (0 = toda la corrida).
+        cache_path: Base SQLite de la cache de resultados por itemId; los
+            items vigentes en la cache no se vuelven a pedir.
+        cache_ttl_s: Vigencia de un resultado exitoso en la cache.
+        negative_ttl_s: Vigencia de un error del item en la cache.
+        bypass_cache: No lee la cache (pero guarda los resultados nuevos).
+        retry_budgets: Reintentos diferidos por clase de error pasajero y por
+            item (por defecto ``DEFAULT_BUDGETS``; ``{}`` los desactiva).
+        retry_delay_s: Espera antes del primer reintento diferido.
+        retry_max_delay_s: Espera maxima entre reintentos diferidos.
+        proxies: Proxies de salida; si hay, se usa un ``ProxyPool`` (una
+            sesion de cookies y un cliente por proxy) en lugar del
+            ``CookiePool``.
+        snapshot_path: Base SQLite con el ultimo estado de cada item; cada
+            resultado exitoso se registra con su hash.
+        refresh: Refresco incremental: en lugar de leer ``input_path`` se
+            eligen hasta ``refresh_budget`` items de ``snapshot_path`` por
+            antiguedad y volatilidad (las URLs nuevas de ``input_path``, si
+            existe, van primero) y la salida solo tiene los items nuevos o
+            que cambiaron, con la columna CHANGED.
+        refresh_budget: Maximo de items a pedir en un refresco.
+        refresh_min_age_s: Antiguedad minima de un item para refrescarlo.
+        queue_path: Cola durable SQLite compartida con otros procesos o nodos.
+            Las URLs de ``input_path`` (si existe) se encolan sin repetir y
+            este proceso reclama lotes con lease en lugar de leer el CSV; en
+            la salida solo quedan los items que confirmo primero. Con
+            ``resume`` se agrega a la salida existente.
+        lease_s: Vigencia de cada lease; se renueva cada ``lease_s / 3``.
+        claim_batch: Maximo de URLs por reclamo.
+        queue_wal: Abre la cola en modo WAL (desactivar en discos de red).
+        shard: Tupla (indice, total); solo se procesan los items de ese shard.
+        resume_state_path: Salida de la que se lee el estado previo al
+            reanudar (por defecto ``output_path``).
+        verbose: Imprime progreso resumido periodicamente.
+        on_result: Callback invocado con cada resultado ya escrito.
+        client: Cliente HTTP ya abierto a reutilizar (p. ej. el de la API);
+            si es None se crea uno propio.
+        cookie_pool: Pool de cookies a reutilizar; si es None se crea uno
+            propio sobre un ``BrowserService`` nuevo.
+        rate_limiter: Limitador compartido; reemplaza ``rate``/``session_rate``.
+        concurrency: Controlador compartido con otras corridas; reemplaza
+            ``adaptive`` y limita las requests en vuelo de todas juntas.
+        cache: Cache de resultados a reutilizar; reemplaza ``cache_path``.
+        hedge: Politica de hedging compartida; reemplaza ``hedge_quantile``.
     """
-    urls = load_urls(input_path)
-    if not urls:
-        print("No se encontraron URLs en el CSV.")
+    if refresh and snapshot_path is None:
+        raise ValueError("El refresco incremental requiere snapshot_path")
+    if queue_path is not None and (refresh or retry_errors):
+        raise ValueError("La cola durable no admite refresh ni retry_errors")
+    append = (resume or retry_errors) and not refresh
+    state_path = resume_state_path or output_path
+    done = ItemIdSet()
+    snapshots = SnapshotStore(snapshot_path) if snapshot_path is not None else None
+    work_queue = WorkQueue(queue_path, lease_s=lease_s, wal=queue_wal) if queue_path is not None else None
+    owner = worker_id()
+    if work_queue is not None:
+        if input_path.exists():
+            added = work_queue.enqueue(iter_urls(input_path))
+            if verbose and added:
+                print(f"URLs encoladas: {added}")
+        source = []
+        total = work_queue.remaining()
+        if verbose:
+            print(f"Cola {queue_path}: {total} items pendientes (worker {owner}).")
+    elif refresh:
+        if input_path.exists():
+            added = snapshots.register(iter_urls(input_path))
+            if verbose and added:
+                print(f"URLs nuevas registradas: {added}")
+        source: Iterable[str] = snapshots.due(refresh_budget, refresh_min_age_s)
+        total = len(source)
+        # Un refresco siempre pide de nuevo: la cache devolveria lo mismo.
+        bypass_cache = True
+        if verbose:
+            print(f"Refrescando {total} de {len(snapshots)} items (presupuesto {refresh_budget}).")
+    elif retry_errors:
+        _, failed = load_resume_state(state_path, checkpoint_path, output_format)
+        source = list(failed.values())
+        total = len(failed)
+        if verbose:
+            print(f"Reintentando {total} URLs con error.")
+    else:
+        if resume:
+            done, _ = load_resume_state(state_path, checkpoint_path, output_format)
+            if verbose:
+                print(f"Reanudando: {len(done)} items ya completados.")
+        source = iter_urls(input_path)
+        total = count_rows(input_path)
+    if not total:
+        if verbose:
+            print("No se encontraron URLs en el CSV.")
+        if snapshots is not None:
+            snapshots.close()
+        if work_queue is not None:
+            work_queue.close()
         return
 
-    if workers <= 0:
-        workers = 1
-    workers = min(workers, len(urls))
+    workers = max(1, workers)
+    if concurrency is None and adaptive:
+        max_workers = max_workers or workers * 4
+        concurrency = AdaptiveConcurrency(initial=workers, minimum=min_workers, maximum=max_workers)
+        # Hay un worker por cupo posible; el controlador decide cuantos avanzan.
+        workers = concurrency.maximum
+    workers = min(workers, total)
+    if rate_limiter is None and (rate or session_rate or jitter_s):
+        rate_limiter = RateLimiter(
+            rate=rate,
+            burst=burst,
+            session_rate=session_rate,
+            session_burst=burst,
+            jitter_s=jitter_s,
+        )
+    if hedge is None and hedge_quantile:
+        hedge = HedgePolicy(quantile=hedge_quantile, budget=hedge_budget)
+
+    seen = ItemIdSet()
+    progress = ProgressReporter(total, interval_s=progress_interval_s)
+    retry_scheduler = RetryScheduler(retry_budgets, retry_delay_s, retry_max_delay_s, sources=workers)
+    # Un solo nivel de reintentos por token: si la cola diferida los cubre, el
+    # intento en linea no se repite (igual refresca las cookies antes de
+    # diferir). Tope por item: 1 + presupuesto de la clase, o 1 + ``retries``.
+    if any(retry_scheduler.budgets.get(name) for name in ("token", "antibot")):
+        retries = 0
+
+    # Cola acotada: el productor lee el CSV a medida que los workers avanzan.
+    queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=workers * 2)
 
-    lock = asyncio.Lock()
-    visited_lock = asyncio.Lock()
-    visited: set[str] = set()
-    counter_lock = asyncio.Lock()
-    counter = {"value": 0}
+    async def produce() -> None:
+        skipped = 0
+        try:
+            for url in source:
+                if shard is not None and shard_of(item_key(url), shard[1]) != shard[0]:
+                    continue
+                if resume and item_key(url) in done:
+                    skipped += 1
+                    progress.skip()
+                    if skipped % 10000 == 0:
+                        await asyncio.sleep(0)
+                    continue
+                await queue.put(url)
+                QUEUE_DEPTH.inc(queue="input")
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
 
-    queue: asyncio.Queue[str] = asyncio.Queue()
-    for url in urls:
-        queue.put_nowait(url)
+    async def produce_leased() -> None:
+        # Sin nada para reclamar, se espera mientras otros nodos tengan items:
+        # si mueren, sus leases vencen y se reclaman aca. La espera arranca
+        # corta (los items devueltos o vencidos se toman enseguida) y crece
+        # hasta un cuarto del lease mientras no haya nada para reclamar.
+        max_poll_s = max(0.2, lease_s / 4)
+        poll_s = 0.2
+        try:
+            while True:
+                # SQLite puede esperar el lock de otro nodo: fuera del event loop.
+                urls = await asyncio.to_thread(
+                    work_queue.claim, owner, min(claim_batch, max(1, queue.maxsize - queue.qsize()))
+                )
+                if not urls:
+                    if not await asyncio.to_thread(work_queue.remaining, owner):
+                        return
+                    await asyncio.sleep(poll_s)
+                    poll_s = min(max_poll_s, poll_s * 2)
+                    continue
+                poll_s = 0.2
+                for url in urls:
+                    await queue.put(url)
+                    QUEUE_DEPTH.inc(queue="input")
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
 
-    async def worker() -> None:
-        cookie_mgr = CookieManager(get_fresh_cookies, use_proxy=use_proxy)
+    async def heartbeat() -> None:
+        # Si un heartbeat falla (p. ej. la base esta bloqueada) se reintenta
+        # en el siguiente: quedan dos antes de que venzan los leases.
         while True:
+            await asyncio.sleep(lease_s / 3)
             try:
-                url = queue.get_nowait()
-            except asyncio.QueueEmpty:
-                return
-            async with visited_lock:
-                if url in visited:
-                    data = {"URL": url, "ERROR": "DUPLICATE_URL"}
-                    row = build_row(data)
-                    async with lock:
-                        writer.writerow(row)
-                        output_file.flush()
-                    async with counter_lock:
-                        counter["value"] += 1
-                        current = counter["value"]
-                    print(f"[{current}/{len(urls)}] SKIP - {url} (duplicate)")
-                    queue.task_done()
+                await asyncio.to_thread(work_queue.heartbeat, owner)
+            except Exception:
+                logger.exception("No se pudieron renovar los leases de %s", owner)
+
+    async def finish(data: dict) -> None:
+        # Otro worker ya confirmo este item (p. ej. tras vencer nuestro lease).
+        if work_queue is not None and not await asyncio.to_thread(work_queue.ack, data, owner):
+            return
+        if snapshots is not None and data.get("ERROR"):
+            snapshots.touch(data.get("URL") or "")
+        elif snapshots is not None:
+            changed = snapshots.record(data)
+            if refresh:
+                if changed == []:
+                    unchanged[0] += 1
+                else:
+                    await sink_writer.put(build_row(dict(data, CHANGED=",".join(changed or ["NEW"])), DELTA_FIELDS))
+        if not refresh:
+            await sink_writer.put(build_row(data))
+        if on_result is not None:
+            on_result(data)
+        if verbose:
+            progress.record(data)
+
+    async def worker() -> None:
+        reading = True
+        while True:
+            # Los reintentos vencidos tienen prioridad; agotada la entrada,
+            # el worker solo espera reintentos (pasada final).
+            item = retry_scheduler.pop_due()
+            if item is None and reading:
+                url = await queue.get()
+                if url is None:
+                    reading = False
+                    retry_scheduler.source_done()
                     continue
-                visited.add(url)
+                QUEUE_DEPTH.dec(queue="input")
+                # Sin await entre la consulta y el alta: no hace falta lock.
+                if not seen.add(item_key(url)):
+                    if work_queue is not None:
+                        # Lease propio reclamado de nuevo: el item sigue en proceso.
+                        continue
+                    ITEMS.inc(result="DUPLICATE_URL")
+                    await finish({"URL": url, "ERROR": "DUPLICATE_URL"})
+                    continue
+                item = (url, 0)
+            elif item is None:
+                item = await retry_scheduler.next()
+                if item is None:
+                    return
+            retry_scheduler.begin()
             try:
-                data = await scrape_one(url, cookie_mgr, retries, timeout_s)
-            except Exception as exc:
-                data = {"URL": url, "ERROR": f"EXCEPTION::{exc.__class__.__name__}"}
-            row = build_row(data)
-            async with lock:
-                writer.writerow(row)
-                output_file.flush()
-            async with counter_lock:
-                counter["value"] += 1
-                current = counter["value"]
-            status = "ERROR" if data.get("ERROR") else "OK"
-            print(f"[{current}/{len(urls)}] {status} - {data.get('URL')}")
-            queue.task_done()
-
-    with output_path.open("w", encoding="utf-8", newline="") as output_file:
-        writer = csv.DictWriter(output_file, fieldnames=OUTPUT_FIELDS)
-        writer.writeheader()
-        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
-        await asyncio.gather(*tasks)
-
-    print(f"CSV generado en: {output_path}")
+                await process(*item)
+            finally:
+                retry_scheduler.end()
+
+    async def process(url: str, attempts: int) -> None:
+        try:
+            data = await scrape_one(
+                url,
+                cookie_pool,
+                retries,
+                timeout_s,
+                client=client,
+                concurrency=concurrency,
+                rate_limiter=rate_limiter,
+                cache=cache,
+                bypass_cache=bypass_cache,
+                hedge=hedge,
+            )
+        except Exception as exc:
+            data = {"URL": url, "ERROR": f"EXCEPTION::{exc.__class__.__name__}"}
+            ITEMS.inc(result="EXCEPTION")
+        attempts += 1
+        if retry_scheduler.defer(url, attempts, data.get("ERROR")):
+            return
+        retry_scheduler.forget(url)
+        data["ATTEMPTS"] = attempts
+        await finish(data)
+
+    async def dump_metrics() -> None:
+        while True:
+            await asyncio.sleep(metrics_interval_s)
+            REGISTRY.write(metrics_path)
+
+    # Una corrida ya deduplica por itemId: el LRU en memoria solo hace de
+    # frente del nivel en disco, que es el que se reutiliza entre corridas.
+    owns_cache = cache is None and cache_path is not None
+    if owns_cache:
+        cache = ResultCache(max_entries=10000, ttl_s=cache_ttl_s, negative_ttl_s=negative_ttl_s, path=cache_path)
+    journal = CheckpointJournal(checkpoint_path) if checkpoint_path is not None else None
+    unchanged = [0]
+    sink = open_sink(output_path, DELTA_FIELDS if refresh else OUTPUT_FIELDS, append=append, output_format=output_format)
+    sink_writer = SinkWriter(sink, batch_size=batch_size, flush_interval_s=flush_interval_s, journal=journal)
+    try:
+        async with AsyncExitStack() as stack:
+            if cookie_pool is None:
+                vault = CookieVault(cookie_vault_path) if cookie_vault_path is not None else None
+                browser_service = BrowserService(max_contexts=browser_contexts, recycle_after=browser_recycle_after)
+                await stack.enter_async_context(browser_service)
+                if proxies:
+                    cookie_pool = await stack.enter_async_context(
+                        ProxyPool(
+                            browser_service.fetch_cookies,
+                            proxies,
+                            max_concurrent_refreshes=browser_contexts,
+                            http2=http2,
+                            max_connections=max_connections,
+                            max_keepalive=max_keepalive,
+                            vault=vault,
+                            refresh_margin_s=cookie_refresh_margin_s,
+                        )
+                    )
+                else:
+                    cookie_pool = CookiePool(
+                        browser_service.fetch_cookies,
+                        use_proxy=use_proxy,
+                        size=cookie_sessions,
+                        max_concurrent_refreshes=browser_contexts,
+                        vault=vault,
+                        refresh_margin_s=cookie_refresh_margin_s,
+                    )
+                    stack.push_async_callback(cookie_pool.close)
+            if client is None:
+                client = await stack.enter_async_context(
+                    build_http_client(
+                        use_proxy=use_proxy,
+                        http2=http2,
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_keepalive,
+                    )
+                )
+            sink_writer.start()
+            monitor = LoopMonitor(block_threshold_s=block_threshold_s) if profile else None
+            profiler = SamplingProfiler() if profile_output is not None else None
+            if monitor is not None:
+                monitor.start()
+            if profiler is not None:
+                profiler.start()
+                if profile_duration_s > 0:
+                    asyncio.get_running_loop().call_later(profile_duration_s, profiler.stop)
+            try:
+                tasks = [asyncio.create_task(produce() if work_queue is None else produce_leased())]
+                tasks += [asyncio.create_task(worker()) for _ in range(workers)]
+                background = []
+                if metrics_path is not None:
+                    background.append(asyncio.create_task(dump_metrics()))
+                if work_queue is not None:
+                    background.append(asyncio.create_task(heartbeat()))
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    for task in tasks + background:
+                        task.cancel()
+            finally:
+                await sink_writer.close()
+                if monitor is not None:
+                    monitor.stop()
+                if profiler is not None:
+                    profiler.stop()
+                    profiler.write(profile_output)
+                if metrics_path is not None:
+                    REGISTRY.write(metrics_path)
+    finally:
+        if journal is not None:
+            journal.close()
+        if owns_cache:
+            cache.close()
+        if snapshots is not None:
+            snapshots.close()
+        if work_queue is not None:
+            # Lo reclamado y no confirmado (p. ej. al interrumpir) vuelve a la cola.
+            await asyncio.to_thread(work_queue.release, owner)
+            queue_stats = work_queue.stats()
+            work_queue.close()
+
+    if verbose:
+        print(progress.line())
+        if refresh:
+            print(f"Sin cambios: {unchanged[0]} (la salida solo tiene items nuevos o modificados)")
+        if retry_scheduler.deferred:
+            deferred = " ".join(f"{name}={count}" for name, count in retry_scheduler.deferred.items())
+            print(f"Reintentos diferidos: {deferred}")
+        if isinstance(cookie_pool, (CookiePool, ProxyPool)):
+            cookie_stats = cookie_pool.stats()
+            print(
+                f"Cookies: navegador={cookie_stats['fetches']} boveda={cookie_stats['vault_hits']} "
+                f"anticipados={cookie_stats['proactive_refreshes']}"
+            )
+        if isinstance(cookie_pool, ProxyPool):
+            for proxy in cookie_pool.stats()["proxies"]:
+                print(
+                    f"Proxy {proxy['proxy']}: {proxy['state']} requests={proxy['requests']} "
+                    f"latencia={proxy['latency_ms']}ms errores={proxy['error_rate']:.1%} "
+                    f"cuarentenas={proxy['quarantines']}"
+                )
+        if monitor is not None:
+            loop_stats = monitor.stats()
+            print(
+                f"Event loop: lag p50={loop_stats['lag_p50_ms']}ms p99={loop_stats['lag_p99_ms']}ms "
+                f"max={loop_stats['lag_max_ms']}ms bloqueos>{block_threshold_s * 1000:.0f}ms={loop_stats['blocks']}"
+            )
+        if profiler is not None:
+            print(f"Perfil de CPU: {profiler.samples} muestras -> {profile_output}")
+            for name, share in profiler.top(5):
+                print(f"  {share:6.1%} {name}")
+        if work_queue is not None:
+            print(
+                f"Cola: pendientes={queue_stats['pending']} en proceso={queue_stats['leased']} "
+                f"terminados={queue_stats['done']} con error={queue_stats['errors']}"
+            )
+        if hedge is not None:
+            hedge_stats = hedge.stats()
+            print(
+                f"Hedging: respaldos={hedge_stats['hedges']} ({hedge_stats['hedge_rate']:.1%}) "
+                f"ganados={hedge_stats['wins']} sin presupuesto={hedge_stats['denied']} "
+                f"espera={hedge_stats['delay_ms']}ms"
+            )
+        if owns_cache:
+            stats = cache.stats()
+            print(f"Cache: hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%}")
+        print(f"Salida generada en: {output_path}")
+
+
+def export_queue(
+    queue_path: Path,
+    output_path: Path,
+    output_format: str | None = None,
+    batch_size: int = 500,
+) -> int:
+    """Vuelca todos los resultados confirmados en una cola durable.
+
+    Es la salida consolidada de una corrida con varios nodos: cada uno
+    escribe solo sus items, y si un nodo murio entre confirmar y escribir,
+    el resultado igual esta en la cola.
+
+    Args:
+        queue_path: Archivo de la cola (``--queue-db``).
+        output_path: Archivo de salida.
+        output_format: Formato de salida (por defecto segun la extension).
+        batch_size: Filas por escritura.
+
+    Returns:
+        Cantidad de filas escritas.
+    """
+    work_queue = WorkQueue(queue_path)
+    sink = open_sink(output_path, OUTPUT_FIELDS, append=False, output_format=output_format)
+    written = 0
+    batch: list[dict] = []
+    try:
+        for data in work_queue.results():
+            batch.append(build_row(data))
+            if len(batch) >= batch_size:
+                sink.write_rows(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            sink.write_rows(batch)
+            written += len(batch)
+    finally:
+        sink.close()
+        work_queue.close()
+    return written
+
+
+def _run_shard(
+    index: int,
+    processes: int,
+    ok_counter,
+    error_counter,
+    run_kwargs: dict,
+) -> None:
+    """Punto de entrada de cada proceso hijo en ``run_sharded``.
+
+    Args:
+        index: Indice del shard que procesa este hijo.
+        processes: Cantidad total de shards.
+        ok_counter: ``multiprocessing.Value`` con los items exitosos.
+        error_counter: ``multiprocessing.Value`` con los items con error.
+        run_kwargs: Argumentos para ``run``.
+    """
+    def count_result(data: dict) -> None:
+        counter = error_counter if data.get("ERROR") else ok_counter
+        with counter.get_lock():
+            counter.value += 1
+
+    asyncio.run(
+        run(
+            **run_kwargs,
+            shard=(index, processes),
+            verbose=False,
+            on_result=count_result,
+        )
+    )
+
+
+def run_sharded(processes: int, progress_interval_s: float = 2.0, **run_kwargs) -> None:
+    """Ejecuta ``run`` en varios procesos, cada uno con su propio event loop.
+
+    La entrada se reparte por hash del itemId; cada proceso escribe un CSV
+    parcial (y un journal parcial) que al final se concatena en el CSV de
+    salida. Al reanudar, los parciales de una corrida interrumpida se
+    consolidan primero y cada hijo lee el estado desde el CSV final.
+
+    Args:
+        processes: Cantidad de procesos.
+        progress_interval_s: Segundos entre lineas de progreso combinado.
+        **run_kwargs: Argumentos de ``run`` (input_path, output_path, ...).
+    """
+    input_path: Path = run_kwargs["input_path"]
+    output_path: Path = run_kwargs["output_path"]
+    checkpoint_path: Path | None = run_kwargs.get("checkpoint_path")
+    metrics_path: Path | None = run_kwargs.get("metrics_path")
+    profile_output: Path | None = run_kwargs.get("profile_output")
+    append = run_kwargs.get("resume") or run_kwargs.get("retry_errors")
+    output_format = detect_format(output_path, run_kwargs.get("output_format"))
+    if output_format not in ("csv", "jsonl"):
+        raise ValueError("--processes solo admite salidas CSV o JSONL")
+    if run_kwargs.get("refresh"):
+        raise ValueError("--refresh no admite --processes")
+    if run_kwargs.get("queue_path") is not None:
+        raise ValueError("Con --queue-db se escala lanzando mas workers sobre la misma cola, no con --processes")
+    has_header = output_format == "csv"
+
+    outputs = [part_path(output_path, index) for index in range(processes)]
+    journals = [part_path(checkpoint_path, index) for index in range(processes)] if checkpoint_path else []
+    if append:
+        merge_parts(outputs, output_path, append=True, has_header=has_header)
+        if checkpoint_path is not None:
+            merge_parts(journals, checkpoint_path, append=True, has_header=False)
+    else:
+        for stale in outputs + journals:
+            stale.unlink(missing_ok=True)
+
+    total = count_rows(input_path)
+    ctx = multiprocessing.get_context("spawn")
+    ok_counter = ctx.Value("q", 0)
+    error_counter = ctx.Value("q", 0)
+    children = []
+    for index in range(processes):
+        child_kwargs = dict(
+            run_kwargs,
+            output_path=outputs[index],
+            checkpoint_path=journals[index] if journals else None,
+            resume_state_path=output_path,
+            metrics_path=part_path(metrics_path, index) if metrics_path else None,
+            profile_output=part_path(profile_output, index) if profile_output else None,
+        )
+        child = ctx.Process(
+            target=_run_shard,
+            args=(index, processes, ok_counter, error_counter, child_kwargs),
+        )
+        child.start()
+        children.append(child)
+
+    started = time.monotonic()
+    while any(child.is_alive() for child in children):
+        time.sleep(progress_interval_s)
+        ok, errors = ok_counter.value, error_counter.value
+        elapsed = time.monotonic() - started
+        print(f"[{ok + errors}/{total}] ok={ok} error={errors} rate={(ok + errors) / elapsed:.1f}/s")
+    for child in children:
+        child.join()
+
+    merge_parts(outputs, output_path, append=bool(append), has_header=has_header)
+    if checkpoint_path is not None:
+        merge_parts(journals, checkpoint_path, append=True, has_header=False)
+
+    ok, errors = ok_counter.value, error_counter.value
+    elapsed = time.monotonic() - started
+    print(f"Procesos: {processes} | Total: {ok + errors} | OK: {ok} | Error: {errors} | {elapsed:.1f}s")
+    failed_children = [index for index, child in enumerate(children) if child.exitcode != 0]
+    if failed_children:
+        print(f"Shards con error: {failed_children}")
+    print(f"Salida generada en: {output_path}")
 
 
 if __name__ == "__main__":
@@ -199,18 +1067,122 @@ if __name__ == "__main__":
     parser.add_argument("--input", default="../data/goofish_urls.csv", help="CSV de entrada con columna URL")
     parser.add_argument("--output", default="../data/goofish_products.csv", help="CSV de salida con datos completos")
     parser.add_argument("--workers", type=int, default=5, help="Cantidad de workers en paralelo")
-    parser.add_argument("--retries", type=int, default=1, help="Reintentos por URL si falla el token")
+    parser.add_argument("--retries", type=int, default=1, help="Reintentos en el momento si falla el token (solo con --retry-budget token=0,antibot=0)")
     parser.add_argument("--timeout", type=float, default=45.0, help="Timeout maximo por request en segundos")
     parser.add_argument("--use-proxy", action="store_true", help="Usar proxy al refrescar cookies")
+    parser.add_argument("--http2", action="store_true", help="Usar HTTP/2 en el cliente compartido")
+    parser.add_argument("--max-connections", type=int, default=100, help="Maximo de conexiones HTTP abiertas")
+    parser.add_argument("--max-keepalive", type=int, default=20, help="Maximo de conexiones HTTP ociosas reutilizables")
+    parser.add_argument("--proxy-file", default=None, help="Archivo con un proxy por linea (pool con salud y cuarentena)")
+    parser.add_argument("--cookie-sessions", type=int, default=2, help="Sesiones de cookies compartidas por los workers")
+    parser.add_argument("--browser-contexts", type=int, default=2, help="Refrescos de cookies en paralelo en Chromium")
+    parser.add_argument("--browser-recycle-after", type=int, default=200, help="Refrescos antes de reciclar Chromium")
+    parser.add_argument("--cookie-vault", default=None, help="Archivo JSON donde persistir y compartir cookies entre procesos")
+    parser.add_argument("--cookie-margin", type=float, default=120.0, help="Segundos antes del vencimiento del token en que se renueva")
+    parser.add_argument("--resume", action="store_true", help="Omitir items ya scrapeados con exito y agregar al CSV")
+    parser.add_argument("--retry-errors", action="store_true", help="Reintentar solo las URLs con ERROR en la salida")
+    parser.add_argument("--retry-budget", default="", help="Reintentos diferidos por clase, p. ej. timeout=3,network=3,token=2,antibot=2,decode=1,exception=0")
+    parser.add_argument("--retry-delay", type=float, default=2.0, help="Espera en segundos antes del primer reintento diferido")
+    parser.add_argument("--retry-max-delay", type=float, default=60.0, help="Espera maxima en segundos entre reintentos diferidos")
+    parser.add_argument("--checkpoint", default=None, help="Journal append-only con el estado de cada URL")
+    parser.add_argument("--adaptive", action="store_true", help="Ajustar la concurrencia en vivo (AIMD)")
+    parser.add_argument("--min-workers", type=int, default=1, help="Piso de concurrencia en modo adaptativo")
+    parser.add_argument("--max-workers", type=int, default=None, help="Techo de concurrencia en modo adaptativo")
+    parser.add_argument("--rate", type=float, default=None, help="Requests por segundo globales")
+    parser.add_argument("--session-rate", type=float, default=None, help="Requests por segundo por sesion de cookies")
+    parser.add_argument("--burst", type=float, default=None, help="Rafaga permitida sobre --rate/--session-rate")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Espera aleatoria maxima por request (segundos)")
+    parser.add_argument("--hedge", type=float, default=None, metavar="PERCENTIL", help="Lanzar un respaldo cuando un intento supera este percentil de latencia (p. ej. 0.95)")
+    parser.add_argument("--hedge-budget", type=float, default=0.05, help="Fraccion maxima de intentos con respaldo")
+    parser.add_argument("--format", default=None, choices=["csv", "jsonl", "parquet", "sqlite"], help="Formato de salida (por defecto segun la extension)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Filas por lote de escritura")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="Segundos maximos antes de escribir un lote")
+    parser.add_argument("--progress-interval", type=float, default=2.0, help="Segundos entre lineas de progreso")
+    parser.add_argument("--metrics-file", default=None, help="Archivo .prom donde volcar metricas periodicamente")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Segundos entre volcados de metricas")
+    parser.add_argument("--profile", action="store_true", help="Medir el lag del event loop y loguear los bloqueos con su pila")
+    parser.add_argument("--profile-threshold", type=float, default=100.0, help="Bloqueo minimo del event loop a loguear (ms)")
+    parser.add_argument("--profile-output", default=None, help="Guardar un perfil de CPU por muestreo (collapsed stacks) en este archivo")
+    parser.add_argument("--profile-duration", type=float, default=0.0, help="Segundos a perfilar desde el inicio (0 = toda la corrida)")
+    parser.add_argument("--cache-db", default=None, help="Base SQLite de la cache de resultados por itemId")
+    parser.add_argument("--cache-ttl", type=float, default=86400.0, help="Vigencia en segundos de un resultado cacheado")
+    parser.add_argument("--negative-ttl", type=float, default=3600.0, help="Vigencia en segundos de un error cacheado")
+    parser.add_argument("--no-cache", action="store_true", help="No leer la cache (se actualiza igual)")
+    parser.add_argument("--snapshot-db", default=None, help="Base SQLite con el ultimo estado de cada item (hash de campos)")
+    parser.add_argument("--refresh", action="store_true", help="Refrescar items de --snapshot-db por antiguedad y volatilidad; la salida solo tiene cambios")
+    parser.add_argument("--refresh-budget", type=int, default=5000, help="Maximo de items a pedir en un refresco")
+    parser.add_argument("--refresh-min-age", type=float, default=3600.0, help="Antiguedad minima en segundos para refrescar un item")
+    parser.add_argument("--queue-db", default=None, help="Cola durable SQLite compartida entre procesos/nodos (leases con heartbeat)")
+    parser.add_argument("--lease", type=float, default=60.0, help="Segundos de vigencia de un lease sin heartbeat")
+    parser.add_argument("--claim-batch", type=int, default=50, help="URLs por reclamo a la cola")
+    parser.add_argument("--queue-no-wal", action="store_true", help="Abrir la cola sin WAL (filesystems de red)")
+    parser.add_argument("--queue-export", action="store_true", help="Solo volcar a --output los resultados confirmados en --queue-db")
+    parser.add_argument("--processes", type=int, default=1, help="Procesos en paralelo (shards por itemId)")
     args = parser.parse_args()
 
-    asyncio.run(
-        run(
-            input_path=Path(args.input),
-            output_path=Path(args.output),
-            workers=args.workers,
-            retries=args.retries,
-            use_proxy=args.use_proxy,
-            timeout_s=args.timeout,
-        )
+    if args.queue_export:
+        if not args.queue_db:
+            parser.error("--queue-export requiere --queue-db")
+        written = export_queue(Path(args.queue_db), Path(args.output), args.format, args.batch_size)
+        parser.exit(0, f"{written} resultados exportados a {args.output}\n")
+
+    run_kwargs = dict(
+        input_path=Path(args.input),
+        output_path=Path(args.output),
+        workers=args.workers,
+        retries=args.retries,
+        use_proxy=args.use_proxy,
+        timeout_s=args.timeout,
+        http2=args.http2,
+        max_connections=args.max_connections,
+        max_keepalive=args.max_keepalive,
+        cookie_sessions=args.cookie_sessions,
+        browser_contexts=args.browser_contexts,
+        browser_recycle_after=args.browser_recycle_after,
+        cookie_vault_path=Path(args.cookie_vault) if args.cookie_vault else None,
+        cookie_refresh_margin_s=args.cookie_margin,
+        resume=args.resume,
+        retry_errors=args.retry_errors,
+        checkpoint_path=Path(args.checkpoint) if args.checkpoint else None,
+        adaptive=args.adaptive,
+        min_workers=args.min_workers,
+        max_workers=args.max_workers,
+        rate=args.rate,
+        session_rate=args.session_rate,
+        burst=args.burst,
+        jitter_s=args.jitter,
+        hedge_quantile=args.hedge,
+        hedge_budget=args.hedge_budget,
+        output_format=args.format,
+        batch_size=args.batch_size,
+        flush_interval_s=args.flush_interval,
+        progress_interval_s=args.progress_interval,
+        metrics_path=Path(args.metrics_file) if args.metrics_file else None,
+        metrics_interval_s=args.metrics_interval,
+        profile=args.profile,
+        block_threshold_s=args.profile_threshold / 1000,
+        profile_output=Path(args.profile_output) if args.profile_output else None,
+        profile_duration_s=args.profile_duration,
+        cache_path=Path(args.cache_db) if args.cache_db else None,
+        cache_ttl_s=args.cache_ttl,
+        negative_ttl_s=args.negative_ttl,
+        bypass_cache=args.no_cache,
+        retry_budgets=parse_budgets(args.retry_budget),
+        retry_delay_s=args.retry_delay,
+        retry_max_delay_s=args.retry_max_delay,
+        proxies=load_proxies(Path(args.proxy_file) if args.proxy_file else None),
+        snapshot_path=Path(args.snapshot_db) if args.snapshot_db else None,
+        refresh=args.refresh,
+        refresh_budget=args.refresh_budget,
+        refresh_min_age_s=args.refresh_min_age,
+        queue_path=Path(args.queue_db) if args.queue_db else None,
+        lease_s=args.lease,
+        claim_batch=args.claim_batch,
+        queue_wal=not args.queue_no_wal,
     )
+    if args.refresh and not args.snapshot_db:
+        parser.error("--refresh requiere --snapshot-db")
+    if args.processes > 1:
+        run_sharded(args.processes, **run_kwargs)
+    else:
+        asyncio.run(run(**run_kwargs))
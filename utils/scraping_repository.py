@@ -10,17 +10,46 @@ import httpx
 from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 
+from utils.decoding import ProductRecord, decode_detail, record_from_payload
+from utils.metrics import IN_FLIGHT, STAGE_SECONDS, UPSTREAM_RESPONSES, result_code
+
 
 load_dotenv()
-API_URL = "https://h5api.m.goofish.com/h5/mtop.taobao.idle.pc.detail/1.0/"
+# Ambas URLs se pueden apuntar a un servidor local (benchmarks/mock_mtop.py).
+API_URL = getenv("GOOFISH_API_URL", "https://h5api.m.goofish.com/h5/mtop.taobao.idle.pc.detail/1.0/")
 APP_KEY = "34839810"
 TOKEN_ERRORS = ("FAIL_SYS_TOKEN", "TOKEN_EMPTY", "RGV587_ERROR")
-TEST_URL = "https://www.goofish.com/item?id=894551126004"
+ITEM_URL = getenv("GOOFISH_ITEM_URL", "https://www.goofish.com/item?id={item_id}")
+TEST_URL = ITEM_URL.format(item_id="894551126004")
 
 PROXY_SERVER = getenv("PROXY_SERVER")
 PROXY_USER = getenv("PROXY_USER")
 PROXY_PASS = getenv("PROXY_PASS")
 
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/143.0.0.0 Safari/537.36"
+)
+REQUEST_HEADERS = {
+    "accept": "application/json",
+    "accept-language": "es-ES,es;q=0.9",
+    "cache-control": "no-cache",
+    "content-type": "application/x-www-form-urlencoded",
+    "origin": "https://www.goofish.com",
+    "pragma": "no-cache",
+    "priority": "u=1, i",
+    "referer": "https://www.goofish.com/",
+    "sec-ch-ua": '"Google Chrome";v="143", "Chromium";v="143", "Not A(Brand";v="24"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Windows"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-site",
+    "user-agent": USER_AGENT,
+}
+REQUEST_TIMEOUT = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=30.0)
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,6 +78,47 @@ def _build_proxy_settings(use_proxy: bool) -> tuple[dict | None, str | None]:
     return proxy_settings, proxy_url
 
 
+def build_http_client(
+    use_proxy: bool = False,
+    http2: bool = False,
+    proxy_url: str | None = None,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+) -> httpx.AsyncClient:
+    """Crea un cliente HTTP reutilizable con pool de conexiones keep-alive.
+
+    El cliente debe compartirse entre requests (por worker o por proceso) para
+    evitar un handshake TCP/TLS nuevo por cada item. Las cookies se envian por
+    request, por lo que un mismo cliente sirve para varias sesiones de cookies.
+
+    Args:
+        use_proxy: Indica si las conexiones salen por el proxy configurado.
+        http2: Habilita multiplexing HTTP/2 (requiere el paquete ``h2``).
+        proxy_url: Proxy explicito (p. ej. uno de ``ProxyPool``); tiene
+            prioridad sobre ``use_proxy``.
+        max_connections: Maximo de conexiones abiertas en el pool.
+        max_keepalive_connections: Maximo de conexiones ociosas que se mantienen.
+        keepalive_expiry: Segundos que una conexion ociosa se mantiene abierta.
+
+    Returns:
+        Cliente ``httpx.AsyncClient`` listo para usar con ``async with``.
+    """
+    if proxy_url is None:
+        _, proxy_url = _build_proxy_settings(use_proxy)
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        proxy=proxy_url,
+        http2=http2,
+        limits=limits,
+        timeout=REQUEST_TIMEOUT,
+    )
+
+
 async def get_fresh_cookies(target_url: str, use_proxy: bool = False) -> dict:
     """Abre un navegador stealth y devuelve cookies utiles para Goofish.
 
@@ -67,13 +137,7 @@ async def get_fresh_cookies(target_url: str, use_proxy: bool = False) -> dict:
             headless=True,
             proxy=proxy_settings,
         )
-        context = await browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/143.0.0.0 Safari/537.36"
-            )
-        )
+        context = await browser.new_context(user_agent=USER_AGENT)
         page = await context.new_page()
 
         logger.info("Navegando a: %s", target_url)
@@ -111,6 +175,21 @@ def extract_item_id(url: str) -> str:
     return qs["id"][0]
 
 
+def build_item_url(value: str | int) -> str:
+    """Devuelve una URL de producto a partir de una URL o de un itemId.
+
+    Args:
+        value: URL de Goofish o itemId numerico.
+
+    Returns:
+        La URL tal cual, o la URL canonica del item si se paso un itemId.
+    """
+    value = str(value).strip()
+    if value.isdigit():
+        return ITEM_URL.format(item_id=value)
+    return value
+
+
 def generate_sign(token: str, timestamp: str, data: str) -> str:
     """Genera la firma MD5 requerida por el endpoint mtop.
 
@@ -127,34 +206,47 @@ def generate_sign(token: str, timestamp: str, data: str) -> str:
     return md5(raw.encode("utf-8")).hexdigest()
 
 
-async def scrape_pdp(
-    url: str,
-    save_to_file: bool = True,
-    cookies: dict | None = None,
-    use_proxy: bool = False,
-) -> dict:
-    """Consulta el endpoint de detalle y devuelve el JSON de producto.
+def _request_error_ret(url: str, exc: httpx.RequestError) -> str:
+    """Traduce un error de red de httpx a un codigo ``ret`` interno.
 
     Args:
-        url: URL del producto de Goofish.
-        save_to_file: Indica si se guarda la respuesta en un archivo local.
-        cookies: Cookies a reutilizar en la peticion.
-        use_proxy: Indica si se usa proxy en la peticion HTTP.
+        url: URL del producto (para el log).
+        exc: Error levantado por httpx.
 
     Returns:
-        Diccionario con el JSON de respuesta del endpoint.
+        CONNECT_TIMEOUT, READ_TIMEOUT o REQUEST_ERROR::<clase>.
     """
-    if cookies is None:
-        logger.warning("No se proporcionaron cookies, obteniendo cookies frescas...")
-        cookies = await get_fresh_cookies(url, use_proxy=use_proxy)
+    if isinstance(exc, httpx.ConnectTimeout):
+        logger.error("Connect timeout al solicitar %s: %s", url, exc)
+        return "CONNECT_TIMEOUT"
+    if isinstance(exc, httpx.ReadTimeout):
+        logger.error("Read timeout al solicitar %s: %s", url, exc)
+        return "READ_TIMEOUT"
+    logger.error("Error de red al solicitar %s: %s", url, exc)
+    return f"REQUEST_ERROR::{exc.__class__.__name__}"
 
-    item_id = extract_item_id(url)
+
+async def _post_detail(item_id: str, cookies: dict, client: httpx.AsyncClient) -> httpx.Response:
+    """Firma y envia la request de detalle a mtop.
+
+    Args:
+        item_id: itemId del producto.
+        cookies: Cookies de la sesion (con ``_m_h5_tk``).
+        client: Cliente HTTP compartido.
+
+    Returns:
+        Respuesta HTTP sin decodificar.
+
+    Raises:
+        httpx.RequestError: Ante errores de red o timeouts.
+    """
     payload = {"itemId": item_id}
     data_str = json.dumps(payload, separators=(",", ":"))
 
-    token = cookies.get("_m_h5_tk", "")
-    timestamp = str(int(time.time() * 1000))
-    sign = generate_sign(token, timestamp, data_str)
+    with STAGE_SECONDS.time(stage="sign"):
+        token = cookies.get("_m_h5_tk", "")
+        timestamp = str(int(time.time() * 1000))
+        sign = generate_sign(token, timestamp, data_str)
 
     params = {
         "jsv": "2.7.2",
@@ -171,53 +263,66 @@ async def scrape_pdp(
         "spm_cnt": "a21ybx.item.0.0",
     }
 
-    headers = {
-        "accept": "application/json",
-        "accept-language": "es-ES,es;q=0.9",
-        "cache-control": "no-cache",
-        "content-type": "application/x-www-form-urlencoded",
-        "origin": "https://www.goofish.com",
-        "pragma": "no-cache",
-        "priority": "u=1, i",
-        "referer": "https://www.goofish.com/",
-        "sec-ch-ua": '"Google Chrome";v="143", "Chromium";v="143", "Not A(Brand";v="24"',
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": '"Windows"',
-        "sec-fetch-dest": "empty",
-        "sec-fetch-mode": "cors",
-        "sec-fetch-site": "same-site",
-        "user-agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/143.0.0.0 Safari/537.36"
-        ),
-    }
+    # Las cookies van como header explicito: el cliente es compartido entre
+    # sesiones y su cookie jar no debe mezclarse con las de otra sesion.
+    headers = dict(REQUEST_HEADERS)
+    headers["cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
 
-    _, proxy_url = _build_proxy_settings(use_proxy)
-    transport = httpx.AsyncHTTPTransport(proxy=proxy_url) if proxy_url else None
-    timeout = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=30.0)
-
-    async with httpx.AsyncClient(
-        cookies=cookies,
-        timeout=timeout,
-        transport=transport,
-    ) as client:
-        try:
-            response = await client.post(
+    IN_FLIGHT.inc()
+    try:
+        with STAGE_SECONDS.time(stage="http"):
+            return await client.post(
                 API_URL,
                 params=params,
                 headers=headers,
                 content=f"data={data_str}",
             )
-        except httpx.ConnectTimeout as exc:
-            logger.error("Connect timeout al solicitar %s: %s", url, exc)
-            return {"ret": ["CONNECT_TIMEOUT"], "data": {}, "URL": url}
-        except httpx.ReadTimeout as exc:
-            logger.error("Read timeout al solicitar %s: %s", url, exc)
-            return {"ret": ["READ_TIMEOUT"], "data": {}, "URL": url}
-        except httpx.RequestError as exc:
-            logger.error("Error de red al solicitar %s: %s", url, exc)
-            return {"ret": [f"REQUEST_ERROR::{exc.__class__.__name__}"], "data": {}, "URL": url}
+    finally:
+        IN_FLIGHT.dec()
+
+
+async def scrape_pdp(
+    url: str,
+    save_to_file: bool = True,
+    cookies: dict | None = None,
+    use_proxy: bool = False,
+    client: httpx.AsyncClient | None = None,
+) -> dict:
+    """Consulta el endpoint de detalle y devuelve el JSON de producto.
+
+    Decodifica la respuesta completa; para scraping masivo usar
+    ``fetch_product``, que solo lee los campos del producto.
+
+    Args:
+        url: URL del producto de Goofish.
+        save_to_file: Indica si se guarda la respuesta en un archivo local.
+        cookies: Cookies a reutilizar en la peticion.
+        use_proxy: Indica si se usa proxy en la peticion HTTP.
+        client: Cliente HTTP compartido. Si es None se crea uno solo para esta
+            peticion (sin reutilizar conexiones).
+
+    Returns:
+        Diccionario con el JSON de respuesta del endpoint.
+    """
+    if cookies is None:
+        logger.warning("No se proporcionaron cookies, obteniendo cookies frescas...")
+        cookies = await get_fresh_cookies(url, use_proxy=use_proxy)
+
+    if client is None:
+        async with build_http_client(use_proxy=use_proxy) as owned_client:
+            return await scrape_pdp(
+                url,
+                save_to_file=save_to_file,
+                cookies=cookies,
+                use_proxy=use_proxy,
+                client=owned_client,
+            )
+
+    item_id = extract_item_id(url)
+    try:
+        response = await _post_detail(item_id, cookies, client)
+    except httpx.RequestError as exc:
+        return {"ret": [_request_error_ret(url, exc)], "data": {}, "URL": url}
 
     result = response.json()
     ret_message = result.get("ret", ["No ret"])[0]
@@ -232,7 +337,49 @@ async def scrape_pdp(
     return result
 
 
-async def parse_product(product: dict) -> dict:
+async def fetch_product(
+    url: str,
+    cookies: dict,
+    use_proxy: bool = False,
+    client: httpx.AsyncClient | None = None,
+) -> tuple[str, ProductRecord | None]:
+    """Consulta el endpoint de detalle y decodifica solo los campos del producto.
+
+    Es el camino rapido de ``scrape_pdp``: el cuerpo se decodifica con
+    ``msgspec`` directo a un ``ProductRecord``, sin armar el arbol de dicts
+    de la respuesta completa. La decodificacion es sincronica: tarda ~0.1 ms
+    y ``msgspec`` no libera el GIL, asi que pasarla a un thread solo sumaria
+    el costo del salto.
+
+    Args:
+        url: URL del producto de Goofish.
+        cookies: Cookies de la sesion.
+        use_proxy: Indica si se usa proxy en la peticion HTTP.
+        client: Cliente HTTP compartido. Si es None se crea uno solo para esta
+            peticion (sin reutilizar conexiones).
+
+    Returns:
+        Tupla (codigo ``ret``, producto); el producto es None ante errores de
+        red o si la respuesta no trae ``data``.
+    """
+    if client is None:
+        async with build_http_client(use_proxy=use_proxy) as owned_client:
+            return await fetch_product(url, cookies, use_proxy=use_proxy, client=owned_client)
+
+    try:
+        response = await _post_detail(extract_item_id(url), cookies, client)
+    except httpx.RequestError as exc:
+        ret = _request_error_ret(url, exc)
+        UPSTREAM_RESPONSES.inc(ret=result_code(ret))
+        return ret, None
+    with STAGE_SECONDS.time(stage="decode"):
+        ret, record = decode_detail(response.content)
+    UPSTREAM_RESPONSES.inc(ret=result_code(ret))
+    logger.debug("Estado de la respuesta: %s", ret)
+    return ret, record
+
+
+def parse_product(product: dict) -> dict:
     """Normaliza el payload de Goofish a un esquema plano.
 
     Args:
@@ -241,21 +388,4 @@ async def parse_product(product: dict) -> dict:
     Returns:
         Diccionario con campos normalizados del producto.
     """
-    data = product.get("data", {})
-    track = data.get("trackParams", {})
-    item = data.get("itemDO", {})
-    seller = data.get("sellerDO", {})
-
-    return {
-        "ITEM_ID": track.get("itemId"),
-        "CATEGORY_ID": track.get("categoryId"),
-        "TITLE": item.get("title"),
-        "IMAGES": [img.get("photoSearchUrl") for img in item.get("imageInfos", [])],
-        "SOLD_PRICE": item.get("soldPrice"),
-        "BROWSE_COUNT": item.get("browseCnt"),
-        "WANT_COUNT": item.get("wantCnt"),
-        "COLLECT_COUNT": item.get("collectCnt"),
-        "QUANTITY": item.get("quantity"),
-        "GMT_CREATE": item.get("gmtCreate"),
-        "SELLER_ID": seller.get("sellerId"),
-    }
+    return record_from_payload(product).to_dict()
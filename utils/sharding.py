@@ -0,0 +1,86 @@
+import csv
+import io
+import shutil
+import zlib
+from pathlib import Path
+from typing import BinaryIO
+
+
+def shard_of(key: str, shards: int) -> int:
+    """Asigna un itemId a un shard de forma estable entre procesos.
+
+    Se usa CRC32 en lugar de ``hash()`` porque este ultimo cambia entre
+    procesos (``PYTHONHASHSEED``).
+
+    Args:
+        key: itemId (o clave de deduplicacion) del item.
+        shards: Cantidad total de shards.
+
+    Returns:
+        Indice de shard en ``[0, shards)``.
+    """
+    return zlib.crc32(key.encode("utf-8")) % shards
+
+
+def part_path(path: Path, index: int) -> Path:
+    """Devuelve la ruta del archivo parcial de un shard.
+
+    Args:
+        path: Ruta final (CSV de salida o journal).
+        index: Indice del shard.
+
+    Returns:
+        Ruta del archivo parcial, p. ej. ``out.part3.csv``.
+    """
+    return path.with_name(f"{path.stem}.part{index}{path.suffix}")
+
+
+def merge_parts(parts: list[Path], target: Path, append: bool, has_header: bool) -> None:
+    """Concatena archivos parciales en ``target`` y los elimina.
+
+    Se copian bytes sin parsear el CSV; solo se omite la primera linea de cada
+    parcial cuando ``has_header`` es True (el header de ``OUTPUT_FIELDS`` no
+    contiene saltos de linea). Si ``target`` ya tiene un header distinto (una
+    salida de una version con otras columnas), las filas se reordenan a ese
+    header.
+
+    Args:
+        parts: Archivos parciales en orden; los inexistentes se ignoran.
+        target: Archivo final.
+        append: Agrega al final de ``target`` en lugar de reescribirlo.
+        has_header: Indica si cada parcial empieza con una linea de header.
+    """
+    existing = [part for part in parts if part.exists()]
+    if not existing:
+        return
+    needs_header = has_header and not (append and target.exists() and target.stat().st_size > 0)
+    target_header = b""
+    if has_header and not needs_header:
+        with target.open("rb") as f:
+            target_header = f.readline()
+    with target.open("ab" if append else "wb") as out:
+        for part in existing:
+            with part.open("rb") as f:
+                header = f.readline() if has_header else b""
+                if needs_header and header:
+                    out.write(header)
+                    target_header = header
+                    needs_header = False
+                if header == target_header or not header:
+                    shutil.copyfileobj(f, out)
+                    continue
+            _append_remapped(part, out, target_header)
+    for part in existing:
+        part.unlink()
+
+
+def _append_remapped(part: Path, out: BinaryIO, target_header: bytes) -> None:
+    """Agrega las filas de un CSV parcial reordenadas al header de destino."""
+    fields = next(csv.reader([target_header.decode("utf-8")]))
+    text_out = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    try:
+        writer = csv.DictWriter(text_out, fieldnames=fields, extrasaction="ignore")
+        with part.open("r", encoding="utf-8", newline="") as f:
+            writer.writerows(csv.DictReader(f))
+    finally:
+        text_out.detach()
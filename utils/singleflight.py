@@ -0,0 +1,80 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes con la misma clave en una sola ejecucion.
+
+    La primera llamada lanza el trabajo en una tarea propia; las que llegan
+    mientras sigue en curso esperan el mismo resultado (o la misma excepcion).
+    Cancelar a un llamador no cancela el trabajo compartido.
+
+    Attributes:
+        calls: Llamadas recibidas.
+        coalesced: Llamadas que reutilizaron un trabajo ya en curso.
+    """
+    def __init__(self):
+        """Inicializa sin trabajos en curso."""
+        self.calls = 0
+        self.coalesced = 0
+        self._flights: dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Trabajos en curso."""
+        return len(self._flights)
+
+    def running(self, key: Hashable) -> bool:
+        """Indica si hay un trabajo en curso para ``key``.
+
+        Args:
+            key: Clave del trabajo.
+
+        Returns:
+            True si hay una ejecucion en curso.
+        """
+        return key in self._flights
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Ejecuta ``fn`` o se suma a la ejecucion en curso de ``key``.
+
+        Args:
+            key: Clave que identifica trabajos equivalentes (p. ej. itemId).
+            fn: Funcion async sin argumentos que hace el trabajo.
+
+        Returns:
+            Resultado compartido de ``fn``.
+        """
+        self.calls += 1
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def close(self) -> None:
+        """Cancela los trabajos en curso y espera a que terminen."""
+        tasks = list(self._flights.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Contadores de coalescing.
+
+        Returns:
+            Diccionario con calls, coalesced e in_flight.
+        """
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": self.in_flight}
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        """Quita el trabajo terminado y marca su excepcion como consumida."""
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()
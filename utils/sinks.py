@@ -0,0 +1,348 @@
+import abc
+import asyncio
+import csv
+import json
+import sqlite3
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+from utils.metrics import QUEUE_DEPTH, STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from utils.checkpoint import CheckpointJournal
+
+SINK_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+}
+SQLITE_TABLE = "products"
+_FLUSH: dict = {}
+
+
+def detect_format(path: Path, output_format: str | None = None) -> str:
+    """Determina el formato de salida a partir del argumento o la extension.
+
+    Args:
+        path: Ruta de salida.
+        output_format: Formato explicito (csv, jsonl, parquet, sqlite).
+
+    Returns:
+        Nombre del formato.
+
+    Raises:
+        ValueError: Si el formato no esta soportado.
+    """
+    fmt = output_format or SINK_FORMATS.get(path.suffix.lower(), "csv")
+    if fmt not in set(SINK_FORMATS.values()):
+        raise ValueError(f"Formato de salida no soportado: {fmt}")
+    return fmt
+
+
+def flatten_row(row: dict) -> dict:
+    """Serializa a JSON las columnas de tipo lista (p. ej. IMAGES).
+
+    Args:
+        row: Fila con valores posiblemente no escalares.
+
+    Returns:
+        Copia de la fila con listas convertidas a string JSON.
+    """
+    return {
+        key: json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value
+        for key, value in row.items()
+    }
+
+
+class Sink(abc.ABC):
+    """Destino de filas del scraping. Las subclases escriben lotes completos.
+
+    Attributes:
+        path: Ruta del archivo de salida.
+        fields: Columnas de salida en orden.
+    """
+    def __init__(self, path: Path, fields: list[str], append: bool):
+        """Guarda la configuracion comun.
+
+        Args:
+            path: Ruta del archivo de salida.
+            fields: Columnas de salida en orden.
+            append: Agrega a un archivo existente en lugar de reescribirlo.
+        """
+        self.path = path
+        self.fields = fields
+        self.append = append
+
+    @abc.abstractmethod
+    def write_rows(self, rows: list[dict]) -> None:
+        """Escribe un lote de filas."""
+
+    def flush(self) -> None:
+        """Asegura que los lotes escritos lleguen a disco."""
+
+    def close(self) -> None:
+        """Libera el archivo de salida."""
+
+
+class CsvSink(Sink):
+    """Salida CSV con las columnas de ``fields``; IMAGES como string JSON.
+
+    Al agregar a un CSV existente se respeta su header (p. ej. uno anterior a
+    una columna nueva) y las columnas que no tiene se descartan.
+    """
+    def __init__(self, path: Path, fields: list[str], append: bool):
+        super().__init__(path, fields, append)
+        write_header = not (append and path.exists() and path.stat().st_size > 0)
+        if not write_header:
+            with path.open("r", encoding="utf-8", newline="") as f:
+                fields = next(csv.reader(f), None) or fields
+        self._file = path.open("a" if append else "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=fields, extrasaction="ignore")
+        if write_header:
+            self._writer.writeheader()
+
+    def write_rows(self, rows: list[dict]) -> None:
+        self._writer.writerows(flatten_row(row) for row in rows)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonlSink(Sink):
+    """Salida JSON Lines; IMAGES se mantiene como lista."""
+    def __init__(self, path: Path, fields: list[str], append: bool):
+        super().__init__(path, fields, append)
+        self._file = path.open("a" if append else "w", encoding="utf-8")
+
+    def write_rows(self, rows: list[dict]) -> None:
+        self._file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(Sink):
+    """Salida Parquet columnar (requiere ``pyarrow``); IMAGES es list<string>.
+
+    Cada lote se escribe como un row group. Parquet no admite agregar filas a
+    un archivo existente, por eso no se puede usar al reanudar.
+    """
+    def __init__(self, path: Path, fields: list[str], append: bool):
+        super().__init__(path, fields, append)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("La salida Parquet requiere instalar pyarrow") from exc
+        if append and path.exists():
+            raise ValueError("Parquet no permite agregar filas; usar CSV, JSONL o SQLite para reanudar")
+        self._pa = pa
+        self._schema = pa.schema(
+            [(field, pa.list_(pa.string()) if field == "IMAGES" else pa.string()) for field in fields]
+        )
+        self._writer = pq.ParquetWriter(str(path), self._schema)
+
+    def write_rows(self, rows: list[dict]) -> None:
+        columns = {}
+        for field in self.fields:
+            values = [row.get(field) for row in rows]
+            if field == "IMAGES":
+                columns[field] = [value if isinstance(value, list) else None for value in values]
+            else:
+                columns[field] = [None if value in (None, "") else str(value) for value in values]
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class SqliteSink(Sink):
+    """Salida SQLite en la tabla ``products`` con inserts por lote."""
+    def __init__(self, path: Path, fields: list[str], append: bool):
+        super().__init__(path, fields, append)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if not append:
+            self._conn.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+        columns = ", ".join(f"{field} TEXT" for field in fields)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} ({columns})")
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({SQLITE_TABLE})")}
+        for field in fields:
+            if field not in existing:
+                self._conn.execute(f"ALTER TABLE {SQLITE_TABLE} ADD COLUMN {field} TEXT")
+        placeholders = ", ".join("?" for _ in fields)
+        self._insert = f"INSERT INTO {SQLITE_TABLE} ({', '.join(fields)}) VALUES ({placeholders})"
+
+    def write_rows(self, rows: list[dict]) -> None:
+        flat = (flatten_row(row) for row in rows)
+        with self._conn:
+            self._conn.executemany(self._insert, ([row.get(field) for field in self.fields] for row in flat))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink, "sqlite": SqliteSink}
+
+
+def open_sink(path: Path, fields: list[str], append: bool, output_format: str | None = None) -> Sink:
+    """Crea el sink adecuado para la ruta de salida.
+
+    Args:
+        path: Ruta de salida.
+        fields: Columnas de salida en orden.
+        append: Agrega a una salida existente.
+        output_format: Formato explicito; por defecto segun la extension.
+
+    Returns:
+        Instancia de ``Sink`` abierta.
+    """
+    return SINKS[detect_format(path, output_format)](path, fields, append)
+
+
+def iter_status(path: Path, output_format: str | None = None) -> Iterator[tuple[str, str]]:
+    """Lee solo (URL, ERROR) de una salida existente, en orden de escritura.
+
+    Args:
+        path: Salida de una corrida previa.
+        output_format: Formato explicito; por defecto segun la extension.
+
+    Yields:
+        Tuplas (url, error); error vacio si la fila fue exitosa.
+    """
+    fmt = detect_format(path, output_format)
+    if fmt == "csv":
+        with path.open("r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                return
+            url_idx = header.index("URL")
+            error_idx = header.index("ERROR")
+            min_len = max(url_idx, error_idx) + 1
+            for row in reader:
+                if len(row) >= min_len:
+                    yield row[url_idx], row[error_idx]
+    elif fmt == "jsonl":
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield row.get("URL") or "", row.get("ERROR") or ""
+    elif fmt == "sqlite":
+        conn = sqlite3.connect(path)
+        try:
+            for url, error in conn.execute(f"SELECT URL, ERROR FROM {SQLITE_TABLE} ORDER BY rowid"):
+                yield url or "", error or ""
+        finally:
+            conn.close()
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(str(path)).iter_batches(columns=["URL", "ERROR"]):
+            for url, error in zip(*(column.to_pylist() for column in batch.columns)):
+                yield url or "", error or ""
+
+
+class SinkWriter:
+    """Escribe filas en un ``Sink`` por lotes desde una cola asincronica.
+
+    Los workers solo encolan filas; una tarea aparte las agrupa y escribe cada
+    lote (y su journal) en un thread cuando se llena ``batch_size`` o pasan
+    ``flush_interval_s`` segundos desde la primera fila pendiente.
+    """
+    def __init__(
+        self,
+        sink: Sink,
+        batch_size: int = 500,
+        flush_interval_s: float = 1.0,
+        journal: "CheckpointJournal | None" = None,
+        max_pending: int = 10000,
+    ):
+        """Configura el escritor; llamar ``start`` antes de encolar filas.
+
+        Args:
+            sink: Destino de las filas.
+            batch_size: Filas por lote.
+            flush_interval_s: Maxima demora de una fila antes de escribirse.
+            journal: Journal de checkpoint que se actualiza tras cada lote.
+            max_pending: Filas encoladas maximas (backpressure a los workers).
+        """
+        self.sink = sink
+        self._batch_size = batch_size
+        self._flush_interval_s = flush_interval_s
+        self._journal = journal
+        self._queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=max_pending)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Lanza la tarea que consume la cola."""
+        self._task = asyncio.create_task(self._consume())
+
+    async def put(self, row: dict) -> None:
+        """Encola una fila para escritura.
+
+        Args:
+            row: Fila completa con las columnas del sink.
+        """
+        if self._task is not None and self._task.done():
+            self._task.result()
+        await self._queue.put(row)
+        QUEUE_DEPTH.inc(queue="sink")
+
+    async def close(self) -> None:
+        """Escribe las filas pendientes y cierra el sink."""
+        try:
+            if self._task is not None:
+                if not self._task.done():
+                    await self._queue.put(None)
+                await self._task
+        finally:
+            await asyncio.to_thread(self.sink.close)
+
+    def _write(self, batch: list[dict]) -> None:
+        """Escribe un lote en el sink y luego en el journal (en un thread)."""
+        with STAGE_SECONDS.time(stage="sink_write"):
+            self.sink.write_rows(batch)
+            self.sink.flush()
+        if self._journal is not None:
+            for row in batch:
+                self._journal.record(row.get("URL") or "", row.get("ERROR"))
+            self._journal.flush()
+
+    async def _consume(self) -> None:
+        """Agrupa filas de la cola y las escribe por tamano o por tiempo."""
+        loop = asyncio.get_running_loop()
+        batch: list[dict] = []
+        deadline = 0.0
+        while True:
+            if batch:
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    row = _FLUSH
+            else:
+                row = await self._queue.get()
+            if row is None:
+                if batch:
+                    await asyncio.to_thread(self._write, batch)
+                return
+            if row is not _FLUSH:
+                QUEUE_DEPTH.dec(queue="sink")
+                if not batch:
+                    deadline = loop.time() + self._flush_interval_s
+                batch.append(row)
+            if batch and (row is _FLUSH or len(batch) >= self._batch_size):
+                await asyncio.to_thread(self._write, batch)
+                batch = []
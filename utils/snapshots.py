@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable
+
+from utils.checkpoint import item_key
+
+SNAPSHOT_TABLE = "snapshots"
+# Campos que no describen al producto y no cuentan como cambio.
+IGNORED_FIELDS = ("URL", "ERROR", "ATTEMPTS")
+
+
+def content_hash(data: dict) -> str:
+    """Hash estable de los campos del producto (sin URL, ERROR ni ATTEMPTS).
+
+    Args:
+        data: Resultado exitoso de ``scrape_one``.
+
+    Returns:
+        Hash hexadecimal corto.
+    """
+    fields = {key: value for key, value in data.items() if key not in IGNORED_FIELDS}
+    encoded = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class SnapshotStore:
+    """Ultimo estado conocido de cada item, para refrescos incrementales.
+
+    Guarda por itemId la URL, el hash y los datos del ultimo scraping
+    exitoso, cuando se intento por ultima vez y cuantas veces cambio. Con
+    eso ``due`` elige que items volver a pedir: primero los nunca intentados
+    y despues por antiguedad ponderada por volatilidad (``(changes + 1) / (checks + 2)``),
+    asi los items que cambian seguido se revisan mas que los estables.
+    """
+    def __init__(self, path: Path):
+        """Abre (o crea) la base SQLite.
+
+        Args:
+            path: Archivo SQLite.
+        """
+        self._conn = sqlite3.connect(path, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} ("
+            "item_id TEXT PRIMARY KEY, url TEXT NOT NULL, hash TEXT, data TEXT, "
+            "scraped_at REAL NOT NULL DEFAULT 0, changed_at REAL NOT NULL DEFAULT 0, "
+            "checks INTEGER NOT NULL DEFAULT 0, changes INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def __len__(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {SNAPSHOT_TABLE}").fetchone()[0]
+
+    def register(self, urls: Iterable[str]) -> int:
+        """Agrega URLs nuevas sin datos (se refrescan antes que ninguna otra).
+
+        Args:
+            urls: URLs a registrar; las ya conocidas se ignoran.
+
+        Returns:
+            Cantidad de items nuevos.
+        """
+        before = len(self)
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO {SNAPSHOT_TABLE} (item_id, url) VALUES (?, ?)",
+                ((item_key(url), url) for url in urls),
+            )
+        return len(self) - before
+
+    def record(self, data: dict) -> list[str] | None:
+        """Guarda un resultado exitoso y detecta si cambio.
+
+        Args:
+            data: Resultado de ``scrape_one`` sin ERROR.
+
+        Returns:
+            None si el item no tenia datos previos, lista vacia si no cambio,
+            o los nombres de los campos que cambiaron.
+        """
+        url = data.get("URL") or ""
+        key = item_key(url)
+        digest = content_hash(data)
+        now = time.time()
+        row = self._conn.execute(
+            f"SELECT hash, data FROM {SNAPSHOT_TABLE} WHERE item_id = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] is None:
+            changed = None
+        elif row[0] == digest:
+            changed = []
+        else:
+            previous = json.loads(row[1])
+            changed = sorted(
+                field
+                for field in set(previous) | set(data)
+                if field not in IGNORED_FIELDS and previous.get(field) != data.get(field)
+            )
+        fields = {field: value for field, value in data.items() if field not in IGNORED_FIELDS}
+        with self._conn:
+            self._conn.execute(
+                f"INSERT INTO {SNAPSHOT_TABLE} (item_id, url, hash, data, scraped_at, changed_at, checks, changes) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1, 0) "
+                "ON CONFLICT(item_id) DO UPDATE SET url = excluded.url, hash = excluded.hash, "
+                "data = excluded.data, scraped_at = excluded.scraped_at, "
+                "changed_at = CASE WHEN ? THEN excluded.scraped_at ELSE changed_at END, "
+                "checks = checks + 1, changes = changes + ?",
+                (key, url, digest, json.dumps(fields, ensure_ascii=False), now, now, bool(changed), int(bool(changed))),
+            )
+        return changed
+
+    def touch(self, url: str) -> None:
+        """Registra un intento fallido para que el item no acapare el presupuesto.
+
+        Args:
+            url: URL del item cuyo scraping termino con error.
+        """
+        with self._conn:
+            self._conn.execute(
+                f"INSERT INTO {SNAPSHOT_TABLE} (item_id, url, scraped_at, checks) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(item_id) DO UPDATE SET scraped_at = excluded.scraped_at, checks = checks + 1",
+                (item_key(url), url, time.time()),
+            )
+
+    def due(self, budget: int, min_age_s: float = 3600.0) -> list[str]:
+        """Elige los items a refrescar dentro de un presupuesto de requests.
+
+        Args:
+            budget: Maximo de items a devolver.
+            min_age_s: Antiguedad minima desde el ultimo scraping.
+
+        Returns:
+            URLs ordenadas por prioridad (nunca intentados primero, luego
+            antiguedad por volatilidad).
+        """
+        now = time.time()
+        rows = self._conn.execute(
+            f"SELECT url FROM {SNAPSHOT_TABLE} WHERE scraped_at <= ? "
+            "ORDER BY checks > 0, (? - scraped_at) * (changes + 1.0) / (checks + 2.0) DESC LIMIT ?",
+            (now - min_age_s, now, budget),
+        )
+        return [row[0] for row in rows]
+
+    def stats(self) -> dict:
+        """Resumen de la base.
+
+        Returns:
+            Diccionario con items, items sin datos y items que cambiaron
+            alguna vez.
+        """
+        total, pending, volatile = self._conn.execute(
+            f"SELECT COUNT(*), SUM(hash IS NULL), SUM(changes > 0) FROM {SNAPSHOT_TABLE}"
+        ).fetchone()
+        return {"items": total, "pending": pending or 0, "changed_ever": volatile or 0}
+
+    def close(self) -> None:
+        """Cierra la base."""
+        self._conn.close()
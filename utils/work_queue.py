@@ -0,0 +1,249 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from utils.checkpoint import item_key
+from utils.metrics import LEASES
+
+QUEUE_TABLE = "jobs"
+
+
+def worker_id() -> str:
+    """Identificador unico de este proceso como dueno de leases.
+
+    Returns:
+        ``host:pid:sufijo`` (el sufijo distingue reinicios con el mismo pid).
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+    """Cola de trabajo durable en SQLite compartida por varios procesos o nodos.
+
+    Cada URL es una fila por itemId en estado ``pending``, ``leased`` o
+    ``done``. Un worker reclama lotes con ``claim``: quedan a su nombre con un
+    lease que vence a los ``lease_s`` segundos salvo que lo renueve con
+    ``heartbeat``. Si el nodo muere, sus leases vencen y otro worker los
+    reclama; un item reclamado ``max_claims`` veces sin terminar se cierra
+    con ``LEASE_EXPIRED`` para no envenenar la cola.
+
+    ``ack`` es idempotente por itemId: el primer resultado gana y los
+    siguientes (p. ej. de un worker cuyo lease vencio) se descartan, asi la
+    salida no repite items. Los resultados quedan en la base y se pueden
+    volcar con ``results``.
+
+    Con WAL varios procesos del mismo host comparten el archivo sin
+    bloquearse; en un filesystem de red (NFS, SMB) WAL no funciona y hay que
+    abrirla con ``wal=False``.
+
+    Los metodos bloquean hasta 30 s si otro proceso tiene el lock: desde
+    asyncio se llaman con ``asyncio.to_thread``. La conexion se comparte
+    entre threads y un lock serializa su uso.
+    """
+    def __init__(self, path: Path, lease_s: float = 60.0, max_claims: int = 5, wal: bool = True):
+        """Abre (o crea) la cola.
+
+        Args:
+            path: Archivo SQLite de la cola.
+            lease_s: Vigencia de un lease sin heartbeat.
+            max_claims: Veces que se reclama un item antes de darlo por perdido.
+            wal: Usa journal WAL (solo en discos locales).
+        """
+        self.lease_s = lease_s
+        self.max_claims = max_claims
+        # Sin transacciones implicitas: claim usa BEGIN IMMEDIATE explicito.
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {QUEUE_TABLE} ("
+            "item_id TEXT PRIMARY KEY, url TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'pending', "
+            "owner TEXT, lease_until REAL NOT NULL DEFAULT 0, claims INTEGER NOT NULL DEFAULT 0, "
+            "error TEXT, result TEXT, done_at REAL, done_by TEXT)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {QUEUE_TABLE}_state ON {QUEUE_TABLE} (state, lease_until)")
+
+    @contextmanager
+    def _immediate(self) -> Iterator[sqlite3.Connection]:
+        """Transaccion que toma el lock de escritura desde el inicio."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        """Ejecuta una escritura suelta; devuelve las filas afectadas."""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Ejecuta una consulta y lee todas sus filas con la conexion tomada."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def enqueue(self, urls: Iterable[str]) -> int:
+        """Agrega URLs; las ya encoladas (por itemId) se ignoran.
+
+        Args:
+            urls: URLs a encolar.
+
+        Returns:
+            Cantidad de items nuevos.
+        """
+        with self._immediate() as conn:
+            cursor = conn.executemany(
+                f"INSERT OR IGNORE INTO {QUEUE_TABLE} (item_id, url) VALUES (?, ?)",
+                ((item_key(url), url) for url in urls),
+            )
+        return cursor.rowcount
+
+    def claim(self, owner: str, limit: int) -> list[str]:
+        """Reclama hasta ``limit`` items pendientes o con lease vencido.
+
+        Args:
+            owner: Identificador del worker (ver ``worker_id``).
+            limit: Maximo de items a reclamar.
+
+        Returns:
+            URLs reclamadas (vacia si no hay nada disponible ahora).
+        """
+        now = time.time()
+        with self._immediate() as conn:
+            conn.execute(
+                f"UPDATE {QUEUE_TABLE} SET state = 'done', owner = NULL, error = 'LEASE_EXPIRED', "
+                "result = json_object('URL', url, 'ERROR', 'LEASE_EXPIRED'), done_at = ? "
+                "WHERE state = 'leased' AND lease_until < ? AND claims >= ?",
+                (now, now, self.max_claims),
+            )
+            claimed = conn.execute(
+                f"SELECT item_id, url, state FROM {QUEUE_TABLE} "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                f"UPDATE {QUEUE_TABLE} SET state = 'leased', owner = ?, lease_until = ?, claims = claims + 1 "
+                "WHERE item_id = ?",
+                ((owner, now + self.lease_s, item_id) for item_id, _, _ in claimed),
+            )
+        for _, _, state in claimed:
+            LEASES.inc(event="reclaimed" if state == "leased" else "claimed")
+        return [url for _, url, _ in claimed]
+
+    def heartbeat(self, owner: str) -> int:
+        """Renueva todos los leases de ``owner``.
+
+        Args:
+            owner: Identificador del worker.
+
+        Returns:
+            Cantidad de leases renovados.
+        """
+        updated = self._execute(
+            f"UPDATE {QUEUE_TABLE} SET lease_until = ? WHERE state = 'leased' AND owner = ?",
+            (time.time() + self.lease_s, owner),
+        )
+        return updated
+
+    def ack(self, data: dict, owner: str) -> bool:
+        """Guarda el resultado final de un item, una sola vez por itemId.
+
+        Args:
+            data: Resultado de ``scrape_one`` (con URL y, si fallo, ERROR).
+            owner: Identificador del worker que lo proceso.
+
+        Returns:
+            True si es el primer resultado del item; False si otro worker ya
+            lo habia registrado y este debe descartarse.
+        """
+        updated = self._execute(
+            f"UPDATE {QUEUE_TABLE} SET state = 'done', owner = NULL, error = ?, result = ?, done_at = ?, done_by = ? "
+            "WHERE item_id = ? AND state != 'done'",
+            (
+                data.get("ERROR") or None,
+                json.dumps(data, ensure_ascii=False, default=str),
+                time.time(),
+                owner,
+                item_key(data.get("URL") or ""),
+            ),
+        )
+        first = updated == 1
+        LEASES.inc(event="acked" if first else "duplicate_ack")
+        return first
+
+    def release(self, owner: str) -> int:
+        """Devuelve a ``pending`` los items que ``owner`` no llego a terminar.
+
+        Args:
+            owner: Identificador del worker.
+
+        Returns:
+            Cantidad de items liberados.
+        """
+        updated = self._execute(
+            f"UPDATE {QUEUE_TABLE} SET state = 'pending', owner = NULL, lease_until = 0, claims = MAX(claims - 1, 0) "
+            "WHERE state = 'leased' AND owner = ?",
+            (owner,),
+        )
+        return updated
+
+    def remaining(self, exclude_owner: str | None = None) -> int:
+        """Items sin terminar (pendientes o con lease).
+
+        Args:
+            exclude_owner: No cuenta los leases de este worker.
+
+        Returns:
+            Cantidad de items que todavia pueden llegar a reclamarse.
+        """
+        return self._query(
+            f"SELECT COUNT(*) FROM {QUEUE_TABLE} WHERE state = 'pending' "
+            "OR (state = 'leased' AND owner IS NOT ?)",
+            (exclude_owner,),
+        )[0][0]
+
+    def results(self) -> Iterator[dict]:
+        """Recorre los resultados registrados, en orden de finalizacion.
+
+        Yields:
+            Diccionario de cada item terminado.
+        """
+        with self._lock:
+            rows = self._conn.execute(f"SELECT result FROM {QUEUE_TABLE} WHERE state = 'done' ORDER BY done_at")
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def stats(self) -> dict:
+        """Resumen de la cola.
+
+        Returns:
+            Diccionario con items por estado, leases vencidos y errores.
+        """
+        counts = dict(self._query(f"SELECT state, COUNT(*) FROM {QUEUE_TABLE} GROUP BY state"))
+        ((expired, errors),) = self._query(
+            f"SELECT SUM(state = 'leased' AND lease_until < ?), SUM(state = 'done' AND error IS NOT NULL) "
+            f"FROM {QUEUE_TABLE}",
+            (time.time(),),
+        )
+        return {
+            "pending": counts.get("pending", 0),
+            "leased": counts.get("leased", 0),
+            "done": counts.get("done", 0),
+            "expired": expired or 0,
+            "errors": errors or 0,
+        }
+
+    def close(self) -> None:
+        """Cierra la base."""
+        self._conn.close()